@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from wxpython.heatmap import HeatmapAccumulator
+
+
+def _sequential_ewma(heatmaps, alpha):
+    value = None
+    for heatmap in heatmaps:
+        value = heatmap.copy() if value is None else (1 - alpha) * value + alpha * heatmap
+    return value
+
+
+def test_batch_update_matches_sequential_ewma():
+    rng = np.random.default_rng(0)
+    heatmaps = rng.random((25, 6, 9))
+    accumulator = HeatmapAccumulator((6, 9), alpha=0.1)
+    for start, stop in [(0, 1), (1, 4), (4, 5), (5, 25)]:
+        accumulator.update(np.zeros((stop - start, 54), dtype=np.int64), heatmaps[start:stop])
+    np.testing.assert_allclose(accumulator.intensity(), _sequential_ewma(heatmaps, 0.1))
+
+    first_batch = HeatmapAccumulator((6, 9), alpha=0.1)
+    first_batch.update(np.zeros((25, 54), dtype=np.int64), heatmaps)
+    np.testing.assert_allclose(first_batch.intensity(), accumulator.intensity())
+
+
+def test_frequency_counts_defective_parts_per_position():
+    accumulator = HeatmapAccumulator((2, 3))
+    types = np.zeros((4, 2, 3), dtype=np.int64)
+    types[:, 0, 0] = [1, 0, 2, 0]  # 4个零件中2个在(0, 0)有缺陷
+    types[0, 1, 2] = 5
+    accumulator.update(types, np.zeros((4, 2, 3)))
+    accumulator.update(np.zeros((0, 6)), np.zeros((0, 2, 3)))  # 空批次不改变统计
+    expected = np.zeros((2, 3))
+    expected[0, 0] = 0.5
+    expected[1, 2] = 0.25
+    np.testing.assert_allclose(accumulator.frequency(), expected)
+    assert accumulator.snapshot()['parts'] == 4
+
+
+def test_reset():
+    accumulator = HeatmapAccumulator((2, 3), alpha=0.5)
+    accumulator.update(np.ones((2, 6)), np.ones((2, 2, 3)))
+    accumulator.reset()
+    assert accumulator.parts == 0
+    assert not accumulator.frequency().any()
+    accumulator.update(np.zeros((1, 6)), np.full((1, 2, 3), 0.3))
+    np.testing.assert_allclose(accumulator.intensity(), 0.3)  # 重置后第一个零件直接作为初值
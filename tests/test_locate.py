@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from wxpython.model_interface import DetectionResult, Model1
+
+
+class BoxModel1(Model1):
+    """在缩小帧的固定位置检测到一个零件，另一个检测框退化为空"""
+
+    def detect_and_crop(self, frame):
+        self.seen_shape = frame.shape
+        return [DetectionResult(True, [10, 20, 50, 40], 0.9),
+                DetectionResult(True, [30, 30, 30, 35], 0.9)], [frame[20:40, 10:50]]
+
+
+def test_locate_maps_boxes_to_native_resolution():
+    frame = np.zeros((1080, 1920, 3), np.uint8)
+    model = BoxModel1()
+    detections, crops = model.locate(frame, working_width=480)
+    assert model.seen_shape == (270, 480, 3)
+    assert detections[0].bbox == [40, 80, 200, 160]
+    assert crops[0].shape == (80, 160, 3) and np.shares_memory(crops[0], frame)
+    assert len(crops) == 1  # 映射后宽度为0的检测框无效
+    assert [type(det.valid) for det in detections] == [bool, bool]
+    assert [det.valid for det in detections] == [True, False]
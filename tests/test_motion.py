@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from wxpython.motion import MotionGate
+
+
+def _frame(value, box=None):
+    frame = np.full((120, 160, 3), 80, dtype=np.uint8)
+    if box is not None:
+        x1, y1, x2, y2 = box
+        frame[y1:y2, x1:x2] = value
+    return frame
+
+
+def test_gate_goes_idle_after_hold_frames():
+    gate = MotionGate(width=80, hold_frames=3, max_skipped=0)
+    still = _frame(80)
+    assert gate.update(still)  # 首帧总是检测
+    assert [gate.update(still) for _ in range(3)] == [True, True, False]  # 第3个静止帧后空闲
+    assert not gate.active
+    assert not gate.update(still)
+    assert gate.skipped == 2
+
+
+def test_gate_reactivates_immediately_on_motion():
+    gate = MotionGate(width=80, hold_frames=2, max_skipped=0)
+    for _ in range(4):
+        gate.update(_frame(80))
+    assert not gate.active
+    assert gate.update(_frame(255, (40, 40, 100, 100)))
+    assert gate.active
+
+
+def test_gate_hysteresis_ignores_small_changes():
+    # 变化比例介于off_threshold和on_threshold之间：空闲时不激活，激活时也不计为静止
+    gate = MotionGate(width=160, on_threshold=0.05, off_threshold=0.01, hold_frames=2, max_skipped=0)
+    gate.update(_frame(80))
+    small = [_frame(255, (0, 0, 20, 20)), _frame(80)]  # 400 / 19200 ≈ 2%的像素交替变化
+    for i in range(6):
+        assert gate.update(small[i % 2])
+    assert gate.active
+
+    still = _frame(80)
+    gate.update(still)
+    gate.update(still)
+    assert not gate.active
+    assert not gate.update(small[0])
+    assert not gate.active
+
+
+def test_gate_in_band_frames_restart_hold_count():
+    gate = MotionGate(width=160, on_threshold=0.05, off_threshold=0.01, hold_frames=3, max_skipped=0)
+    still, small = _frame(80), _frame(255, (0, 0, 20, 20))  # 约2%的像素变化，介于两个阈值之间
+    gate.update(still)
+    gate.update(still)
+    gate.update(still)  # 连续2个静止帧
+    gate.update(small)
+    gate.update(still)  # 两个介于阈值之间的帧，静止计数清零
+    gate.update(still)
+    gate.update(still)
+    assert gate.active  # 只连续静止了2帧
+    assert not gate.update(still)
+    assert not gate.active
+
+
+def test_gate_downscales_large_frames():
+    gate = MotionGate(width=160)
+    frame = np.zeros((1080, 1920, 3), np.uint8)
+    frame[:, 960:] = 255
+    small = gate._small_gray(frame)
+    assert small.shape == (90, 160)
+    assert small[:, :79].max() == 0 and small[:, 81:].min() == 255
+
+
+def test_gate_forces_periodic_check():
+    gate = MotionGate(width=80, hold_frames=1, max_skipped=3)
+    still = _frame(80)
+    gate.update(still)
+    runs = [gate.update(still) for _ in range(10)]
+    # 第1个静止帧后空闲，之后每跳过3帧强制检测1次
+    assert runs == [False, False, False, True, False, False, False, True, False, False]
+    assert gate.counters()['gate_skipped'] == 8
+
+
+def test_gate_mog2():
+    gate = MotionGate(method='mog2', width=80, hold_frames=2, max_skipped=0)
+    still = _frame(80)
+    for _ in range(20):
+        gate.update(still)
+    assert not gate.active
+    assert gate.update(_frame(255, (40, 40, 120, 100)))
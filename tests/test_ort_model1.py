@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+from wxpython.model_interface import OrtModel1  # noqa: E402
+
+# letterbox坐标系（640x640）中的两个候选框：cx, cy, w, h, 置信度
+CANDIDATES = np.array([[150, 450],
+                       [270, 350],
+                       [200, 100],
+                       [100, 100],
+                       [0.9, 0.3]], np.float32)[None]
+
+
+def _save_detector(path):
+    """输出固定候选框的检测模型，输出形状与YOLO导出一致：(1, 4 + 类别数, 候选框数)"""
+    axes = numpy_helper.from_array(np.array([1, 2, 3], np.int64), 'axes')
+    zero = numpy_helper.from_array(np.zeros(1, np.float32), 'zero')
+    boxes = numpy_helper.from_array(CANDIDATES, 'boxes')
+    graph = helper.make_graph(
+        [helper.make_node('ReduceMean', ['images', 'axes'], ['pooled'], keepdims=0),
+         helper.make_node('Mul', ['pooled', 'zero'], ['nothing']),
+         helper.make_node('Add', ['boxes', 'nothing'], ['output0'])],
+        'fixed_detector',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, [1, 3, 640, 640])],
+        [helper.make_tensor_value_info('output0', TensorProto.FLOAT, [1, 5, 2])],
+        initializer=[axes, zero, boxes])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 18)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def test_boxes_map_back_to_native_resolution(tmp_path):
+    model = OrtModel1(_save_detector(tmp_path / 'det.onnx'), min_confidence=0.5, iou_threshold=0.45)
+    frame = np.zeros((480, 1280, 3), np.uint8)  # 缩放比例0.5，上下各填充200
+    detections, crops = model.detect_and_crop(frame)
+
+    assert [det.bbox for det in detections] == [[100, 40, 500, 240], [800, 200, 1000, 400]]
+    assert [det.valid for det in detections] == [True, False]  # 第二个框低于置信度阈值
+    assert all(type(det.valid) is bool for det in detections)
+    assert len(crops) == 1
+    assert crops[0].shape == (200, 400, 3) and np.shares_memory(crops[0], frame)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+from wxpython.model_interface import OrtModel2  # noqa: E402
+
+
+def _save_model(path, num_outputs):
+    """切片 (N, 3, H, W) -> 通道均值 -> 线性层 -> softmax，输出 (N, num_outputs)"""
+    weight = numpy_helper.from_array(np.ones((3, num_outputs), np.float32), 'weight')
+    axes = numpy_helper.from_array(np.array([2, 3], np.int64), 'axes')
+    graph = helper.make_graph(
+        [helper.make_node('ReduceMean', ['images', 'axes'], ['pooled'], keepdims=0),
+         helper.make_node('MatMul', ['pooled', 'weight'], ['logits']),
+         helper.make_node('Softmax', ['logits'], ['probs'], axis=1)],
+        'tile_classifier',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, ['batch', 3, 'h', 'w'])],
+        [helper.make_tensor_value_info('probs', TensorProto.FLOAT, ['batch', num_outputs])],
+        initializer=[weight, axes])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 18)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def test_classification_model_is_accepted(tmp_path):
+    model = OrtModel2(_save_model(tmp_path / 'cls.onnx', 6), num_classes=6, max_batch=8)
+    batch = np.full((2 * 54,) + model.input_size + (3,), 128, np.uint8)  # 超过max_batch，分块推理
+    result = model.classify_batch(batch)
+    assert result['defect_types'].shape == (108,)
+    assert result['heatmaps'].shape == (2, 6, 9)
+    np.testing.assert_allclose(result['heatmaps'], 5 / 6, rtol=1e-5)  # 均匀概率，1 - P(正常)
+
+
+def test_output_shape_mismatch_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        OrtModel2(_save_model(tmp_path / 'other.onnx', 84), num_classes=6, max_batch=8)
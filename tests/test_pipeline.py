@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import queue
+import random
+import time
+
+import numpy as np
+
+from wxpython.model_interface import DetectionResult, Model1, Model2
+from wxpython.pipeline import MultiCameraPipeline
+
+
+class SlowModel1(Model1):
+    """每帧在同一位置检测到一个零件，耗时固定"""
+
+    def detect_and_crop(self, frame):
+        time.sleep(0.01)
+        x1, y1, x2, y2 = 100, 100, 400, 300
+        return [DetectionResult(True, [x1, y1, x2, y2], 0.9)], [frame[y1:y2, x1:x2]]
+
+
+class JitterModel1(SlowModel1):
+    """耗时随机，多个定位线程时各帧完成的先后被打乱"""
+
+    def detect_and_crop(self, frame):
+        time.sleep(random.uniform(0, 0.02))
+        return super().detect_and_crop(frame)
+
+
+class StaticStream:
+    def __init__(self, frames):
+        self.frames = frames
+        self.frame = np.full((480, 640, 3), 80, dtype=np.uint8)
+
+    def read(self):
+        if self.frames == 0:
+            return None
+        self.frames -= 1
+        return {'frame': self.frame, 'timestamp': time.time()}
+
+    def stop(self):
+        pass
+
+
+def _drain(pipeline, output):
+    tasks = []
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            tasks.append(output.get(timeout=0.1))
+        except queue.Empty:
+            if not pipeline.is_alive():
+                break
+    return tasks
+
+
+def test_gated_frames_keep_capture_order():
+    output = queue.Queue()
+    pipeline = MultiCameraPipeline([StaticStream(120)], [SlowModel1()], [Model2()], [output],
+                                   queue_size=4, names=[''], tracking=False, tile_cache_size=0,
+                                   motion_gating=True)
+    pipeline.start()
+    tasks = _drain(pipeline, output)
+    pipeline.stop()
+    pipeline.join(1)
+
+    assert len(tasks) == 120
+    assert [task.frame_id for task in tasks] == list(range(120))
+    gated = [task for task in tasks if task.gated]
+    assert gated  # 静止画面超过hold_frames后开始跳过
+    totals = [sum(task.defect_counts) for task in tasks]
+    assert totals == sorted(totals)  # 累计计数不会倒退
+    for task in gated:
+        assert task.detections and all(result['cached'] for result in task.classifications)
+
+
+def test_multiple_workers_keep_capture_order():
+    outputs = [queue.Queue(), queue.Queue()]
+    pipeline = MultiCameraPipeline([StaticStream(200), StaticStream(200)], [JitterModel1(), JitterModel1()],
+                                   [Model2(), Model2()], outputs, queue_size=4, tracking=True,
+                                   tile_cache_size=0, motion_gating=True)
+    pipeline.start()
+    results = [[] for _ in outputs]
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        for output, tasks in zip(outputs, results):
+            while not output.empty():
+                tasks.append(output.get_nowait())
+        if not pipeline.is_alive() and all(output.empty() for output in outputs):
+            break
+        time.sleep(0.05)
+    pipeline.stop()
+    pipeline.join(1)
+
+    for tasks in results:
+        assert [task.frame_id for task in tasks] == list(range(200))
+        assert any(task.gated for task in tasks)
+        for previous, task in zip(tasks, tasks[1:]):
+            assert sum(task.defect_counts) >= sum(previous.defect_counts)
+            if task.gated:  # 沿用的正是前一帧的结果
+                assert task.defect_counts == previous.defect_counts
+                assert [r['defect_types'] for r in task.classifications] == \
+                    [r['defect_types'] for r in previous.classifications]
+        assert sum(tasks[-1].defect_counts) == 54  # 同一个零件只计入一次
+    assert pipeline.reorder.waiting() == 0
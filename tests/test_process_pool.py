@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import queue
+import time
+
+import numpy as np
+
+from wxpython.model_interface import DetectionResult
+from wxpython.pipeline import FrameTask
+from wxpython.process_pool import ProcessInspectionPipeline
+
+
+class FiniteStream:
+    def __init__(self, frames):
+        self.frames = frames
+        self.frame = np.full((480, 640, 3), 80, dtype=np.uint8)
+
+    def read(self):
+        if self.frames == 0:
+            return None
+        self.frames -= 1
+        return {'frame': self.frame, 'timestamp': time.time()}
+
+    def stop(self):
+        pass
+
+
+class EndlessStream:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.frame = np.full((480, 640, 3), 80, dtype=np.uint8)
+
+    def read(self):
+        time.sleep(self.interval)
+        return {'frame': self.frame, 'timestamp': time.time()}
+
+    def stop(self):
+        pass
+
+
+def _worker_result(pipeline, frame_id, defect_types):
+    """模拟工作进程返回的一帧结果：一个零件，全部切片为给定缺陷类型"""
+    task = FrameTask(frame_id=frame_id, frame=np.full((480, 640, 3), 80, dtype=np.uint8), timestamp=0.0)
+    task.detections = [DetectionResult(True, [100, 100, 400, 300], 0.9)]
+    task.classifications = [{'part': 0, 'track_id': None, 'cached': False,
+                             'defect_types': [defect_types] * 54, 'heatmap': np.zeros((6, 9))}]
+    return task
+
+
+def test_collect_counts_each_part_once():
+    pipeline = ProcessInspectionPipeline([EndlessStream()], [queue.Queue()], processes=1,
+                                         tracking=True, motion_gating=False)
+    try:
+        pipeline.defect_counts = [[0] * 6]
+        tracker = pipeline.trackers[0]
+
+        first = _worker_result(pipeline, 0, 2)
+        delta = pipeline._track(tracker, first)
+        assert delta.tolist() == [0, 0, 54, 0, 0, 0]
+        assert [r['cached'] for r in first.classifications] == [False]
+        assert first.classifications[0]['track_id'] is not None
+
+        # 同一个零件的下一帧：工作进程重新分类了，汇总时改用轨迹上的结果，不重复计数
+        second = _worker_result(pipeline, 1, 3)
+        delta = pipeline._track(tracker, second)
+        assert delta.tolist() == [0] * 6
+        assert [r['cached'] for r in second.classifications] == [True]
+        assert second.classifications[0]['defect_types'] == [2] * 54
+        assert tracker.counters()['classified_parts'] == 1
+    finally:
+        pipeline._shutdown_workers()
+
+
+def test_dead_worker_stops_pipeline():
+    pipeline = ProcessInspectionPipeline([EndlessStream()], [queue.Queue(maxsize=1000)], processes=1,
+                                         motion_gating=False)
+    pipeline.start()
+    try:
+        time.sleep(0.5)
+        pipeline.workers[0].terminate()
+        deadline = time.monotonic() + 10
+        while pipeline.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert not pipeline.is_alive()
+        assert not pipeline._pending
+        assert pipeline._free_slots.qsize() == pipeline.ring.slots
+    finally:
+        pipeline.stop()
+        pipeline.join(5)
+
+
+def test_gated_frames_keep_capture_order():
+    outputs = [queue.Queue(), queue.Queue()]
+    pipeline = ProcessInspectionPipeline([FiniteStream(80), FiniteStream(80)], outputs, processes=2,
+                                         tracking=False, motion_gating=True)
+    pipeline.start()
+    deadline = time.monotonic() + 30
+    while pipeline.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    pipeline.stop()
+    pipeline.join(5)
+
+    for output in outputs:
+        tasks = list(output.queue)
+        assert [task.frame_id for task in tasks] == list(range(80))
+        assert any(task.gated for task in tasks)
+        totals = [sum(task.defect_counts) for task in tasks]
+        assert totals == sorted(totals)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+
+import pytest
+
+from wxpython.render import CoalescingQueue
+
+
+def test_coalescing_queue_keeps_latest():
+    q = CoalescingQueue(maxsize=2)
+    assert [q.put(i) for i in range(5)] == [False, False, True, True, True]
+    assert q.qsize() == 2
+    assert [q.get(timeout=0), q.get(timeout=0)] == [3, 4]
+    assert q.counters() == {'render_queue': 0, 'render_dropped': 3, 'render_drop_rate': 0.6}
+
+
+def test_coalescing_queue_get_timeout():
+    q = CoalescingQueue()
+    with pytest.raises(queue.Empty):
+        q.get(timeout=0.01)
+
+
+def test_coalescing_queue_close_wakes_consumer():
+    q = CoalescingQueue()
+    q.put('stale')
+    q.close()
+    assert q.get(timeout=0) is None  # 关闭时丢弃待处理的任务
+    assert q.put('late') is False
+    assert q.get(timeout=0) is None
+
+    q = CoalescingQueue()
+    results = []
+    consumer = threading.Thread(target=lambda: results.append(q.get(timeout=5)))
+    consumer.start()
+    q.close()
+    consumer.join(1)
+    assert not consumer.is_alive()
+    assert results == [None]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import csv
+import sqlite3
+
+import numpy as np
+
+from wxpython.model_interface import DetectionResult
+from wxpython.pipeline import FrameTask
+from wxpython.results_store import ResultStore, export_csv, task_records
+
+
+def _task(frame_id, timestamp, camera=0, cached=False):
+    task = FrameTask(frame_id=frame_id, frame=np.zeros((4, 4, 3), np.uint8), timestamp=timestamp, camera=camera)
+    task.detections = [DetectionResult(False, [0, 0, 5, 5], 0.2), DetectionResult(True, [10, 20, 110, 80], 0.9)]
+    labels = [0] * 54
+    labels[7] = 3
+    task.classifications = [{'part': 0, 'track_id': frame_id, 'cached': cached,
+                             'defect_types': labels, 'heatmap': np.full((6, 9), 0.25)}]
+    return task
+
+
+def test_task_records_skip_cached_results():
+    assert task_records(_task(1, 100.0, cached=True)) == []
+    (record,) = task_records(_task(1, 100.0))
+    assert record[:9] == (100.0, 0, 1, 1, 10, 20, 110, 80, 1)  # 边界框来自有效检测结果
+    assert np.frombuffer(record[9], dtype=np.uint8)[7] == 3
+
+
+def test_store_writes_in_batches_and_exports(tmp_path):
+    db_path = str(tmp_path / 'results' / 'defects.db')
+    store = ResultStore(db_path, batch_size=3, flush_interval=0.05)
+    for i in range(7):
+        store.submit(_task(i, 1000.0 + i, camera=i % 2))
+    store.submit(_task(99, 2000.0, cached=True))
+    store.close()
+    assert store.counters() == {'results_written': 7, 'results_pending': 0, 'results_dropped': 0}
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM parts").fetchone() == (7,)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ('wal',)
+    conn.close()
+
+    csv_path = str(tmp_path / 'report.csv')
+    assert export_csv(db_path, csv_path, start=1002.0, end=1005.0, chunk_size=2) == 3
+    with open(csv_path, encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['frame_id'] for row in rows] == ['2', '3', '4']
+    assert rows[0]['camera'] == '0' and rows[1]['camera'] == '1'
+    assert rows[0]['defect_tiles'] == '1'
+    assert rows[0]['tile_labels'].split()[7] == '3'
+    assert rows[0]['heatmap'].split(';')[0] == ' '.join(['0.250'] * 9)
+
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from wxpython.streams import NetworkStream, ReplayStream
+
+
+def _write_video(path, frames=10, size=(64, 48), fps=25.0):
+    """写一个逐帧亮度递增的小视频，作为网络流的本地替身"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV无法写入MJPG视频")
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 20, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def _write_images(directory, count=12):
+    for i in range(count):
+        image = np.zeros((32, 48, 3), dtype=np.uint8)
+        image[:, :, 0] = i * 10  # BGR中的蓝色通道，读出后位于RGB的最后一个通道
+        cv2.imwrite(str(directory / f"{i}.png"), image)
+    return str(directory)
+
+
+def _read_all(stream):
+    frames = []
+    while True:
+        result = stream.read()
+        if result is None:
+            return frames
+        frames.append(result)
+
+
+def test_network_stream_reconnects_at_end_of_file(tmp_path):
+    path = _write_video(tmp_path / 'camera.avi', frames=5)
+    stream = NetworkStream(path, ffmpeg_options=None, reconnect_delay=0.05, max_reconnect_delay=0.2)
+    try:
+        deadline = time.monotonic() + 10
+        frames = 0
+        while stream.reconnects < 2 and time.monotonic() < deadline:
+            result = stream.read()
+            assert result is not None
+            assert result['frame'].shape == (48, 64, 3)
+            frames += 1
+        assert stream.reconnects >= 2
+        assert stream.frames_received >= 10  # 每次重连都从文件开头重新读取
+        assert frames >= 1
+    finally:
+        stream.stop()
+    assert not stream.decoder.is_alive()
+    assert stream.read() is None
+
+
+def test_network_stream_backoff_gives_up(tmp_path):
+    path = tmp_path / 'not_a_video.avi'
+    path.write_bytes(b'not a video')
+    start = time.monotonic()
+    stream = NetworkStream(str(path), ffmpeg_options=None, reconnect_delay=0.1,
+                           max_reconnect_delay=0.2, max_reconnects=3)
+    try:
+        assert stream.read() is None  # 打开一直失败，达到重连上限后流结束
+        elapsed = time.monotonic() - start
+        assert stream.reconnects == 3
+        assert elapsed >= 0.1 + 0.2 + 0.2 - 0.05  # 等待时间翻倍且不超过上限
+        assert not stream.connected
+    finally:
+        stream.stop()
+
+
+def test_network_stream_stop_interrupts_backoff(tmp_path):
+    path = tmp_path / 'not_a_video.avi'
+    path.write_bytes(b'not a video')
+    stream = NetworkStream(str(path), ffmpeg_options=None, reconnect_delay=30.0)
+    time.sleep(0.2)
+    start = time.monotonic()
+    stream.stop()
+    assert time.monotonic() - start < 2
+    assert not stream.decoder.is_alive()
+
+
+def test_replay_is_deterministic(tmp_path):
+    directory = _write_images(tmp_path)
+    runs = []
+    for _ in range(2):
+        stream = ReplayStream(directory, pacing='fast', prefetch=2)
+        runs.append(_read_all(stream))
+        stream.stop()
+    first, second = runs
+    assert [r['source'] for r in first] == [f"{i}.png" for i in range(12)]  # 按数字顺序而不是字典序
+    assert [r['source'] for r in first] == [r['source'] for r in second]
+    assert [r['frame_index'] for r in first] == list(range(12))
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a['frame'], b['frame'])
+    assert first[3]['frame'][0, 0].tolist() == [0, 0, 30]  # 已转换为RGB
+
+
+def test_replay_video_and_loop(tmp_path):
+    path = _write_video(tmp_path / 'replay.avi', frames=4)
+    stream = ReplayStream(path, pacing='fast', loop=True)
+    try:
+        frames = [stream.read() for _ in range(10)]
+    finally:
+        stream.stop()
+    sources = [f['source'] for f in frames]
+    assert sources[:4] == [f"replay.avi#{i}" for i in range(4)]
+    assert sources[4:8] == sources[:4]
+    for a, b in zip(frames[:2], frames[4:6]):
+        np.testing.assert_array_equal(a['frame'], b['frame'])
+
+
+def test_replay_loop_stops_without_readable_frames(tmp_path):
+    for i in range(3):
+        (tmp_path / f"{i}.png").write_bytes(b'not an image')
+    stream = ReplayStream(str(tmp_path), pacing='fast', loop=True)
+    try:
+        assert stream.read() is None  # 不会无限空转
+    finally:
+        stream.stop()
+    assert not stream._decoder.is_alive()
+
+
+def test_replay_fixed_pacing(tmp_path):
+    directory = _write_images(tmp_path, count=6)
+    stream = ReplayStream(directory, pacing='fixed', fps=50)
+    start = time.monotonic()
+    frames = _read_all(stream)
+    elapsed = time.monotonic() - start
+    stream.stop()
+    assert len(frames) == 6
+    assert elapsed >= 5 / 50 - 0.01
+
+
+def test_replay_rejects_bad_arguments(tmp_path):
+    with pytest.raises(ValueError):
+        ReplayStream(str(tmp_path), pacing='slow')
+    with pytest.raises(ValueError):
+        ReplayStream(str(tmp_path), pacing='fixed')
+    with pytest.raises(Exception):
+        ReplayStream(str(tmp_path))  # 空目录
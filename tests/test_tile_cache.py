@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from wxpython.model_interface import Model2
+from wxpython.tile_cache import TileCache
+
+
+class CountingModel2(Model2):
+    """切片缺陷类型取切片均值是否超过128，记录实际送入模型的切片数"""
+
+    def __init__(self):
+        super().__init__()
+        self.classified = 0
+
+    def classify_tiles(self, batch):
+        self.classified += len(batch)
+        means = batch.reshape(len(batch), -1).mean(axis=1)
+        return (means > 128).astype(np.int64), means / 255.0
+
+
+def _tiles(*values):
+    return np.stack([np.full((64, 64, 3), v, dtype=np.uint8) for v in values])
+
+
+def test_repeated_tiles_hit_cache():
+    model, cache = CountingModel2(), TileCache(capacity=16, tolerance=4)
+    types, scores = cache.classify(model, _tiles(10, 200, 10))
+    assert types.tolist() == [0, 1, 0]
+    assert model.classified == 2  # 批次内相同的切片只推理一次
+    types, _ = cache.classify(model, _tiles(201, 10))  # 差异小于tolerance，落到同一个键
+    assert types.tolist() == [1, 0]
+    assert model.classified == 2
+    assert cache.counters()['tile_cache_hits'] == 2
+    assert cache.counters()['tile_cache_misses'] == 3
+
+
+def test_changed_tile_misses():
+    model, cache = CountingModel2(), TileCache(capacity=16, tolerance=4)
+    cache.classify(model, _tiles(10))
+    tile = _tiles(10)
+    tile[0, :8, :8] = 255  # 一个哈希块明显变化
+    types, _ = cache.classify(model, tile)
+    assert model.classified == 2
+
+
+def test_lru_eviction():
+    model, cache = CountingModel2(), TileCache(capacity=2, tolerance=1)
+    cache.classify(model, _tiles(10))
+    cache.classify(model, _tiles(50))
+    cache.classify(model, _tiles(10))  # 10变为最近使用
+    cache.classify(model, _tiles(90))  # 淘汰50
+    assert model.classified == 3
+    cache.classify(model, _tiles(10))
+    assert model.classified == 3
+    cache.classify(model, _tiles(50))
+    assert model.classified == 4
+    assert cache.counters()['tile_cache_size'] == 2
+
+
+def test_scopes_separate_cameras_and_positions():
+    model, cache = CountingModel2(), TileCache(capacity=16, tolerance=2)
+    cache.classify(model, _tiles(10, 10), scopes=[(0, 0), (0, 1)])
+    assert model.classified == 2  # 同一外观、不同位置不复用
+    cache.classify(model, _tiles(10, 10), scopes=[(1, 0), (0, 1)])
+    assert model.classified == 3  # 另一路相机的同一位置不复用，同一相机同一位置命中
+    assert cache.keys(_tiles(10), [(0, 300)]) != cache.keys(_tiles(10), [(0, 44)])
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from wxpython.tiling import tile_by_size, tile_image
+
+
+def _image(height, width):
+    return np.arange(height * width * 3, dtype=np.int64).reshape(height, width, 3)
+
+
+def _slice_tiles(image, grid):
+    """逐个切片按坐标直接切取，作为跨步视图的参照"""
+    return [image[y1:y2, x1:x2] for x1, y1, x2, y2 in (grid.tile_box(i) for i in range(grid.num_tiles))]
+
+
+def test_no_overlap_matches_original_slicing():
+    # 与原DefectDetector._slice_image相同：slice = H // rows，丢弃余数
+    image = _image(301, 455)
+    tiles, grid = tile_image(image, 6, 9)
+    slice_h, slice_w = 301 // 6, 455 // 9
+    for i in range(6):
+        for j in range(9):
+            expected = image[i * slice_h:(i + 1) * slice_h, j * slice_w:(j + 1) * slice_w]
+            np.testing.assert_array_equal(tiles[i, j], expected)
+    assert not tiles.flags.writeable
+    assert np.shares_memory(tiles, image)
+
+
+@pytest.mark.parametrize('length, count, overlap', [(100, 6, 0.25), (107, 9, 0.1)])
+def test_overlap_grid_fits_reported_cases(length, count, overlap):
+    image = _image(length, length)
+    tiles, grid = tile_image(image, count, count, overlap)
+    assert grid.covered_size[0] <= length and grid.covered_size[1] <= length
+    for tile, expected in zip(tiles.reshape(-1, *tiles.shape[2:]), _slice_tiles(image, grid)):
+        np.testing.assert_array_equal(tile, expected)
+
+
+def test_overlap_grid_always_fits():
+    for length in range(6, 200):
+        for count in (2, 3, 6, 7, 9):
+            for overlap in (0.0, 0.1, 0.2, 0.25, 0.3, 0.5, 0.75):
+                _, grid = tile_image(np.zeros((length, count * 4), np.uint8), count, 1, overlap)
+                assert grid.covered_size[0] <= max(length, count), (length, count, overlap)
+                _, grid = tile_image(np.zeros((length, count * 4), np.uint8), count, 1, overlap, 'pad')
+                assert grid.covered_size[0] >= length, (length, count, overlap)
+
+
+def test_pad_covers_image():
+    image = _image(100, 107)
+    tiles, grid = tile_image(image, 6, 9, 0.25, remainder='pad')
+    assert grid.covered_size[0] >= 100 and grid.covered_size[1] >= 107
+    padded = np.zeros(grid.covered_size + (3,), dtype=image.dtype)
+    padded[:100, :107] = image
+    for tile, expected in zip(tiles.reshape(-1, *tiles.shape[2:]), _slice_tiles(padded, grid)):
+        np.testing.assert_array_equal(tile, expected)
+
+
+def test_tiny_crop_is_padded():
+    tiles, grid = tile_image(np.ones((5, 100, 3), np.uint8), 6, 9)
+    assert tiles.shape[:2] == (6, 9)
+    assert grid.tile_h >= 1 and grid.tile_w >= 1
+    assert tiles[5, 0].sum() == 0  # 第6行超出原图，补零
+    assert tiles[0, 0].min() == 1
+
+
+def test_tile_by_size():
+    image = _image(100, 130)
+    tiles, grid = tile_by_size(image, (32, 32), stride=(24, 24))
+    assert (grid.rows, grid.cols) == (3, 5)
+    for tile, expected in zip(tiles.reshape(-1, *tiles.shape[2:]), _slice_tiles(image, grid)):
+        np.testing.assert_array_equal(tile, expected)
+
+
+def test_boxes_match_tile_box():
+    _, grid = tile_image(_image(120, 180), 6, 9, 0.2)
+    boxes = grid.boxes(offset=(10, 20))
+    for i in range(grid.num_tiles):
+        assert tuple(boxes[i]) == grid.tile_box(i, offset=(10, 20))
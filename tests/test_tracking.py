@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import queue
+import time
+
+import numpy as np
+
+from wxpython.model_interface import DetectionResult, Model1, Model2
+from wxpython.pipeline import MultiCameraPipeline
+from wxpython.tracking import IouTracker, iou_matrix
+
+
+class FixedModel1(Model1):
+    """每帧在同一位置检测到一个零件"""
+
+    def detect_and_crop(self, frame):
+        x1, y1, x2, y2 = 100, 100, 400, 300
+        return [DetectionResult(True, [x1, y1, x2, y2], 0.9)], [frame[y1:y2, x1:x2]]
+
+
+class FailOnceModel2(Model2):
+    """第一次分类抛出异常，之后正常"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def classify_tiles(self, batch):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("injected failure")
+        return super().classify_tiles(batch)
+
+
+class StaticStream:
+    def __init__(self, frames):
+        self.frames = frames
+        self.frame = np.full((480, 640, 3), 80, dtype=np.uint8)
+
+    def read(self):
+        if self.frames == 0:
+            return None
+        self.frames -= 1
+        time.sleep(0.005)
+        return {'frame': self.frame, 'timestamp': time.time()}
+
+    def stop(self):
+        pass
+
+
+def _crop(value):
+    return np.full((200, 300, 3), value, dtype=np.uint8)
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 1 / 3, 0.0]], rtol=1e-6)
+
+
+def test_tracker_classifies_each_part_once():
+    tracker = IouTracker()
+    det = [DetectionResult(True, [100, 100, 400, 300], 0.9)]
+    tracks, needs = tracker.update(det, [_crop(80)], frame_id=0)
+    assert needs == [True]
+    tracker.mark_pending(tracks[0], 0)
+    IouTracker.complete(tracks[0], 0, {'defect_types': [0]})
+
+    tracks2, needs = tracker.update(det, [_crop(80)], frame_id=1)
+    assert tracks2[0] is tracks[0] and needs == [False]
+    # 外观明显变化时重新分类
+    _, needs = tracker.update(det, [_crop(200)], frame_id=2)
+    assert needs == [True]
+
+
+def test_tracker_pending_released_on_failure():
+    tracker = IouTracker()
+    det = [DetectionResult(True, [100, 100, 400, 300], 0.9)]
+    tracks, _ = tracker.update(det, [_crop(80)], frame_id=0)
+    tracker.mark_pending(tracks[0], 0)
+    assert tracker.update(det, [_crop(80)], frame_id=1)[1] == [False]
+    IouTracker.release(tracks[0], 0)
+    assert tracker.update(det, [_crop(80)], frame_id=2)[1] == [True]
+
+
+def test_tracker_pending_expires_when_result_is_lost():
+    tracker = IouTracker(pending_timeout=3)
+    det = [DetectionResult(True, [100, 100, 400, 300], 0.9)]
+    tracks, _ = tracker.update(det, [_crop(80)], frame_id=0)
+    tracker.mark_pending(tracks[0], 0)
+    assert tracker.update(det, [_crop(80)], frame_id=3)[1] == [False]
+    assert tracker.update(det, [_crop(80)], frame_id=4)[1] == [True]
+    assert tracker.counters()['expired_pending'] == 1
+
+
+def test_failed_appearance_change_is_retried():
+    tracker = IouTracker()
+    det = [DetectionResult(True, [100, 100, 400, 300], 0.9)]
+    tracks, _ = tracker.update(det, [_crop(80)], frame_id=0)
+    tracker.mark_pending(tracks[0], 0)
+    IouTracker.complete(tracks[0], 0, {'defect_types': [0]})
+    _, needs = tracker.update(det, [_crop(200)], frame_id=1)
+    tracker.mark_pending(tracks[0], 1)
+    IouTracker.release(tracks[0], 1)  # 分类失败：外观基准不能更新为新外观
+    assert tracker.update(det, [_crop(200)], frame_id=2)[1] == [True]
+
+
+def test_pipeline_reclassifies_part_after_classify_failure():
+    output = queue.Queue()
+    model2 = FailOnceModel2()
+    pipeline = MultiCameraPipeline([StaticStream(20)], [FixedModel1()], [model2], [output],
+                                   names=[''], tracking=True, tile_cache_size=0, motion_gating=False)
+    pipeline.start()
+    pipeline.join(10)
+    assert not pipeline.is_alive()
+
+    tasks = []
+    while not output.empty():
+        tasks.append(output.get())
+    assert model2.calls >= 2
+    fresh = [result for task in tasks for result in task.classifications if not result['cached']]
+    assert len(fresh) == 1  # 失败后重新分类一次，之后复用缓存结果
+    assert tasks[-1].classifications and tasks[-1].classifications[0]['cached']
+    assert sum(pipeline.defect_counts[0]) == model2.slices_per_part
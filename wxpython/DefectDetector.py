@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
+import time
+_MODULE_START = time.perf_counter()  # 模块开始导入的时刻，用于启动耗时测量
+
+import functools
 import threading
 import queue
+import logging
+from collections import deque
 from typing import List, Tuple
 
 import numpy as np              # 数据处理的库numpy
@@ -9,84 +15,153 @@ import wx                       # 构造显示界面的GUI
 import wx.xrc
 import wx.adv
 import argparse
-import datetime,time
+import datetime
+import json
 import math
 import os
-import torch
-import torch.backends.cudnn as cudnn
-import torch.hub
-import traceback
-from wxpython.model_interface import Model1, Model2, DetectionResult  # 导入模型类
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
-import matplotlib.pyplot as plt
+from wxpython import model_config
+from wxpython.log_config import FRAME, configure_logging
+from wxpython.model_interface import create_model1, create_model2  # 模型在后台线程中创建
+from wxpython.pipeline import FrameTask
+from wxpython.results_store import ResultStore, export_csv  # 检测结果存储
+from wxpython.render import CoalescingQueue, FrameRenderer, prepare_boxes  # 帧渲染
+from wxpython.service import InspectionService  # 不依赖界面的检测服务，界面只负责显示
+from wxpython.stats import PipelineStats  # 各阶段耗时统计
+# matplotlib导入较慢，窗口显示后再由HeatmapPanel.build()导入
+
+logger = logging.getLogger(__name__)
 
 
 class VideoCanvas(wx.Panel):
+    """视频显示画布
+
+    渲染线程通过FrameRenderer把帧直接缩放到画布尺寸，写入预分配的双缓冲区并在其上绘制叠加框，
+    主线程只需把前缓冲区用CopyFromBuffer拷贝到常驻位图中，
+    每帧不再创建新的数组、wx.Image或wx.Bitmap。
+    """
     def __init__(self, parent):
         super().__init__(parent)
-        self.current_frame = None  # 当前视频帧
-        self.buffer = wx.Bitmap(1, 1)  # 初始化缓冲位图
+        self.bitmap = wx.Bitmap(1, 1)  # 常驻显示位图
+        self.renderer = FrameRenderer()  # 渲染目标尺寸随画布尺寸更新
 
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
         # 绑定绘制事件
         self.Bind(wx.EVT_PAINT, self.on_paint)
         self.Bind(wx.EVT_SIZE, self.on_size)  # 处理窗口尺寸变化
 
     def on_paint(self, event):
         # 创建双缓冲设备上下文
-        dc = wx.BufferedPaintDC(self, self.buffer)
-        if self.buffer.IsOk():
+        dc = wx.AutoBufferedPaintDC(self)
+        dc.SetBackground(wx.Brush(self.GetParent().GetBackgroundColour()))
+        dc.Clear()
+        if self.bitmap.IsOk():
             # 获取画布尺寸
             width, height = self.GetClientSize()
             # 计算居中绘制的位置
-            x = (width - self.buffer.GetWidth()) // 2
-            y = (height - self.buffer.GetHeight()) // 2
-            # 绘制缓冲位图
-            dc.DrawBitmap(self.buffer, x, y, True)
-
-    def update_frame(self, bitmap):
-        """ 安全更新帧的线程方法 """
-        if not bitmap.IsOk():
-            return
-
-        # 计算保持宽高比的缩放尺寸
-        img_w, img_h = bitmap.GetWidth(), bitmap.GetHeight()
-        panel_w, panel_h = self.GetClientSize()
-
-        # 计算缩放比例
-        scale = min(panel_w / img_w, panel_h / img_h)
-        new_w = int(img_w * scale)
-        new_h = int(img_h * scale)
-
-        # 创建缩放后的位图
-        scaled_bmp = bitmap.ConvertToImage()
-        scaled_bmp = scaled_bmp.Scale(new_w, new_h, wx.IMAGE_QUALITY_BILINEAR)
-        scaled_bmp = wx.Bitmap(scaled_bmp)
-
-        # 更新缓冲位图
-        self.buffer = scaled_bmp
-        self.Refresh()  # 触发重绘
+            x = (width - self.bitmap.GetWidth()) // 2
+            y = (height - self.bitmap.GetHeight()) // 2
+            # 绘制常驻位图
+            dc.DrawBitmap(self.bitmap, x, y)
+
+    def render(self, frame: np.ndarray, boxes: List[Tuple]):
+        """缩放帧并绘制叠加框（渲染线程调用），见FrameRenderer.render"""
+        self.renderer.render(frame, boxes)
+
+    def present(self):
+        """把前缓冲区拷贝到常驻位图并重绘（主线程调用）"""
+        with self.renderer.lock:
+            front = self.renderer.front
+            if front is None:
+                return
+            height, width = front.shape[:2]
+            if self.bitmap.GetWidth() != width or self.bitmap.GetHeight() != height:
+                self.bitmap = wx.Bitmap(width, height, 24)
+            self.bitmap.CopyFromBuffer(front)
+        self.Refresh(eraseBackground=False)
 
     def on_size(self, event):
-        """ 窗口尺寸变化时重置缓冲 """
-        self.buffer = wx.Bitmap(*self.GetClientSize())
+        """ 窗口尺寸变化时更新渲染目标尺寸 """
+        width, height = self.GetClientSize()
+        self.renderer.target_size = (max(width, 1), max(height, 1))
         self.Refresh()
         event.Skip()
 
 
 class HeatmapPanel(wx.Panel):
-    """热力图显示面板"""
-    def __init__(self, parent):
+    """热力图显示面板
+
+    图像和颜色条只在build()时创建一次，之后每次更新只调用set_data，
+    并用blit只重绘热力图区域，单次更新开销恒定，长时间运行内存不增长。
+    matplotlib导入较慢，初始化时只显示占位文字，窗口显示后再调用build()创建图表。
+    
+    显示内容可切换：最近一个零件的热力图，或整个班次累计的缺陷频率/平滑强度（见heatmap.py）。
+    """
+    MODES = [('frequency', '缺陷频率（累计）'), ('intensity', '缺陷强度（平滑）'), ('latest', '当前零件')]
+    
+    def __init__(self, parent, heatmap_size=(6, 9), cmap='hot', vmin=0, vmax=1):
         super().__init__(parent)
-        self.figure = Figure(figsize=(3, 2))
-        self.canvas = FigureCanvas(self, -1, self.figure)
-        self.ax = self.figure.add_subplot(111)
+        self.heatmap_size = heatmap_size
+        self.mode = self.MODES[0][0]
+        self.cmap = cmap
+        self.vmin = vmin
+        self.vmax = vmax
+        self.figure = None
+        self.canvas = None
+        self.ax = None
         self.im = None
-        
+        self._background = None  # 不含热力图的坐标轴背景，用于blit
+
         # 设置布局
+        self.mode_choice = wx.Choice(self, choices=[label for _, label in self.MODES])
+        self.mode_choice.SetSelection(0)
+        self.mode_choice.Bind(wx.EVT_CHOICE, self._on_mode)
+        self.placeholder = wx.StaticText(self, label="热力图加载中...")
         sizer = wx.BoxSizer(wx.VERTICAL)
-        sizer.Add(self.canvas, 1, wx.EXPAND)
+        sizer.Add(self.mode_choice, 0, wx.EXPAND | wx.ALL, 2)
+        sizer.Add(self.placeholder, 1, wx.ALIGN_CENTER | wx.ALL, 10)
         self.SetSizer(sizer)
+
+    def build(self):
+        """创建matplotlib图表（主线程调用）"""
+        if self.canvas is not None:
+            return
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
+
+        self.figure = Figure(figsize=(3, 2))
+        self.canvas = FigureCanvas(self, -1, self.figure)
+        self.ax = self.figure.add_subplot(111)
+
+        # 创建一次图像和颜色条，animated=True使其不参与整图重绘，由blit单独绘制
+        self.im = self.ax.imshow(np.zeros(self.heatmap_size), cmap=self.cmap, aspect='auto',
+                                 vmin=self.vmin, vmax=self.vmax, animated=True)
+        self.figure.colorbar(self.im, ax=self.ax)
+
+        # 设置标题和标签
+        self.ax.set_title(self.mode_choice.GetStringSelection())
+        self.ax.set_xlabel('X轴')
+        self.ax.set_ylabel('Y轴')
+
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+        # 用图表替换占位文字
+        sizer = self.GetSizer()
+        sizer.Detach(self.placeholder)
+        self.placeholder.Destroy()
+        sizer.Add(self.canvas, 1, wx.EXPAND)
+        self.Layout()
+
+    def _on_mode(self, event):
+        """切换显示内容，新数据在下一次update_heatmap时显示"""
+        self.mode = self.MODES[self.mode_choice.GetSelection()][0]
+        if self.ax is not None:
+            self.ax.set_title(self.mode_choice.GetStringSelection())
+            self.canvas.draw()  # 标题不参与blit，需要整图重绘
+
+    def _on_draw(self, event):
+        """整图重绘（首次显示、尺寸变化）后缓存背景并补画热力图"""
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.im)
         
     def update_heatmap(self, heatmap_data):
         """更新热力图显示
@@ -94,23 +169,73 @@ class HeatmapPanel(wx.Panel):
         Args:
             heatmap_data (np.ndarray): 6x9的热力图数据
         """
-        if heatmap_data is None:
+        if heatmap_data is None or self.im is None:
             return
-            
-        # 清除当前图像
-        self.ax.clear()
-        
-        # 绘制热力图
-        self.im = self.ax.imshow(heatmap_data, cmap='hot', aspect='auto')
-        self.figure.colorbar(self.im, ax=self.ax)
-        
-        # 设置标题和标签
-        self.ax.set_title('缺陷分布热力图')
-        self.ax.set_xlabel('X轴')
-        self.ax.set_ylabel('Y轴')
-        
-        # 更新画布
-        self.canvas.draw()
+
+        if heatmap_data.shape != self.im.get_array().shape:
+            # 网格尺寸变化时才需要整图重绘
+            rows, cols = heatmap_data.shape
+            self.im.set_data(heatmap_data)
+            self.im.set_extent((-0.5, cols - 0.5, rows - 0.5, -0.5))
+            self.canvas.draw()
+            return
+
+        self.im.set_data(heatmap_data)
+        if self._background is None:
+            self.canvas.draw()
+            return
+
+        # 只重绘热力图区域
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.im)
+        self.canvas.blit(self.ax.bbox)
+
+
+class LogPanelHandler(logging.Handler):
+    """日志面板输出
+
+    任意线程的日志先写入有界环形缓冲区，由主线程定时器批量刷新到TextCtrl，
+    面板中最多保留max_lines行，超出的旧行被删除。
+    """
+    def __init__(self, text_ctrl, max_lines=model_config.UI_LOG_MAX_LINES,
+                 flush_interval=model_config.UI_LOG_FLUSH_INTERVAL, level=logging.INFO):
+        super().__init__(level)
+        self.text_ctrl = text_ctrl
+        self.max_lines = max_lines
+        self.pending = deque(maxlen=max_lines)  # 刷新前最多缓存max_lines条，多余的直接丢弃
+        self.setFormatter(logging.Formatter('%(asctime)s %(message)s', datefmt='%H:%M:%S'))
+
+        self.timer = wx.Timer(text_ctrl)
+        text_ctrl.Bind(wx.EVT_TIMER, self._flush, self.timer)
+        self.timer.Start(flush_interval)
+
+    def emit(self, record):
+        try:
+            self.pending.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def _flush(self, event):
+        """把缓冲的日志一次性追加到面板（主线程）"""
+        if not self.pending:
+            return
+        lines = []
+        while self.pending:
+            lines.append(self.pending.popleft())
+
+        self.text_ctrl.Freeze()
+        try:
+            self.text_ctrl.AppendText('\n'.join(lines) + '\n')
+            # 超出行数上限时删除最旧的行
+            excess = self.text_ctrl.GetNumberOfLines() - 1 - self.max_lines
+            if excess > 0:
+                self.text_ctrl.Remove(0, self.text_ctrl.XYToPosition(0, excess))
+        finally:
+            self.text_ctrl.Thaw()
+
+    def close(self):
+        self.timer.Stop()
+        super().close()
 
 
 class DefectDetectorFrame(wx.Frame):
@@ -131,13 +256,10 @@ class DefectDetectorFrame(wx.Frame):
         # ---------------------------
         self._init_parameters()
 
-        # 渲染任务队列
-        self.render_queue = queue.Queue()
-        self.render_thread = threading.Thread(target=self._render_worker)
-        self.render_thread.daemon = True
-        self.render_thread.start()
+        # 模型和matplotlib在后台线程中加载，窗口先显示，加载完成前不能启动检测
+        self._start_background_loading()
 
-        print("工业缺陷检测系统界面初始化完成")
+        logger.info("工业缺陷检测系统界面初始化完成")
 
     def _init_ui(self):
         """界面布局初始化"""
@@ -155,13 +277,14 @@ class DefectDetectorFrame(wx.Frame):
         # video_sizer.Add(self., 1, wx.EXPAND | wx.ALL, 5)
         # video_panel.SetSizer(video_sizer)
 
-        video_panel = wx.Panel(self)
-        self.video_canvas = VideoCanvas(video_panel)
-        video_sizer = wx.BoxSizer(wx.VERTICAL)
-        video_sizer.Add(self.video_canvas, 1, wx.EXPAND | wx.ALL,5)
-        video_panel.SetSizer(video_sizer)
+        # 每路视频源一个画布，按网格排列，启动检测时按视频源数量重建
+        self.video_panel = wx.Panel(self)
+        self.video_sizer = wx.GridSizer(1, 1, 5, 5)
+        self.video_canvases = []
+        self.video_panel.SetSizer(self.video_sizer)
+        self._build_video_canvases(1)
 
-        main_sizer.Add(video_panel, 7, wx.EXPAND)  # 7:3的宽度比例
+        main_sizer.Add(self.video_panel, 7, wx.EXPAND)  # 7:3的宽度比例
 
         # ================= 右侧控制面板区域 =================
         control_panel = wx.Panel(self, size=(360, 800))
@@ -171,26 +294,29 @@ class DefectDetectorFrame(wx.Frame):
         device_box = wx.StaticBox(control_panel, label="设备控制")
         device_sizer = wx.StaticBoxSizer(device_box, wx.VERTICAL)
 
-        # 视频源选择
+        # 视频源选择（可同时勾选多路）
         source_choice_sizer = wx.BoxSizer(wx.HORIZONTAL)
-        self.cam_choices = wx.Choice(device_box, choices=[
+        self.cam_choices = wx.CheckListBox(device_box, choices=[
             "摄像头 0 (主)",
             "摄像头 1 (辅)",
-            "RTSP流"
+            "RTSP流",
+            "文件回放"
         ])
-        self.cam_choices.SetSelection(0)
-        source_choice_sizer.Add(wx.StaticText(device_box, label="视频源:"), 0, wx.ALIGN_CENTER)
+        self.cam_choices.Check(0)
+        source_choice_sizer.Add(wx.StaticText(device_box, label="视频源:"), 0, wx.ALIGN_TOP)
         source_choice_sizer.Add(self.cam_choices, 1, wx.EXPAND | wx.LEFT, 10)
 
         # 控制按钮组
-        btn_grid = wx.GridSizer(2, 2, 5, 5)  # 2行2列，间距5px
+        btn_grid = wx.GridSizer(3, 2, 5, 5)  # 3行2列，间距5px
         self.btn_start = wx.Button(device_box, label="▶ 启动检测")
         self.btn_stop = wx.Button(device_box, label="⏹ 停止检测")
         self.btn_export = wx.Button(device_box, label="📁 导出报告")
         self.btn_config = wx.Button(device_box, label="⚙ 系统设置")
+        self.btn_export_stats = wx.Button(device_box, label="📊 导出性能统计")
         [btn_grid.Add(btn, 0, wx.EXPAND) for btn in (
             self.btn_start, self.btn_stop,
-            self.btn_export, self.btn_config
+            self.btn_export, self.btn_config,
+            self.btn_export_stats
         )]
 
         # 组装设备控制区块
@@ -229,14 +355,24 @@ class DefectDetectorFrame(wx.Frame):
         self.lbl_defect_count = wx.StaticText(status_box, label="缺陷总数: 0")
         self.lbl_current_type = wx.StaticText(status_box, label="当前缺陷: 无")
 
+        # 各阶段耗时/吞吐量，等宽字体便于对齐
+        self.lbl_stats = wx.StaticText(status_box, label="")
+        self.lbl_stats.SetFont(wx.Font(8, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+
         # 日志输出区域
         self.log_output = wx.TextCtrl(status_box, style=wx.TE_MULTILINE | wx.TE_READONLY)
 
         # 组装状态区块
         status_sizer.Add(self.lbl_defect_count, 0, wx.EXPAND | wx.BOTTOM, 5)
-        status_sizer.Add(self.lbl_current_type, 0, wx.EXPAND | wx.BOTTOM, 10)
+        status_sizer.Add(self.lbl_current_type, 0, wx.EXPAND | wx.BOTTOM, 5)
+        status_sizer.Add(self.lbl_stats, 0, wx.EXPAND | wx.BOTTOM, 10)
         status_sizer.Add(self.log_output, 1, wx.EXPAND)
 
+        # 所有模块的日志经缓冲批量刷新到日志面板
+        self.log_handler = LogPanelHandler(
+            self.log_output, level=FRAME if model_config.DEBUG_MODE else logging.INFO)
+        logging.getLogger().addHandler(self.log_handler)
+
         # 添加热力图显示面板
         self.heatmap_panel = HeatmapPanel(control_panel)
         
@@ -259,6 +395,12 @@ class DefectDetectorFrame(wx.Frame):
         self.btn_start.Bind(wx.EVT_BUTTON, self.on_start_detection)
         self.btn_stop.Bind(wx.EVT_BUTTON, self.on_stop_detection)
         self.btn_export.Bind(wx.EVT_BUTTON, self.on_export_report)
+        self.btn_export_stats.Bind(wx.EVT_BUTTON, self.on_export_stats)
+
+        # 定时刷新性能统计（不随帧刷新）
+        self.stats_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self._update_stats_display, self.stats_timer)
+        self.stats_timer.Start(1000)
 
         # 窗口关闭事件
         self.Bind(wx.EVT_CLOSE, self.on_close_window)
@@ -267,7 +409,11 @@ class DefectDetectorFrame(wx.Frame):
         """系统参数初始化"""
         # 视频流相关
         self.is_detecting = False  # 检测状态标志
-        self.current_stream = None  # 当前视频流对象
+        self.service = None  # 当前检测服务（视频流、流水线和结果汇总）
+        self.result_store = None  # 逐零件的检测结果数据库，首次启动检测时打开，关闭窗口时关闭
+        self.render_queues = []  # 每路视频源的渲染任务队列（只保留最新的帧）
+        self.render_threads = []  # 每路视频源的渲染线程
+        self.stats = PipelineStats()  # 各阶段耗时统计，跨多次启动/停止累计
 
         # 模拟检测参数
         self.defect_types = {
@@ -277,17 +423,18 @@ class DefectDetectorFrame(wx.Frame):
         }
 
         # 状态跟踪
-        self.total_defects = 0  # 累计缺陷数量
         self.current_defect = None  # 当前检测到的缺陷类型
 
-        # 初始化模型
-        self.model1 = Model1(min_confidence=0.5)
-        self.model2 = Model2(num_classes=6, heatmap_size=(6, 9))
+        # 模型：所有视频源共用的推理线程池，每个工作线程持有独立的模型实例，由后台线程加载
+        self.model1_pool = []
+        self.model2_pool = []
+        self.models_ready = False
+        self._models_ready_callbacks = []
         
         # 添加模型状态变量
         self.current_detections = []  # 当前帧的检测结果
         self.current_heatmap = None   # 当前热力图
-        self.defect_counts = [0] * 6  # 各类缺陷计数
+        self.defect_counts = [0] * 6  # 各类缺陷计数（所有视频源合计）
         
         # 添加模型相关参数
         self.slice_size = (6, 9)  # 切片尺寸
@@ -301,173 +448,273 @@ class DefectDetectorFrame(wx.Frame):
         }
 
         # 添加热力图相关参数
-        self.heatmap_update_interval = 0.5  # 热力图更新间隔（秒）
+        self.heatmap_update_interval = 0.5  # 热力图重绘间隔（秒），累计统计不受影响
         self.last_heatmap_update = 0
         
         # 热力图颜色映射
-        self.heatmap_cmap = plt.cm.hot
+        self.heatmap_cmap = 'hot'
         self.heatmap_vmin = 0
         self.heatmap_vmax = 1
 
+    # ---------------------------
+    # 后台加载
+    # ---------------------------
+    def _start_background_loading(self):
+        """显示"模型加载中"状态并启动后台加载线程"""
+        self.btn_start.Disable()
+        self.btn_start.SetLabel("⏳ 模型加载中...")
+        thread = threading.Thread(target=self._load_resources, name="model-loader", daemon=True)
+        thread.start()
+
+    def _load_resources(self):
+        """后台线程：预先导入matplotlib，再按model_config加载模型"""
+        try:
+            import matplotlib.figure  # noqa: F401  首次导入较慢，之后主线程创建图表时直接复用
+            wx.CallAfter(self._on_matplotlib_loaded)
+        except ImportError as e:
+            logger.warning(f"无法导入matplotlib，热力图不可用: {e}")
+
+        try:
+            start = time.perf_counter()
+            workers = max(model_config.INFERENCE_WORKERS, 1)
+            model1_pool = [create_model1() for _ in range(workers)]  # 按model_config加载YOLO权重并预热
+            model2_pool = [create_model2() for _ in range(workers)]  # 按model_config选择torch或ORT后端
+            logger.info(f"[系统] 模型加载完成，耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+            wx.CallAfter(self._on_models_loaded, model1_pool, model2_pool, None)
+        except Exception as e:
+            logger.exception("模型加载失败")
+            wx.CallAfter(self._on_models_loaded, [], [], e)
+
+    def _on_matplotlib_loaded(self):
+        if not self:  # 窗口已关闭
+            return
+        self.heatmap_panel.build()
+
+    def _on_models_loaded(self, model1_pool, model2_pool, error):
+        """模型加载完成（主线程）"""
+        if not self:  # 窗口已关闭
+            return
+        if error is not None:
+            self.btn_start.SetLabel("✖ 模型加载失败")
+            wx.MessageBox(f"模型加载失败: {error}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        self.model1_pool = model1_pool
+        self.model2_pool = model2_pool
+        self.models_ready = True
+        self.btn_start.SetLabel("▶ 启动检测")
+        self.btn_start.Enable()
+        callbacks, self._models_ready_callbacks = self._models_ready_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def call_when_models_ready(self, callback):
+        """模型加载完成后在主线程调用callback（已加载时立即调用）"""
+        if self.models_ready:
+            wx.CallAfter(callback)
+        else:
+            self._models_ready_callbacks.append(callback)
+
     # ---------------------------
     # 事件处理函数（伪代码示例）
     # ---------------------------
     def on_start_detection(self, event):
         """启动检测"""
-        if not self.is_detecting:
-            # 获取选择的视频源
-            source_type = self.cam_choices.GetStringSelection()
+        if not self.is_detecting and self.models_ready:
+            # 获取勾选的视频源
+            source_types = self.cam_choices.GetCheckedStrings()
+            if not source_types:
+                wx.MessageBox("请至少选择一个视频源", "提示", wx.OK | wx.ICON_INFORMATION)
+                return
 
-            # 初始化视频流（示例伪代码）
-            try:
-                if source_type == "RTSP流":
-                    self.current_stream = RTSPStream(address="192.168.1.100")  # 伪代码类
-                else:
-                    cam_id = int(source_type.split()[1])  # 提取摄像头ID
-                    self.current_stream = CameraStream(cam_id)  # 伪代码类
+            sources = []
+            for source_type in source_types:
+                source = self._source_spec(source_type)
+                if source is None:  # 用户取消了文件选择
+                    return
+                sources.append(source)
 
-                # 启动检测线程
-                self.detection_thread = DetectionThread(
-                    stream=self.current_stream,
-                    callback=self.update_ui  # 回调函数，用于更新UI
+            try:
+                # 每路视频源独立的画布、渲染队列和渲染线程
+                self._build_video_canvases(len(sources))
+                self.render_queues = [CoalescingQueue(model_config.RENDER_QUEUE_DEPTH) for _ in sources]
+
+                # 启动检测服务：各路采集线程独立，定位/切片/分类由共享线程池完成并跨视频源合批，
+                # 结果经各自的render_queue交给渲染线程，主线程只负责显示
+                self.service = InspectionService(
+                    sources,
+                    model1s=self.model1_pool,
+                    model2s=self.model2_pool,
+                    slice_grid=self.slice_size,
+                    stats=self.stats
                 )
-                self.detection_thread.start()
+                self.service.add_sink(self._open_result_store().submit)
+                self.service.add_sink(functools.partial(self._enqueue_render, self.render_queues))
+                self.service.start()
+                self._start_render_workers()
 
                 # 更新界面状态
                 self.is_detecting = True
                 self.btn_start.Disable()
                 self.btn_stop.Enable()
-                self.log_output.AppendText(f"[系统] 已启动{source_type}检测\n")
+                logger.info(f"[系统] 已启动检测：{'、'.join(source_types)}")
 
             except Exception as e:
+                self._stop_service()
                 wx.MessageBox(f"启动失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
 
-    def update_ui(self, result):
-        """更新界面显示（伪代码示例）"""
-        # 在主线程更新UI
-        wx.CallAfter(self._process_detection_result, result)
+    def _source_spec(self, source_type):
+        """把界面上的视频源选项转换为检测服务的视频源描述，用户取消时返回None"""
+        if source_type == "RTSP流":
+            return model_config.RTSP_URL
+        if source_type == "文件回放":
+            return self._choose_replay_path()
+        cam_id = int(source_type.split()[1])  # 提取摄像头ID
+        return f"camera:{cam_id}"
+
+    def _open_result_store(self):
+        """打开检测结果数据库（跨多次启动/停止复用）"""
+        if self.result_store is None:
+            self.result_store = ResultStore(model_config.RESULTS_DB_PATH,
+                                            batch_size=model_config.RESULTS_BATCH_SIZE,
+                                            flush_interval=model_config.RESULTS_FLUSH_INTERVAL,
+                                            queue_size=model_config.RESULTS_QUEUE_SIZE)
+            store = self.result_store
+            for name in store.counters():
+                self.stats.add_gauge(name, lambda name=name: store.counters()[name])
+        return self.result_store
+
+    def _stop_service(self):
+        """停止检测服务，再结束渲染线程"""
+        if self.service is not None:
+            self.service.stop()
+        self._stop_render_workers()
+        self.service = None
+
+    def _build_video_canvases(self, count):
+        """按视频源数量重建视频画布网格"""
+        if len(self.video_canvases) == count:
+            return
+        self.video_sizer.Clear(delete_windows=True)
+        cols = math.ceil(math.sqrt(count))
+        self.video_sizer.SetCols(cols)
+        self.video_sizer.SetRows(math.ceil(count / cols))
+        self.video_canvases = [VideoCanvas(self.video_panel) for _ in range(count)]
+        for canvas in self.video_canvases:
+            self.video_sizer.Add(canvas, 1, wx.EXPAND | wx.ALL, 5)
+        self.video_panel.Layout()
+
+    def _choose_replay_path(self):
+        """选择视频文件或图像进行回放，选中图像时回放其所在目录"""
+        wildcard = "视频/图像 (*.mp4;*.avi;*.mkv;*.png;*.jpg;*.bmp)|*.mp4;*.avi;*.mkv;*.png;*.jpg;*.bmp"
+        with wx.FileDialog(self, "选择回放文件", wildcard=wildcard,
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return None
+            path = dlg.GetPath()
+        if path.lower().endswith(('.png', '.jpg', '.bmp')):
+            path = os.path.dirname(path)
+        return path
+
+    @staticmethod
+    def _enqueue_render(render_queues, task: FrameTask):
+        """检测服务的结果回调：交给对应视频源的渲染线程（在服务的结果线程中调用）
 
-    def _render_worker(self):
-        """渲染线程的工作函数"""
+        渲染跟不上时丢弃尚未渲染的旧帧，不阻塞结果线程；计数和热力图已由服务汇总，不受影响。
+        """
+        render_queues[task.camera].put(task)
+
+    def _start_render_workers(self):
+        """为每路视频源启动渲染线程"""
+        self.render_threads = []
+        for camera, render_queue in enumerate(self.render_queues):
+            for name in render_queue.counters():
+                self.stats.add_gauge(self.service.stat_name(camera, name),
+                                     lambda render_queue=render_queue, name=name: render_queue.counters()[name])
+            thread = threading.Thread(target=self._render_worker, args=(camera, render_queue),
+                                      name=f"render-{camera}", daemon=True)
+            thread.start()
+            self.render_threads.append(thread)
+
+    def _stop_render_workers(self):
+        """关闭各渲染队列（丢弃未渲染的帧并发送结束信号），等待渲染线程退出"""
+        for camera, (render_queue, thread) in enumerate(zip(self.render_queues, self.render_threads)):
+            render_queue.close()
+            thread.join(timeout=1)
+            if thread.is_alive():
+                logger.warning(f"渲染线程 {thread.name} 未响应结束信号")
+            if render_queue.dropped:
+                logger.info(f"[渲染] 视频源{camera} 共丢弃 {render_queue.dropped} 帧过时的渲染任务")
+            if self.service is not None and self.service.pipeline is not None:
+                for name in render_queue.counters():
+                    self.stats.remove_gauge(self.service.stat_name(camera, name))
+        self.render_queues = []
+        self.render_threads = []
+
+    def _render_worker(self, camera, render_queue):
+        """渲染线程的工作函数（每路视频源一个）"""
+        canvas = self.video_canvases[camera]
+        render_stat = self.service.stat_name(camera, 'render')
         while True:
             try:
                 # 从队列中获取渲染任务
-                frame, boxes = self.render_queue.get(timeout=1)
-                if frame is None:
+                task = render_queue.get(timeout=1)
+                if task is None:
                     break
 
-                # 创建副本帧用于绘制
-                overlay_frame = frame.copy()
-
-                # 绘制边界框
-                for box, label, color in boxes:
-                    x1, y1, x2, y2 = map(int, box)
-                    cv2.rectangle(overlay_frame, (x1, y1), (x2, y2), color, 2)
-                    
-                    # 添加标签
-                    label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
-                    cv2.rectangle(overlay_frame, (x1, y1 - 20), (x1 + label_size[0], y1), color, -1)
-                    cv2.putText(overlay_frame, label, (x1, y1 - 5), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+                # 缩放到画布尺寸并绘制边界框（写入画布的预分配缓冲区）
+                with self.stats.time(render_stat):
+                    canvas.render(task.frame, prepare_boxes(task.detections))
 
                 # 在主线程中更新UI
-                wx.CallAfter(self.show_frame, overlay_frame)
+                wx.CallAfter(self._process_detection_result, task)
             except queue.Empty:
                 continue
-            except Exception as e:
-                print(f"渲染线程出错: {str(e)}")
-                traceback.print_exc()
+            except Exception:
+                logger.exception("渲染线程出错")
 
-    def _process_detection_result(self, result):
-        """处理检测结果，添加红色大框、蓝色小框，并控制渲染持续不短于1秒"""
-        try:
-            if result is None or 'frame' not in result:
-                print("警告：接收到无效的检测结果")
-                return
+    def _process_detection_result(self, task: FrameTask):
+        """处理流水线产出的检测结果（仅在主线程调用）
 
-            frame = result['frame']
-            
-            # 使用Model1检测零件
-            detections, cropped_images = self.model1.detect_and_crop(frame)
-            self.current_detections = detections
-            
-            # 处理每个检测到的零件
-            for i, (detection, cropped) in enumerate(zip(detections, cropped_images)):
-                if not detection.valid:
-                    continue
-                    
-                # 将零件区域切片
-                slices = self._slice_image(cropped)
-                
-                # 使用Model2进行缺陷分类
-                classification_result = self.model2.classify_slices(slices)
-                
-                # 更新缺陷计数
-                for defect_type in classification_result['defect_types']:
-                    self.defect_counts[defect_type] += 1
-                
-                # 更新热力图
-                current_time = time.time()
-                if current_time - self.last_heatmap_update >= self.heatmap_update_interval:
-                    self.current_heatmap = classification_result['heatmap']
-                    wx.CallAfter(self.heatmap_panel.update_heatmap, self.current_heatmap)
-                    self.last_heatmap_update = current_time
-                
-                # 更新UI显示
-                wx.CallAfter(self._update_status_display)
-            
-            # 将渲染任务放入队列
-            self.render_queue.put((frame.copy(), self._prepare_boxes(detections)))
-
-        except Exception as e:
-            print(f"处理检测结果时出错：{str(e)}")
-            traceback.print_exc()
+        模型推理和帧渲染已在后台完成，这里只负责显示渲染好的帧并更新计数和热力图。
 
-    def _slice_image(self, image: np.ndarray) -> List[np.ndarray]:
-        """将图像均匀切割为6x9=54个切片
-        
         Args:
-            image (np.ndarray): 输入图像
-            
-        Returns:
-            List[np.ndarray]: 54个切片图像列表
+            task (FrameTask): 已渲染的帧任务
         """
-        height, width = image.shape[:2]
-        slice_h = height // self.slice_size[0]
-        slice_w = width // self.slice_size[1]
-        
-        slices = []
-        for i in range(self.slice_size[0]):
-            for j in range(self.slice_size[1]):
-                y1 = i * slice_h
-                y2 = (i + 1) * slice_h
-                x1 = j * slice_w
-                x2 = (j + 1) * slice_w
-                slice_img = image[y1:y2, x1:x2].copy()
-                slices.append(slice_img)
-        
-        return slices
-
-    def _prepare_boxes(self, detections: List[DetectionResult]) -> List[Tuple]:
-        """准备绘制边界框的数据
-        
-        Args:
-            detections (List[DetectionResult]): 检测结果列表
-            
-        Returns:
-            List[Tuple]: 包含(bbox, label, color)的列表
-        """
-        boxes = []
-        for det in detections:
-            if not det.valid:
-                continue
-                
-            # 根据置信度选择颜色
-            color = (0, 255, 0) if det.confidence >= 0.8 else (0, 165, 255)
-            label = f"Part {det.confidence:.2f}"
-            boxes.append((det.bbox, label, color))
-        
-        return boxes
+        try:
+            if self.service is None or task.camera >= len(self.video_canvases):
+                return  # 检测已停止
+            with self.stats.time('display'):
+                self.video_canvases[task.camera].present()
+            # 从快门到显示的端到端延迟（按视频源统计）
+            self.stats.record(self.service.stat_name(task.camera, 'e2e'), time.time() - task.timestamp)
+
+            self.current_detections = task.detections
+            if not task.classifications:
+                return
+            # 各视频源的缺陷计数由服务汇总，显示合计值
+            self.defect_counts = self.service.aggregator.total_defect_counts()
+
+            # 更新热力图：每个零件都已由服务累计，这里只限制重绘频率
+            self.current_heatmap = task.heatmap
+            current_time = time.time()
+            if current_time - self.last_heatmap_update >= self.heatmap_update_interval:
+                self.heatmap_panel.update_heatmap(self._heatmap_view())
+                self.last_heatmap_update = current_time
+
+            # 更新UI显示
+            self._update_status_display()
+
+        except Exception:
+            logger.exception("处理检测结果时出错")
+
+    def _heatmap_view(self):
+        """按热力图面板当前的显示内容取数据（固定大小的数组，开销与累计的零件数无关）"""
+        heatmaps = self.service.aggregator.heatmaps
+        if self.heatmap_panel.mode == 'latest' or heatmaps is None:
+            return self.current_heatmap
+        if self.heatmap_panel.mode == 'frequency':
+            return heatmaps.frequency()
+        return heatmaps.intensity()
 
     def _update_status_display(self):
         """更新状态显示"""
@@ -480,93 +727,83 @@ class DefectDetectorFrame(wx.Frame):
             max_defect = np.argmax(self.defect_counts[1:]) + 1
             self.lbl_current_type.SetLabel(f"当前缺陷: 类型{max_defect}")
             
-            # 添加热力图统计信息
-            heatmap_mean = np.mean(self.current_heatmap)
-            heatmap_max = np.max(self.current_heatmap)
-            self.log_output.AppendText(f"[热力图] 平均强度: {heatmap_mean:.2f}, 最大强度: {heatmap_max:.2f}\n")
+            # 添加热力图统计信息（逐帧日志，仅调试模式输出）
+            if logger.isEnabledFor(FRAME):
+                heatmap_mean = np.mean(self.current_heatmap)
+                heatmap_max = np.max(self.current_heatmap)
+                logger.log(FRAME, f"[热力图] 平均强度: {heatmap_mean:.2f}, 最大强度: {heatmap_max:.2f}")
         
         # 更新日志
-        self.log_output.AppendText(f"[系统] 检测到 {len(self.current_detections)} 个零件\n")
-
-    def show_frame(self, frame):
-        """显示视频帧"""
-        try:
-            if frame is None:
-                print("警告：接收到空帧")
-                return
-            
-            # 调整图像大小以适应显示区域
-            height, width = frame.shape[:2]
-            # 假设显示区域大小为840x600
-            target_width = 840
-            target_height = 600
-            
-            # 计算缩放比例
-            scale = min(target_width/width, target_height/height)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            
-            # 缩放图像
-            frame = cv2.resize(frame, (new_width, new_height))
-            print(f"缩放后帧尺寸: {frame.shape}")
-            
-            # 确保图像为RGB格式
-            if len(frame.shape) == 2:  # 灰度图像
-                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
-            elif frame.shape[2] == 4:  # RGBA图像
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2RGB)
-            print(f"转换后帧尺寸: {frame.shape}, 通道数: {frame.shape[2]}")
-            
-            # 转换为wx格式
-            wx_image = wx.Bitmap.FromBuffer(new_width, new_height, frame)
-            print(f"wx.Bitmap创建成功: {wx_image.IsOk()}")
-            
-            # 使用VideoCanvas更新显示
-            self.video_canvas.update_frame(wx_image)
-            print("视频帧已成功更新到画布")
-            
-        except Exception as e:
-            print(f"显示帧时出错：{str(e)}")
-        traceback.print_exc()
+        if logger.isEnabledFor(FRAME):
+            logger.log(FRAME, f"[系统] 检测到 {len(self.current_detections)} 个零件")
 
     def on_stop_detection(self, event):
         """停止检测"""
         if self.is_detecting:
             try:
-                if self.current_stream:
-                    self.current_stream.stop()  # 停止视频流
-                if hasattr(self, 'detection_thread'):
-                    self.detection_thread.stop()  # 停止检测线程
-                    self.detection_thread.join()  # 等待线程结束
+                self._stop_service()  # 停止视频流、检测流水线和渲染线程
 
                 # 重置状态
                 self.is_detecting = False
                 self.btn_stop.Disable()
                 self.btn_start.Enable()
-                self.log_output.AppendText("[系统] 检测已停止\n")
+                logger.info("[系统] 检测已停止")
             except Exception as e:
-                self.log_output.AppendText(f"[错误] 停止检测时出错: {str(e)}\n")
+                logger.error(f"[错误] 停止检测时出错: {str(e)}")
 
     def on_export_report(self, event):
-        """导出检测报告（伪代码）"""
-        # 示例保存路径选择对话框
-        with wx.FileDialog(self, "保存报告", wildcard="CSV文件 (*.csv)|*.csv") as dlg:
+        """把检测结果数据库导出为CSV报告（后台线程逐批读取写入，不阻塞界面）"""
+        db_path = model_config.RESULTS_DB_PATH
+        if not os.path.exists(db_path):
+            wx.MessageBox("还没有检测结果", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        with wx.FileDialog(self, "保存报告", wildcard="CSV文件 (*.csv)|*.csv",
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            save_path = dlg.GetPath()
+        threading.Thread(target=self._export_report, args=(db_path, save_path),
+                         name="export-report", daemon=True).start()
+
+    @staticmethod
+    def _export_report(db_path, save_path):
+        """导出线程：检测进行中导出时只包含已写入数据库的记录（最多滞后RESULTS_FLUSH_INTERVAL秒）"""
+        try:
+            count = export_csv(db_path, save_path)
+            logger.info(f"[系统] 报告已导出至 {save_path}（{count} 个零件）")
+        except Exception:
+            logger.exception(f"[错误] 导出报告失败: {save_path}")
+
+    def _update_stats_display(self, event):
+        """刷新状态区的性能统计"""
+        self.lbl_stats.SetLabel(self.stats.format_summary())
+        self.lbl_stats.GetParent().Layout()
+
+    def on_export_stats(self, event):
+        """导出性能统计（CSV或JSON）"""
+        with wx.FileDialog(self, "保存性能统计", wildcard="CSV文件 (*.csv)|*.csv|JSON文件 (*.json)|*.json",
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dlg:
             if dlg.ShowModal() == wx.ID_OK:
                 save_path = dlg.GetPath()
-                generate_report(self.total_defects, save_path)  # 伪代码函数
-                self.log_output.AppendText(f"[系统] 报告已导出至 {save_path}\n")
+                if save_path.lower().endswith('.json'):
+                    self.stats.export_json(save_path)
+                else:
+                    self.stats.export_csv(save_path)
+                logger.info(f"[系统] 性能统计已导出至 {save_path}")
 
     def on_close_window(self, event):
         """安全关闭窗口"""
         if self.is_detecting:
             self.on_stop_detection(None)
+        self.stats_timer.Stop()
+        if self.result_store is not None:
+            self.result_store.close()
+        logging.getLogger().removeHandler(self.log_handler)
+        self.log_handler.close()
         self.Destroy()
 
 
 # ================= 伪代码类/函数示例 =================
-def RTSPStream(address):
-    pass
-
 def draw_defect_rect(frame, box, label, color):
     """在图像上绘制缺陷检测框,label为缺陷类型,box为坐标(x1,y1,x2,y2),frame为图像"""
     # 确保操作的是输入帧，不会修改原始图像
@@ -585,89 +822,37 @@ def draw_defect_rect(frame, box, label, color):
     
     return frame  # 返回修改后的帧
 
-def generate_report(total_defects, save_path):
-    pass
-
-class CameraStream:
-    """模拟摄像头流类"""
-    def __init__(self, cam_id):
-        self.cam_id = cam_id
-        self.is_running = True
-        print(f"正在尝试打开摄像头 {cam_id}")  # 添加调试信息
-        
-        # 初始化摄像头
-        self.cap = cv2.VideoCapture(cam_id)
-        if not self.cap.isOpened():
-            print(f"摄像头 {cam_id} 打开失败")  # 添加调试信息
-            raise Exception(f"无法打开摄像头 {cam_id}")
-        else:
-            print(f"摄像头 {cam_id} 打开成功")  # 添加调试信息
-            
-        # 设置摄像头参数
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
-    def read(self):
-        if not self.is_running:
-            print("摄像头流已停止")
-            return None
-            
-        try:
-            ret, frame = self.cap.read()
-            if not ret:
-                print("警告：无法从摄像头读取帧")
-                return None
-                
-            # 打印帧信息
-            print(f"成功读取帧，尺寸: {frame.shape}, 类型: {frame.dtype}")
-            
-            # 将BGR转换为RGB格式
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            print(f"转换后帧信息，尺寸: {frame.shape}, 类型: {frame.dtype}")
-            
-            return {
-                'frame': frame,
-                'defect_found': np.random.choice([True, False]),
-                'defect_type': np.random.choice(["凸起", "缺失", "变形"]),
-                'position': (100, 100, 200, 200)
-            }
-        except Exception as e:
-            print(f"读取摄像头帧时发生错误: {str(e)}")
-            traceback.print_exc()
-            return None
-        
-    def stop(self):
-        """停止摄像头"""
-        self.is_running = False
-        if self.cap is not None:
-            self.cap.release()
-
-class DetectionThread(threading.Thread):
-    """检测线程"""
-    def __init__(self, stream, callback):
-        super().__init__()
-        self.stream = stream
-        self.callback = callback
-        self.running = True  # 添加运行状态标志
-        
-    def run(self):
-        """线程运行函数"""
-        while self.running:
-            try:
-                result = self.stream.read()
-                if result is None:  # 如果流已停止
-                    break
-                self.callback(result)
-            except Exception as e:
-                print(f"检测线程错误: {str(e)}")
-                break
-                
-    def stop(self):
-        """停止线程"""
-        self.running = False
+def main():
+    parser = argparse.ArgumentParser(description="工业缺陷检测系统")
+    parser.add_argument('--startup-benchmark', action='store_true',
+                        help="测量启动耗时（窗口显示、模型加载完成），以JSON输出到标准输出后退出")
+    args = parser.parse_args()
+    configure_logging()
+    imported = time.perf_counter()
 
-if __name__ == "__main__":
     app = wx.App()
     frame = DefectDetectorFrame(None, "工业缺陷检测系统")
     frame.Show()
-    app.MainLoop()
\ No newline at end of file
+
+    if args.startup_benchmark:
+        # 各时刻均相对于模块开始导入；shown_at/ready_at为绝对时间，供父进程计算含解释器启动的总耗时
+        times = {'import_ms': (imported - _MODULE_START) * 1000}
+
+        def on_shown():
+            times['shown_ms'] = (time.perf_counter() - _MODULE_START) * 1000
+            times['shown_at'] = time.time()
+
+        def on_models_ready():
+            times['models_ready_ms'] = (time.perf_counter() - _MODULE_START) * 1000
+            times['ready_at'] = time.time()
+            print(json.dumps(times), flush=True)
+            frame.Close()
+
+        wx.CallAfter(on_shown)  # 事件循环开始处理的第一批事件，此时窗口已显示
+        frame.call_when_models_ready(on_models_ready)
+
+    app.MainLoop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""benchmark.py: 基于内置数据集的离线基准测试（不启动wx）
+
+把 dataset/output、dataset/output2 中的零件图像（由 tile_r_c.png 拼回整图）
+以及 YOLODataset/labels 各划分对应的图像作为视频流，统计每种后端、每种批次大小下的
+帧率、各阶段耗时分位数和峰值内存，并写出JSON结果，便于上线前对比改动。
+
+两种模式：
+
+- ``pipeline``（默认）: 与界面相同，由InspectionService按model_config构建检测流水线
+  （零件跟踪、切片结果缓存的开关和参数都与界面一致），结果回调中渲染。
+  与界面的差别：使用线程池（不启用多进程模式）、不写结果数据库、渲染在结果线程中同步进行；
+  运动门控默认关闭，避免把回放或静止画面上被跳过的帧计入推理吞吐量，
+  --motion-gating 开启后在帧率旁输出门控跳过的比例
+- ``stages``: 在单线程中直接依次调用 Model1 -> 切片 -> Model2 -> 渲染，
+  不经过跟踪、切片结果缓存和运动门控，每帧每个零件都完整推理，只用于比较模型和切片本身的开销
+
+--repeat 让每幅图像连续出现多帧，模拟零件在相机下停留，跟踪和运动门控只在这种情况下起作用。
+
+每个配置在独立的子进程中运行，峰值内存互不影响。
+
+--startup-runs 另外测量界面的冷启动耗时：多次启动
+``python -m wxpython.DefectDetector --startup-benchmark``，记录从创建进程到窗口显示、
+到模型加载完成的时间（需要安装wx）。
+
+用法::
+
+    python -m wxpython.benchmark --backends mock ort --batch-sizes 1 4 --frames 200
+    python -m wxpython.benchmark --modes pipeline stages --repeat 10
+    python -m wxpython.benchmark --repeat 10 --motion-gating
+    python -m wxpython.benchmark --backends mock --startup-runs 5
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from wxpython import model_config
+from wxpython.log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+DATASET_ROOTS = ('./dataset/output', './dataset/output2')
+YOLO_ROOT = './产品位置检测模型+切割算法/YOLODataset'
+YOLO_SPLITS = ('train', 'val', 'test')
+BACKENDS = ('mock', 'torch', 'ort')
+MODES = ('pipeline', 'stages')
+DISPLAY_SIZE = (840, 600)  # 与界面视频区域一致
+
+_TILE_PATTERN = re.compile(r'tile_(\d+)_(\d+)\.(png|jpg|bmp)$')
+_IMAGE_EXTS = ('.png', '.jpg', '.bmp')
+
+
+# ---------------------------
+# 数据集读取
+# ---------------------------
+def assemble_tiles(tile_dir: str) -> Optional[np.ndarray]:
+    """把目录中的 tile_r_c 切片按行列拼回整幅零件图像（BGR）"""
+    tiles = {}
+    for name in os.listdir(tile_dir):
+        match = _TILE_PATTERN.match(name)
+        if match:
+            tiles[int(match.group(1)), int(match.group(2))] = os.path.join(tile_dir, name)
+    if not tiles:
+        return None
+    rows = max(r for r, _ in tiles) + 1
+    cols = max(c for _, c in tiles) + 1
+    if len(tiles) != rows * cols:
+        logger.warning(f"{tile_dir} 切片不完整，跳过")
+        return None
+    grid = [[cv2.imread(tiles[r, c]) for c in range(cols)] for r in range(rows)]
+    return np.concatenate([np.concatenate(row, axis=1) for row in grid], axis=0)
+
+
+def iter_dataset_images(roots: Sequence[str] = DATASET_ROOTS) -> Iterator[Tuple[str, np.ndarray]]:
+    """遍历 <root>/<编号>/tile_r_c.png 数据集，返回 (名称, RGB整图)"""
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for name in sorted(os.listdir(root), key=lambda n: (len(n), n)):
+            tile_dir = os.path.join(root, name)
+            if not os.path.isdir(tile_dir):
+                continue
+            image = assemble_tiles(tile_dir)
+            if image is not None:
+                yield f"{root}/{name}", cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def iter_yolo_images(yolo_root: str = YOLO_ROOT,
+                     splits: Sequence[str] = YOLO_SPLITS) -> Iterator[Tuple[str, np.ndarray]]:
+    """遍历YOLO标注划分（labels/<split>/*.txt）对应的 images/<split> 图像，缺失的图像跳过"""
+    for split in splits:
+        label_dir = os.path.join(yolo_root, 'labels', split)
+        if not os.path.isdir(label_dir):
+            continue
+        for label in sorted(os.listdir(label_dir)):
+            stem, ext = os.path.splitext(label)
+            if ext != '.txt':
+                continue
+            for image_ext in _IMAGE_EXTS:
+                path = os.path.join(yolo_root, 'images', split, stem + image_ext)
+                if os.path.exists(path):
+                    image = cv2.imread(path)
+                    if image is not None:
+                        yield f"{split}/{stem}", cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                    break
+
+
+def load_images(max_images: int) -> List[np.ndarray]:
+    images = []
+    for source in (iter_dataset_images(), iter_yolo_images()):
+        for _, image in source:
+            images.append(image)
+            if len(images) >= max_images:
+                return images
+    return images
+
+
+class DatasetStream:
+    """把数据集图像作为视频流（不等待），接口与streams中的视频流相同
+
+    Args:
+        images (List[np.ndarray]): RGB图像，循环使用
+        frames (int): 输出的总帧数
+        repeat (int): 每幅图像连续输出的帧数
+    """
+
+    def __init__(self, images: List[np.ndarray], frames: int, repeat: int = 1):
+        self.images = images
+        self.frames = frames
+        self.repeat = max(repeat, 1)
+        self.frame_index = 0
+
+    def read(self) -> Optional[Dict]:
+        if self.frame_index >= self.frames:
+            return None
+        frame = self.images[(self.frame_index // self.repeat) % len(self.images)]
+        self.frame_index += 1
+        return {'frame': frame, 'timestamp': time.time()}
+
+    def stop(self):
+        self.frames = 0
+
+
+# ---------------------------
+# 单个配置的测试
+# ---------------------------
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB），无法获取时返回None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def select_backend(backend: str):
+    """修改model_config以选择推理后端（只在子进程中调用）"""
+    if backend == 'mock':
+        model_config.INFERENCE_RUNTIME, model_config.MODEL1_BACKEND = 'torch', 'mock'
+    elif backend == 'torch':
+        model_config.INFERENCE_RUNTIME, model_config.MODEL1_BACKEND = 'torch', 'yolo'
+    elif backend == 'ort':
+        model_config.INFERENCE_RUNTIME = 'ort'
+    else:
+        raise ValueError(f"未知后端: {backend}")
+
+
+def run_config(backend: str, batch_size: int, frames: int, max_images: int,
+               slice_grid: Tuple[int, int], mode: str = 'pipeline', repeat: int = 1,
+               motion_gating: bool = False) -> Dict:
+    """在当前进程中运行一个(后端, 批次大小)配置
+
+    batch_size为一次送入Model2的最多帧数，这些帧中所有有效零件的切片合并为一个批次。
+    motion_gating只对pipeline模式有效。
+    """
+    configure_logging(debug=False, level=logging.WARNING)
+    select_backend(backend)
+    model_config.MOTION_GATE_ENABLED = motion_gating and mode == 'pipeline'
+
+    # 延迟导入，保证后端选择在模型创建之前生效
+    from wxpython.model_interface import create_model1, create_model2
+    from wxpython.render import FrameRenderer
+    from wxpython.stats import PipelineStats
+
+    images = load_images(max_images)
+    if not images:
+        raise RuntimeError("未找到可用的数据集图像")
+
+    # 与界面一样，每个定位/分类工作线程各一组模型实例（stages模式只使用第一组）
+    workers = max(model_config.INFERENCE_WORKERS, 1) if mode == 'pipeline' else 1
+    load_start = time.perf_counter()
+    model1s = [create_model1() for _ in range(workers)]
+    model2s = [create_model2() for _ in range(workers)]
+    load_ms = (time.perf_counter() - load_start) * 1000
+    renderer = FrameRenderer(DISPLAY_SIZE)
+    stats = PipelineStats(window=max(frames, 1))
+
+    run = _run_pipeline if mode == 'pipeline' else _run_stages
+    start = time.perf_counter()
+    gauges = run(model1s, model2s, renderer, stats, DatasetStream(images, frames, repeat), batch_size, slice_grid)
+    elapsed = time.perf_counter() - start
+    skip_rates = [value for name, value in gauges.items() if name.endswith('gate_skip_rate')]
+
+    return {
+        'backend': backend,
+        'mode': mode,
+        'model1': type(model1s[0]).__name__,
+        'model2': type(model2s[0]).__name__,
+        'batch_size': batch_size,
+        'frames': frames,
+        'repeat': repeat,
+        'images': len(images),
+        'elapsed_s': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'motion_gating': model_config.MOTION_GATE_ENABLED,
+        'gate_skip_rate': float(np.mean(skip_rates)) if skip_rates else None,  # fps中不经过推理的帧的比例
+        'model_load_ms': load_ms,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': stats.snapshot()['stages'],
+        'gauges': gauges,
+    }
+
+
+def _run_pipeline(model1s, model2s, renderer, stats, stream: DatasetStream, batch_size: int,
+                  slice_grid: Tuple[int, int]) -> Dict:
+    """与界面相同的检测服务路径，每帧结果在结果回调中渲染，返回结束时的实时指标（跟踪、门控计数等）"""
+    from wxpython.render import prepare_boxes
+    from wxpython.service import InspectionService
+
+    def render(task):
+        with stats.time('render'):
+            renderer.render(task.frame, prepare_boxes(task.detections))
+
+    service = InspectionService([stream], model1s=model1s, model2s=model2s, max_batch_frames=batch_size,
+                                slice_grid=slice_grid, stats=stats, processes=0)
+    service.add_sink(render)
+    service.start()
+    try:
+        service.wait()
+        return stats.snapshot()['gauges']  # 停止后流水线会移除这些指标
+    finally:
+        service.stop()
+
+
+def _run_stages(model1s, model2s, renderer, stats, stream: DatasetStream, batch_size: int,
+                slice_grid: Tuple[int, int]) -> Dict:
+    """单线程依次调用各阶段，不经过跟踪、切片结果缓存和运动门控"""
+    from wxpython.render import prepare_boxes
+    from wxpython.tiling import tile_image
+
+    model1, model2 = model1s[0], model2s[0]
+    pending = []
+
+    def flush():
+        parts = [tiles for _, _, part_tiles in pending for tiles in part_tiles]
+        if parts:
+            with stats.time('stack'):
+                batch = model2.stack_slices(parts)
+            with stats.time('classify'):
+                model2.classify_batch(batch)
+        for frame, detections, _ in pending:
+            with stats.time('render'):
+                renderer.render(frame, prepare_boxes(detections))
+        pending.clear()
+
+    while True:
+        item = stream.read()
+        if item is None:
+            break
+        frame = item['frame']
+        with stats.time('locate'):
+            detections, crops = model1.locate(frame, model_config.LOCATE_WORKING_WIDTH)
+        with stats.time('slice'):
+            part_tiles = [tile_image(crop, *slice_grid)[0] for crop in crops]
+        pending.append((frame, detections, part_tiles))
+        if len(pending) >= batch_size:
+            flush()
+    flush()
+    return {}
+
+
+def run_all(backends: Sequence[str], batch_sizes: Sequence[int], frames: int,
+            max_images: int, slice_grid: Tuple[int, int], modes: Sequence[str] = ('pipeline',),
+            repeat: int = 1, motion_gating: bool = False) -> List[Dict]:
+    """依次在独立子进程中运行所有配置"""
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for mode in modes:
+        for backend in backends:
+            for batch_size in batch_sizes:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    future = executor.submit(run_config, backend, batch_size, frames, max_images, slice_grid,
+                                             mode, repeat, motion_gating)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"配置 {mode}/{backend}/batch={batch_size} 运行失败: {e}")
+                        result = {'backend': backend, 'mode': mode, 'batch_size': batch_size, 'error': str(e)}
+                results.append(result)
+                logger.info(format_result(result))
+    return results
+
+
+# ---------------------------
+# 界面启动耗时
+# ---------------------------
+def measure_startup(runs: int, timeout: float = 120.0) -> Dict:
+    """多次冷启动界面，统计窗口显示和模型加载完成的耗时（毫秒，含解释器启动）"""
+    samples = []
+    for i in range(runs):
+        spawned = time.time()
+        try:
+            proc = subprocess.run([sys.executable, '-m', 'wxpython.DefectDetector', '--startup-benchmark'],
+                                  capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.error(f"第 {i + 1} 次启动超时")
+            continue
+        lines = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+        if proc.returncode != 0 or not lines:
+            logger.error(f"第 {i + 1} 次启动失败: {proc.stderr.strip()[-500:]}")
+            continue
+        times = json.loads(lines[-1])
+        samples.append({
+            'window_shown_ms': (times['shown_at'] - spawned) * 1000,
+            'models_ready_ms': (times['ready_at'] - spawned) * 1000,
+            'import_ms': times['import_ms'],
+        })
+    if not samples:
+        return {'runs': runs, 'error': "所有启动均失败"}
+    result = {'runs': runs, 'samples': samples}
+    for key in ('window_shown_ms', 'models_ready_ms', 'import_ms'):
+        result[f"{key}_median"] = float(np.median([sample[key] for sample in samples]))
+    logger.info(f"界面启动: 窗口显示 {result['window_shown_ms_median']:.0f} ms，"
+                f"模型就绪 {result['models_ready_ms_median']:.0f} ms（{len(samples)}/{runs} 次中位数）")
+    return result
+
+
+def format_result(result: Dict) -> str:
+    name = f"{result['mode']:<8} {result['backend']:<6} batch={result['batch_size']:<3}"
+    if 'error' in result:
+        return f"{name} 失败: {result['error']}"
+    stages = '  '.join(f"{name} p50/p95/p99 {s['p50_ms']:.1f}/{s['p95_ms']:.1f}/{s['p99_ms']:.1f}ms"
+                       for name, s in result['stages'].items())
+    rss = f"{result['peak_rss_mb']:.0f}MB" if result['peak_rss_mb'] is not None else "n/a"
+    gated = f"（门控跳过 {result['gate_skip_rate']:.1%}）" if result.get('gate_skip_rate') is not None else ""
+    return (f"{name} {result['fps']:7.1f} fps{gated}  "
+            f"峰值内存 {rss}  {stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试（不启动wx）")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=['pipeline'],
+                        help="pipeline: 与界面相同的检测流水线；stages: 不经过跟踪、缓存和门控的逐阶段调用")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['mock'])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 4])
+    parser.add_argument('--frames', type=int, default=200, help="每个配置处理的帧数（循环使用数据集图像）")
+    parser.add_argument('--max-images', type=int, default=40, help="最多载入的数据集图像数")
+    parser.add_argument('--repeat', type=int, default=1, help="每幅图像连续出现的帧数（模拟零件停留）")
+    parser.add_argument('--motion-gating', action='store_true',
+                        help="pipeline模式中启用运动门控（帧率包含被跳过的帧，同时输出跳过比例）")
+    parser.add_argument('--startup-runs', type=int, default=0, help="测量界面冷启动耗时的次数，0表示不测量")
+    parser.add_argument('--output', default='bench_results.json', help="JSON结果输出路径")
+    args = parser.parse_args()
+    configure_logging(debug=False)
+
+    slice_grid = (6, 9)
+    results = run_all(args.backends, args.batch_sizes, args.frames, args.max_images, slice_grid,
+                      args.modes, args.repeat, args.motion_gating)
+    startup = measure_startup(args.startup_runs) if args.startup_runs > 0 else None
+    report = {
+        'timestamp': time.time(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'inference_threads': model_config.INFERENCE_THREADS,
+        'args': vars(args),
+        'results': results,
+        'startup': startup,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info(f"基准测试结果已写入 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""export_models.py: 将Model1/Model2权重导出为ONNX，供无GPU的检测工位使用
+
+导出后在model_config.py中设置 INFERENCE_RUNTIME = "ort" 即可切换到ONNX Runtime推理。
+Model2必须是切片分类模型（YOLO分类任务，输出 (N, 类别数) 的概率），
+检测或分割权重的输出格式与OrtModel2不兼容，导出时会直接报错。
+
+用法::
+
+    python -m wxpython.export_models              # 导出FP32 ONNX
+    python -m wxpython.export_models --int8       # 额外生成INT8量化模型（用dataset/output切片校准）
+"""
+import argparse
+import logging
+import os
+import shutil
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+from wxpython import model_config
+from wxpython.log_config import configure_logging
+from wxpython.model_interface import letterbox
+
+logger = logging.getLogger(__name__)
+
+
+def export_onnx(weights: str, output_path: str, imgsz: int, dynamic: bool,
+                task: Optional[str] = None) -> str:
+    """用Ultralytics将.pt权重导出为ONNX并移动到output_path
+
+    Args:
+        task (str, optional): 要求的模型任务类型（如'classify'），与权重不符时抛出ValueError
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    if task is not None and model.task != task:
+        raise ValueError(f"{weights} 是 {model.task} 模型，这里需要 {task} 模型")
+    exported = model.export(format='onnx', imgsz=imgsz, dynamic=dynamic,
+                            simplify=True, device='cpu')
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    shutil.move(exported, output_path)
+    logger.info(f"已导出 {weights} -> {output_path}")
+    return output_path
+
+
+def iter_calibration_images(calib_dir: str, limit: int) -> Iterator[np.ndarray]:
+    """遍历校准目录（如dataset/output/<n>/tile_r_c.png）中的图像，返回RGB数组"""
+    count = 0
+    for root, _, files in sorted(os.walk(calib_dir)):
+        for name in sorted(files):
+            if not name.endswith(('.png', '.jpg', '.bmp')):
+                continue
+            image = cv2.imread(os.path.join(root, name))
+            if image is None:
+                continue
+            yield cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            count += 1
+            if count >= limit:
+                return
+
+
+class TileCalibrationReader:
+    """INT8静态量化的校准数据读取器，预处理与推理时保持一致"""
+
+    def __init__(self, onnx_path: str, calib_dir: str, imgsz: int, use_letterbox: bool, limit: int):
+        import onnxruntime as ort
+
+        self.input_name = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+        self.images = iter_calibration_images(calib_dir, limit)
+        self.imgsz = imgsz
+        self.use_letterbox = use_letterbox
+
+    def get_next(self) -> Optional[dict]:
+        image = next(self.images, None)
+        if image is None:
+            return None
+        if self.use_letterbox:
+            image = letterbox(image, self.imgsz)[0]
+        else:
+            image = cv2.resize(image, (self.imgsz, self.imgsz), interpolation=cv2.INTER_AREA)
+        tensor = (image.transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+        return {self.input_name: tensor}
+
+
+def quantize_int8(onnx_path: str, output_path: str, calib_dir: str, imgsz: int,
+                  use_letterbox: bool, limit: int = 200) -> str:
+    """用校准图像对ONNX模型做INT8静态量化"""
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    reader = TileCalibrationReader(onnx_path, calib_dir, imgsz, use_letterbox, limit)
+    quantize_static(onnx_path, output_path, reader, quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    logger.info(f"已量化 {onnx_path} -> {output_path}")
+    return output_path
+
+
+def _int8_path(path: str) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.int8{ext}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出Model1/Model2为ONNX")
+    parser.add_argument('--int8', action='store_true', help="额外生成INT8量化模型")
+    parser.add_argument('--calib-dir', default='./dataset/output', help="INT8校准图像目录")
+    parser.add_argument('--calib-limit', type=int, default=200, help="最多使用的校准图像数")
+    parser.add_argument('--skip-model2', action='store_true', help="只导出Model1")
+    args = parser.parse_args()
+    configure_logging()
+
+    # Model1: 固定输入尺寸，与训练imgsz一致
+    model1_onnx = export_onnx(model_config.MODEL1_PATH, model_config.MODEL1_ONNX_PATH,
+                              imgsz=model_config.MODEL1_IMGSZ, dynamic=False)
+    # Model2: 切片分类模型，动态批次，一次前向处理多个零件的全部切片
+    model2_onnx = None
+    if not args.skip_model2:
+        model2_onnx = export_onnx(model_config.MODEL2_PATH, model_config.MODEL2_ONNX_PATH,
+                                  imgsz=model_config.MODEL2_IMGSZ, dynamic=True, task='classify')
+
+    if args.int8:
+        quantize_int8(model1_onnx, _int8_path(model1_onnx), args.calib_dir,
+                      model_config.MODEL1_IMGSZ, use_letterbox=True, limit=args.calib_limit)
+        if model2_onnx:
+            quantize_int8(model2_onnx, _int8_path(model2_onnx), args.calib_dir,
+                          model_config.MODEL2_IMGSZ, use_letterbox=False, limit=args.calib_limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""heatmap.py: 长期缺陷分布热力图
+
+每个零件的热力图由切片缺陷强度直接reshape得到（见Model2.classify_batch）。
+累计器按切片位置统计整个班次内的缺陷频率（该位置被判为缺陷的零件比例）
+和指数加权平均（EWMA）的缺陷强度，内存和更新开销与处理过的零件数量无关，
+界面显示长期分布时每次只读取一个固定大小的数组。
+"""
+import threading
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+
+class HeatmapAccumulator:
+    """按切片位置累计缺陷频率和EWMA强度（线程安全）
+
+    Args:
+        shape (Tuple[int, int]): 热力图尺寸（切片行列数）
+        alpha (float): EWMA的平滑系数，越小越平滑，约等于最近1/alpha个零件的平均
+    """
+
+    def __init__(self, shape: Tuple[int, int] = (6, 9), alpha: float = 0.02):
+        self.shape = tuple(shape)
+        self.alpha = alpha
+        self.parts = 0  # 累计的零件数
+        self._defect_counts = np.zeros(self.shape, dtype=np.int64)  # 各位置被判为缺陷的零件数
+        self._intensity = np.zeros(self.shape, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    def update(self, defect_types: Sequence, heatmaps: np.ndarray):
+        """累计一批零件（按时间顺序）
+
+        Args:
+            defect_types: (P, rows * cols)或(P, rows, cols)的切片缺陷类型，0为正常
+            heatmaps (np.ndarray): (P, rows, cols)的零件热力图
+        """
+        defective = (np.asarray(defect_types).reshape(-1, *self.shape) > 0).sum(axis=0)
+        heatmaps = np.asarray(heatmaps, dtype=np.float64).reshape(-1, *self.shape)
+        count = len(heatmaps)
+        if count == 0:
+            return
+        # P步EWMA的闭式解：旧值衰减(1-a)^P，第k个零件的权重为a(1-a)^(P-1-k)
+        decay = 1.0 - self.alpha
+        weights = self.alpha * decay ** np.arange(count - 1, -1, -1)
+        with self._lock:
+            if self.parts == 0:
+                # 第一个零件直接作为初值，避免从0开始的偏置
+                weights[0] = decay ** (count - 1)
+                self._intensity[...] = 0.0
+            else:
+                self._intensity *= decay ** count
+            self._intensity += np.tensordot(weights, heatmaps, axes=1)
+            self._defect_counts += defective
+            self.parts += count
+
+    def frequency(self) -> np.ndarray:
+        """各位置的缺陷频率（0~1）"""
+        with self._lock:
+            return self._defect_counts / max(self.parts, 1)
+
+    def intensity(self) -> np.ndarray:
+        """各位置EWMA平滑后的缺陷强度（0~1）"""
+        with self._lock:
+            return self._intensity.copy()
+
+    def snapshot(self) -> Dict:
+        return {
+            'parts': self.parts,
+            'alpha': self.alpha,
+            'frequency': np.round(self.frequency(), 4).tolist(),
+            'intensity': np.round(self.intensity(), 4).tolist(),
+        }
+
+    def reset(self):
+        """开始新的统计周期（如换班）"""
+        with self._lock:
+            self.parts = 0
+            self._defect_counts[...] = 0
+            self._intensity[...] = 0.0
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""log_config.py: 统一日志配置
+
+在标准logging之上增加一个低于DEBUG的逐帧日志级别FRAME，
+每帧都会触发的日志（读帧、单次推理等）使用该级别，
+只有model_config.DEBUG_MODE为True时才输出。
+
+热路径中应先用 ``logger.isEnabledFor(FRAME)`` 判断，避免关闭时仍然格式化字符串::
+
+    if logger.isEnabledFor(FRAME):
+        logger.log(FRAME, f"成功读取帧，尺寸: {frame.shape}")
+"""
+import logging
+from typing import Optional
+
+from wxpython import model_config
+
+FRAME = 5  # 逐帧调试日志级别
+logging.addLevelName(FRAME, 'FRAME')
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s'
+
+
+def configure_logging(debug: Optional[bool] = None, level: int = logging.INFO):
+    """配置根日志，只应在程序入口调用一次
+
+    Args:
+        debug (bool, optional): 是否输出逐帧日志，默认取model_config.DEBUG_MODE
+        level (int): 非调试模式下的日志级别
+    """
+    if debug is None:
+        debug = model_config.DEBUG_MODE
+    logging.basicConfig(level=FRAME if debug else level, format=LOG_FORMAT)
@@ -1,16 +1,87 @@
 """model_config.py: Global configuration for YOLO models"""
+import os
 
 # Path to YOLO model weights
-# Modify these paths as needed
-MODEL1_PATH = "./YOLODataset/yolo11n.pt"  # model1 weights file
-MODEL2_PATH = "./YOLODataset/yolov8n-seg.pt"  # model2 weights file
+# Modify these paths as needed; relative paths are resolved against the repository root, not the working directory
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL1_PATH = os.path.join(_ROOT, "产品位置检测模型+切割算法/YOLODataset/runs/detect/factory_prod_v1/weights/best.pt")  # model1 weights file (trained run, not shipped with the repo)
+MODEL2_PATH = os.path.join(_ROOT, "YOLODataset/yolov8n-seg.pt")  # model2 weights file, must be a classification checkpoint (e.g. yolov8n-cls trained on the tile dataset) for ONNX export
 
 # Model-specific parameters
 MODEL1_CONFIDENCE_THRESHOLD = 0.5  # Confidence threshold for model1
 MODEL1_IOU_THRESHOLD = 0.45  # IOU threshold for model1
+MODEL1_IMGSZ = 640  # Letterbox input size, must match training imgsz (runs/detect/factory_prod_v1/args.yaml)
 MODEL2_CONFIDENCE_THRESHOLD = 0.5  # Confidence threshold for model2
 MODEL2_IOU_THRESHOLD = 0.45  # IOU threshold for model2
 
+# ONNX exports (produced by `python -m wxpython.export_models`)
+MODEL1_ONNX_PATH = os.path.join(_ROOT, "YOLODataset/model1.onnx")  # model1 ONNX file (use model1.int8.onnx after --int8 export)
+MODEL2_ONNX_PATH = os.path.join(_ROOT, "YOLODataset/model2.onnx")  # model2 ONNX file (use model2.int8.onnx after --int8 export)
+MODEL2_IMGSZ = 64  # Model2 slice input size (square)
+MODEL2_MAX_BATCH = 256  # Max slices per model2 forward pass, input buffers are preallocated for this size
+
+# Inference backend settings
+INFERENCE_RUNTIME = "torch"  # "torch": PyTorch/Ultralytics (Ultralytics preprocessing, allocates per frame), "ort": ONNX Runtime on CPU with fused, allocation-free preprocessing
+ORT_PROVIDER = "cpu"  # ONNX Runtime execution provider: "cpu" or "openvino" (needs onnxruntime-openvino)
+MODEL1_BACKEND = "yolo"  # "yolo": real detector, "mock": random boxes (falls back to mock if weights are missing)
+INFERENCE_DEVICE = "cpu"  # Inference device, e.g. "cpu" or "0" for the first GPU
+INFERENCE_HALF = False  # Use FP16 inference (slow on most CPUs, mainly for GPU)
+INFERENCE_THREADS = 4  # Intra-op threads for CPU inference (torch and ORT), None to keep the library default
+INFERENCE_WORKERS = 1  # Locate/classify worker threads shared by all cameras, each holds its own model instances
+MAX_BATCH_FRAMES = None  # Max frames (across cameras) merged into one model2 batch, None for one per camera
+INFERENCE_PROCESSES = 0  # >0: run locate/classify in this many worker processes fed from a shared-memory frame ring (see process_pool.py), 0 for the thread pool
+FRAME_SLOT_BYTES = 1920 * 1080 * 3  # Bytes per frame ring slot, must fit the largest frame
+PROCESS_START_TIMEOUT = 120  # Seconds to wait for worker processes to load their models
+
+# Per-stage working resolutions (coarse-to-fine: locate on a small frame, tile from the native one)
+CAMERA_RESOLUTION = (640, 480)  # Requested local camera capture size (w, h), None for the camera default; raise it for higher-resolution tiles
+LOCATE_WORKING_WIDTH = 640  # Frames wider than this are downscaled for model1, boxes are mapped back to crop at native resolution; None to detect at native size
+# The motion gate works at MOTION_GATE_WIDTH, model2 tiles at MODEL2_IMGSZ, display frames at the canvas size
+
+# Network camera settings
+RTSP_URL = "rtsp://192.168.1.100/"  # Address of the IP camera used by the "RTSP流" source
+RTSP_FFMPEG_OPTIONS = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay"  # Low-latency FFmpeg options, None to keep defaults
+
+# Part tracking across frames (classify each physical part once, re-classify on appearance change)
+TRACKING_ENABLED = True  # Track parts across frames and reuse their cached verdicts
+TRACK_IOU_THRESHOLD = 0.3  # Min bbox IoU to associate a detection with an existing track
+TRACK_MAX_MISSED = 5  # Frames a track may go unmatched before it is dropped
+TRACK_APPEARANCE_THRESHOLD = 0.08  # Mean abs grayscale difference (0-1) that triggers re-classification
+TRACK_PENDING_TIMEOUT = 30  # Frames after which a part whose classification never returned is sent again
+
+# Tile-level result cache in front of model2 (see tile_cache.py)
+# A cache hit reuses an earlier verdict for the same camera and tile position without running model2,
+# so a small scratch that does not change the block-mean hash is reported as normal (false negative).
+# Disabled by default; enable only on stations where frames are static for long periods.
+TILE_CACHE_SIZE = 0  # Max cached tile verdicts (LRU), 0 to disable the cache
+TILE_CACHE_TOLERANCE = 2  # Quantization step in gray levels for the tile hash, larger = more hits but more false negatives
+TILE_CACHE_HASH_SIZE = 8  # Tiles are hashed from a hash_size x hash_size block-mean grayscale image
+
+# Motion gating before model1 (see motion.py): static frames reuse the previous result
+MOTION_GATE_ENABLED = True  # Skip model1/model2 on frames where the scene did not change
+MOTION_GATE_METHOD = "diff"  # "diff": difference with the previous frame, "mog2": background model (belt moving while empty)
+MOTION_GATE_WIDTH = 160  # Width of the grayscale frame used by the motion gate
+MOTION_GATE_ON_THRESHOLD = 0.01  # Changed-pixel ratio that switches detection on
+MOTION_GATE_OFF_THRESHOLD = 0.005  # Changed-pixel ratio below which a frame counts as still
+MOTION_GATE_HOLD_FRAMES = 15  # Consecutive still frames before detection switches off (hysteresis)
+MOTION_GATE_MAX_SKIPPED = 50  # Force a full detection after this many skipped frames, 0 for no limit
+
+# Long-term defect heatmap (see heatmap.py)
+HEATMAP_EWMA_ALPHA = 0.02  # EWMA weight of each new part in the smoothed intensity map (~last 1/alpha parts)
+
+# Persistent result store (see results_store.py), backs the "导出报告" CSV export
+RESULTS_DB_PATH = "./results/defects.db"  # SQLite database with one row per newly classified part
+RESULTS_BATCH_SIZE = 256  # Max records written per transaction
+RESULTS_FLUSH_INTERVAL = 1.0  # Max seconds a record waits in the write queue
+RESULTS_QUEUE_SIZE = 10000  # Pending records kept in memory, new records are dropped (and counted) beyond this
+
+# Headless service settings (python -m wxpython.service)
+SERVICE_SOURCES = ["camera:0"]  # Video sources: "camera:<id>", "rtsp://...", or a video file / image directory
+SERVICE_REPORT_INTERVAL = 10  # Interval in seconds between stats reports in the service log
+
 # Other settings
 FRAME_REFRESH_INTERVAL = 30  # Interval in ms to refresh frames in video
-DEBUG_MODE = True  # Set True to enable debug print statements
+DEBUG_MODE = False  # Set True to enable per-frame debug logging (FRAME level, see log_config.py)
+UI_LOG_MAX_LINES = 500  # Max lines kept in the GUI log panel
+UI_LOG_FLUSH_INTERVAL = 200  # Interval in ms to flush buffered log lines to the GUI log panel
+RENDER_QUEUE_DEPTH = 1  # Pending frames kept per camera for the render thread, older ones are dropped when display lags
@@ -1,11 +1,16 @@
-from typing import List, Dict, Tuple, Union
+from typing import List, Dict, Optional, Sequence, Tuple, Union
 import numpy as np
+import cv2
 import random
 from dataclasses import dataclass
 import logging
+import os
+import time
+
+from wxpython import model_config
+from wxpython.log_config import FRAME
+from wxpython.tiling import iter_tiles
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -23,10 +28,12 @@ class Model1:
     
     Attributes:
         min_confidence (float): 最小置信度阈值
+        last_latency_ms (float): 最近一次detect_and_crop的耗时（毫秒）
     """
     
     def __init__(self, min_confidence: float = 0.5):
         self.min_confidence = min_confidence
+        self.last_latency_ms = 0.0
         logger.info("Model1初始化完成")
     
     def detect_and_crop(self, frame: np.ndarray) -> Tuple[List[DetectionResult], List[np.ndarray]]:
@@ -38,12 +45,13 @@ class Model1:
         Returns:
             Tuple[List[DetectionResult], List[np.ndarray]]: 
                 - 检测结果列表，每个元素包含valid、bbox和confidence
-                - 裁剪后的零件图像列表
+                - 裁剪后的零件图像列表（原始帧的视图，不复制）
         """
         if frame is None or len(frame.shape) != 3:
             logger.error("输入帧格式错误")
             return [], []
             
+        start = time.perf_counter()
         height, width = frame.shape[:2]
         results = []
         cropped_images = []
@@ -72,14 +80,161 @@ class Model1:
             
             if result.valid:
                 # 裁剪零件区域
-                cropped = frame[y1:y2, x1:x2].copy()
+                cropped = frame[y1:y2, x1:x2]
                 cropped_images.append(cropped)
             
             results.append(result)
             
-        logger.info(f"检测到 {len(results)} 个零件，其中有效 {len(cropped_images)} 个")
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        if logger.isEnabledFor(FRAME):
+            logger.log(FRAME, f"检测到 {len(results)} 个零件，其中有效 {len(cropped_images)} 个")
         return results, cropped_images
 
+    def locate(self, frame: np.ndarray,
+               working_width: Optional[int] = None) -> Tuple[List[DetectionResult], List[np.ndarray]]:
+        """由粗到精的定位：在缩小的帧上检测，检测框映射回原始分辨率后从原始帧裁剪
+
+        检测器的耗时只取决于working_width，切片仍来自原始分辨率的零件区域。
+
+        Args:
+            frame (np.ndarray): 原始分辨率的视频帧，shape为(H, W, C)
+            working_width (int, optional): 检测时的帧宽度，高度按比例；
+                为None或帧宽度不超过该值时直接在原始帧上检测
+
+        Returns:
+            Tuple[List[DetectionResult], List[np.ndarray]]: 同detect_and_crop，
+                bbox为原始帧坐标，裁剪区域为原始帧的视图
+        """
+        if frame is None or len(frame.shape) != 3:
+            return self.detect_and_crop(frame)
+        height, width = frame.shape[:2]
+        if not working_width or width <= working_width:
+            return self.detect_and_crop(frame)
+
+        scale = width / working_width
+        small_shape = (max(round(height / scale), 1), working_width, frame.shape[2])
+        small = getattr(self, '_working_frame', None)  # 复用缩小帧的缓冲区，只有检测框会被保留
+        if small is None or small.shape != small_shape or small.dtype != frame.dtype:
+            small = self._working_frame = np.empty(small_shape, dtype=frame.dtype)
+        cv2.resize(frame, (small_shape[1], small_shape[0]), dst=small, interpolation=cv2.INTER_AREA)
+        detections, _ = self.detect_and_crop(small)
+        cropped_images = []
+        for det in detections:
+            x1, y1, x2, y2 = det.bbox
+            x1, x2 = np.clip([int(x1 * scale), int(np.ceil(x2 * scale))], 0, width)
+            y1, y2 = np.clip([int(y1 * scale), int(np.ceil(y2 * scale))], 0, height)
+            det.bbox = [int(x1), int(y1), int(x2), int(y2)]
+            det.valid = bool(det.valid and x2 > x1 and y2 > y1)
+            if det.valid:
+                cropped_images.append(frame[y1:y2, x1:x2])
+        return detections, cropped_images
+
+class YoloModel1(Model1):
+    """基于YOLO的零件定位模型
+    
+    使用Ultralytics加载训练好的权重（runs/detect/factory_prod_v1），
+    初始化时只加载一次并预热。推理时按训练时的imgsz做letterbox缩放，
+    返回与模拟类相同格式的结果，裁剪区域为原始帧的视图。
+    
+    预处理由Ultralytics完成，每帧都会分配新的letterbox图像和输入张量，
+    没有使用LetterboxInput的融合预处理；需要免分配的预处理时使用ORT后端（OrtModel1）。
+    
+    Attributes:
+        weights (str): 权重文件路径
+        min_confidence (float): 最小置信度阈值，低于该值的检测结果标记为无效
+        iou_threshold (float): NMS的IOU阈值
+        imgsz (int): letterbox输入尺寸
+        device (str): 推理设备
+        half (bool): 是否使用FP16推理
+        last_latency_ms (float): 最近一次detect_and_crop的耗时（毫秒）
+    """
+    
+    candidate_confidence = 0.25  # 低于该值的候选框直接丢弃，不作为无效结果返回
+    
+    def __init__(self, weights: str = model_config.MODEL1_PATH,
+                 min_confidence: float = model_config.MODEL1_CONFIDENCE_THRESHOLD,
+                 iou_threshold: float = model_config.MODEL1_IOU_THRESHOLD,
+                 imgsz: int = model_config.MODEL1_IMGSZ,
+                 device: str = model_config.INFERENCE_DEVICE,
+                 half: bool = model_config.INFERENCE_HALF,
+                 threads: Optional[int] = model_config.INFERENCE_THREADS,
+                 warmup: bool = True):
+        # 可选依赖，只有使用真实模型时才需要
+        import torch
+        from ultralytics import YOLO
+        
+        self.weights = weights
+        self.min_confidence = min_confidence
+        self.iou_threshold = iou_threshold
+        self.imgsz = imgsz
+        self.device = device
+        self.half = half
+        self.last_latency_ms = 0.0
+        
+        if threads:
+            torch.set_num_threads(threads)
+        
+        start = time.perf_counter()
+        self.model = YOLO(weights, task='detect')
+        if warmup:
+            self.warmup()
+        logger.info(f"Model1(YOLO)初始化完成: {weights}，耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+    
+    def warmup(self, runs: int = 2):
+        """用空白帧预热，避免首帧推理时才初始化计算图和内存"""
+        dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self._predict(dummy)
+    
+    def _predict(self, frame_bgr: np.ndarray):
+        return self.model.predict(frame_bgr, imgsz=self.imgsz,
+                                  conf=min(self.candidate_confidence, self.min_confidence),
+                                  iou=self.iou_threshold, device=self.device,
+                                  half=self.half, verbose=False)[0]
+    
+    def detect_and_crop(self, frame: np.ndarray) -> Tuple[List[DetectionResult], List[np.ndarray]]:
+        """检测零件位置并返回裁剪区域
+        
+        Args:
+            frame (np.ndarray): 输入视频帧（RGB），shape为(H, W, C)
+            
+        Returns:
+            Tuple[List[DetectionResult], List[np.ndarray]]: 
+                - 检测结果列表，每个元素包含valid、bbox和confidence
+                - 有效零件的裁剪图像列表（原始帧的视图，不复制）
+        """
+        if frame is None or len(frame.shape) != 3:
+            logger.error("输入帧格式错误")
+            return [], []
+        
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        # Ultralytics按BGR处理numpy输入，这里传入通道翻转的视图（其预处理仍会复制并分配每帧的输入）
+        prediction = self._predict(frame[..., ::-1])
+        boxes = prediction.boxes.xyxy.cpu().numpy()
+        confidences = prediction.boxes.conf.cpu().numpy()
+        
+        results = []
+        cropped_images = []
+        for (x1, y1, x2, y2), confidence in zip(boxes, confidences):
+            x1, x2 = np.clip([int(x1), int(np.ceil(x2))], 0, width)
+            y1, y2 = np.clip([int(y1), int(np.ceil(y2))], 0, height)
+            result = DetectionResult(
+                valid=bool(confidence >= self.min_confidence and x2 > x1 and y2 > y1),
+                bbox=[int(x1), int(y1), int(x2), int(y2)],
+                confidence=float(confidence)
+            )
+            if result.valid:
+                cropped_images.append(frame[y1:y2, x1:x2])
+            results.append(result)
+        
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        if logger.isEnabledFor(FRAME):
+            logger.log(FRAME, f"检测到 {len(results)} 个零件，其中有效 {len(cropped_images)} 个，"
+                              f"耗时 {self.last_latency_ms:.1f} ms")
+        return results, cropped_images
+
+
 class Model2:
     """缺陷分类模型模拟类
     
@@ -88,16 +243,109 @@ class Model2:
     
     Attributes:
         num_classes (int): 缺陷类别数量（包括正常类别）
-        heatmap_size (Tuple[int, int]): 热力图尺寸
+        heatmap_size (Tuple[int, int]): 热力图尺寸，同时决定每个零件的切片数
+        input_size (Tuple[int, int]): 模型输入切片尺寸 (h, w)
+        max_batch (int): 预分配的切片批次容量，更大的批次会扩容缓冲区
     """
     
-    def __init__(self, num_classes: int = 6, heatmap_size: Tuple[int, int] = (6, 9)):
+    def __init__(self, num_classes: int = 6, heatmap_size: Tuple[int, int] = (6, 9),
+                 input_size: Tuple[int, int] = (64, 64), max_batch: int = model_config.MODEL2_MAX_BATCH):
         self.num_classes = num_classes  # 0:正常, 1-5:缺陷类型
         self.heatmap_size = heatmap_size
+        self.input_size = input_size
+        self.slices_per_part = heatmap_size[0] * heatmap_size[1]
+        # stack_slices的输出缓冲区（N, h, w, 3），每个实例只由一个工作线程使用
+        self._batch_buffer = np.empty((max_batch, *input_size, 3), dtype=np.uint8)
         logger.info("Model2初始化完成")
+
+    def stack_slices(self, parts: Sequence[Union[List[np.ndarray], np.ndarray]]) -> np.ndarray:
+        """将多个零件的切片缩放到输入尺寸并拼成一个批次张量
+        
+        切片直接缩放写入预分配的批次缓冲区，不产生中间数组。
+        
+        Args:
+            parts: 每个零件的切片，可以是切片列表，
+                也可以是tiling.tile_image返回的(rows, cols, th, tw, C)切片视图
+            
+        Returns:
+            np.ndarray: shape为(N, h, w, C)的批次张量，N = 零件数 * 每零件切片数；
+                RGB uint8切片返回内部缓冲区的视图，下次调用时被覆盖
+        """
+        h, w = self.input_size
+        slices = [s for part in parts
+                  for s in (iter_tiles(part) if isinstance(part, np.ndarray) else part)]
+        if not slices:
+            return np.empty((0, h, w, 3), dtype=np.uint8)
+        channels = slices[0].shape[2] if slices[0].ndim == 3 else 1
+        if channels == 3 and slices[0].dtype == np.uint8:
+            if len(slices) > len(self._batch_buffer):
+                self._batch_buffer = np.empty((len(slices), h, w, 3), dtype=np.uint8)
+            batch = self._batch_buffer[:len(slices)]
+            for i, s in enumerate(slices):
+                if s.shape[:2] == (h, w):
+                    batch[i] = s
+                else:
+                    cv2.resize(s, (w, h), dst=batch[i], interpolation=cv2.INTER_AREA)
+            return batch
+        batch = np.empty((len(slices), h, w, channels), dtype=slices[0].dtype)
+        for i, s in enumerate(slices):
+            if s.shape[:2] == (h, w):
+                batch[i] = s.reshape(h, w, channels)
+            else:
+                batch[i] = cv2.resize(s, (w, h), interpolation=cv2.INTER_AREA).reshape(h, w, channels)
+        return batch
+
+    def classify_tiles(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """对任意数量的切片进行一次性分类，不要求按零件成组
+        
+        Args:
+            batch (np.ndarray): shape为(N, h, w, C)的切片张量
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: shape均为(N,)的切片缺陷类型和缺陷强度（0~1，热力图取值）
+        """
+        # 生成随机缺陷类型（一次前向）
+        defect_types = np.random.randint(0, self.num_classes, size=len(batch))
+        
+        # 生成随机缺陷强度，缺陷位置的强度提高
+        scores = np.random.rand(len(batch))
+        defect_mask = defect_types > 0
+        scores[defect_mask] = np.random.uniform(0.7, 1.0, size=int(defect_mask.sum()))
+        return defect_types, scores
+
+    def classify_batch(self, batch: np.ndarray) -> Dict[str, np.ndarray]:
+        """对一个批次的切片进行一次性分类
+        
+        批次可以包含同一帧中所有有效零件的切片，也可以跨多帧，
+        切片按零件顺序连续排列，每个零件占heatmap_size[0]*heatmap_size[1]个。
+        
+        Args:
+            batch (np.ndarray): shape为(N, h, w, C)的切片张量
+            
+        Returns:
+            Dict[str, np.ndarray]: 
+                - defect_types: shape为(N,)的切片缺陷类型
+                - heatmaps: shape为(N // 每零件切片数, *heatmap_size)的零件热力图
+        """
+        rows, cols = self.heatmap_size
+        if batch.ndim != 4 or len(batch) % self.slices_per_part != 0:
+            logger.error(f"输入批次形状错误: {batch.shape}")
+            return {'defect_types': np.zeros(0, dtype=np.int64),
+                    'heatmaps': np.zeros((0, rows, cols))}
+        num_parts = len(batch) // self.slices_per_part
+        
+        defect_types, scores = self.classify_tiles(batch)
+        
+        if logger.isEnabledFor(FRAME):
+            logger.log(FRAME, f"批量分类完成，{num_parts} 个零件共 {len(batch)} 个切片，"
+                              f"缺陷类型分布: {np.bincount(defect_types, minlength=self.num_classes).tolist()}")
+        return {
+            'defect_types': defect_types,
+            'heatmaps': scores.reshape(num_parts, rows, cols)
+        }
     
     def classify_slices(self, slices: List[np.ndarray]) -> Dict[str, Union[List[int], np.ndarray]]:
-        """对切片进行缺陷分类
+        """对单个零件的切片进行缺陷分类
         
         Args:
             slices (List[np.ndarray]): 54个切片图像列表
@@ -107,25 +355,280 @@ class Model2:
                 - defect_types: 54个切片的缺陷类型列表
                 - heatmap: 6x9的热力图矩阵
         """
-        if not slices or len(slices) != 54:
+        if not slices or len(slices) != self.slices_per_part:
             logger.error("输入切片数量错误")
             return {'defect_types': [], 'heatmap': np.zeros(self.heatmap_size)}
         
-        # 生成随机缺陷类型
-        defect_types = [random.randint(0, self.num_classes-1) for _ in range(54)]
+        result = self.classify_batch(self.stack_slices([slices]))
+        return {
+            'defect_types': result['defect_types'].tolist(),
+            'heatmap': result['heatmaps'][0]
+        }
+
+
+# ================= ONNX Runtime CPU推理后端 =================
+def letterbox(image: np.ndarray, size: int, color: int = 114) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """保持宽高比缩放并填充为size x size（与YOLO训练时的letterbox一致）
+    
+    Returns:
+        Tuple[np.ndarray, float, Tuple[int, int]]: 填充后的图像、缩放比例、左上填充量(pad_x, pad_y)
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    padded = np.full((size, size, image.shape[2]), color, dtype=image.dtype)
+    padded[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+        image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return padded, scale, (pad_x, pad_y)
+
+
+class LetterboxInput:
+    """融合的letterbox预处理，直接写入模型的输入张量
+    
+    缩放结果写入复用的暂存区，再用一次numpy运算完成通道交换、归一化和HWC->CHW，
+    写入输入张量的有效区域；填充区只在缩放几何或目标张量变化时重写。
+    每帧不分配新数组，结果与letterbox()后再归一化、转置一致。目前只用于ORT后端，
+    torch后端（YoloModel1）的预处理由Ultralytics完成。
+    
+    Args:
+        size (int): 输入尺寸（正方形）
+        color (int): 填充灰度值
+        swap_rb (bool): 是否交换R、B通道（模型输入通道顺序与帧不同时使用）
+    """
+    
+    def __init__(self, size: int, color: int = 114, swap_rb: bool = False):
+        self.size = size
+        self.color = color
+        self.swap_rb = swap_rb
+        self._scratch = np.empty(size * size * 3, dtype=np.uint8)  # 缩放结果的暂存区
+        self._filled = None  # 上次写入的(目标地址, 缩放尺寸, 填充量)
+    
+    def __call__(self, image: np.ndarray, out: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+        """预处理一帧
+        
+        Args:
+            image (np.ndarray): (H, W, 3)的uint8帧
+            out (np.ndarray): (3, size, size)的float32输入张量（如OrtSession.input_buffer[0]）
+            
+        Returns:
+            Tuple[float, Tuple[int, int]]: 缩放比例、左上填充量(pad_x, pad_y)
+        """
+        height, width = image.shape[:2]
+        scale = min(self.size / height, self.size / width)
+        new_w, new_h = int(round(width * scale)), int(round(height * scale))
+        pad_x, pad_y = (self.size - new_w) // 2, (self.size - new_h) // 2
+        
+        geometry = (out.ctypes.data, new_w, new_h, pad_x, pad_y)
+        if geometry != self._filled:
+            out.fill(self.color / 255.0)
+            self._filled = geometry
+        
+        resized = self._scratch[:new_h * new_w * 3].reshape(new_h, new_w, 3)
+        cv2.resize(image, (new_w, new_h), dst=resized, interpolation=cv2.INTER_LINEAR)
+        if self.swap_rb:
+            resized = resized[..., ::-1]
+        np.multiply(resized.transpose(2, 0, 1), 1 / 255.0,
+                    out=out[:, pad_y:pad_y + new_h, pad_x:pad_x + new_w], casting='unsafe')
+        return scale, (pad_x, pad_y)
+
+
+class OrtSession:
+    """ONNX Runtime推理会话封装
+    
+    按model_config设置算子内线程数和执行后端（CPU或OpenVINO），
+    输入输出通过IO binding绑定到预分配的numpy缓冲区，推理时不再分配内存。
+    
+    Attributes:
+        input_buffer (np.ndarray): 预分配的输入缓冲区，shape为(max_batch, C, H, W)
+        output_buffer (np.ndarray): 预分配的输出缓冲区，第一维为max_batch
+    """
+    
+    def __init__(self, onnx_path: str, max_batch: int = 1,
+                 input_hw: Optional[Tuple[int, int]] = None,
+                 threads: Optional[int] = model_config.INFERENCE_THREADS,
+                 provider: str = model_config.ORT_PROVIDER):
+        import onnxruntime as ort  # 可选依赖，只有使用ORT后端时才需要
         
-        # 生成随机热力图
-        heatmap = np.random.rand(*self.heatmap_size)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        providers = ['CPUExecutionProvider']
+        if provider == 'openvino' and 'OpenVINOExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'OpenVINOExecutionProvider')
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=providers)
         
-        # 根据缺陷类型调整热力图值
-        for i, defect_type in enumerate(defect_types):
-            if defect_type > 0:  # 如果是缺陷
-                row = i // 9
-                col = i % 9
-                heatmap[row, col] = random.uniform(0.7, 1.0)
+        model_input = self.session.get_inputs()[0]
+        model_output = self.session.get_outputs()[0]
+        self.input_name = model_input.name
+        self.output_name = model_output.name
+        self.max_batch = max_batch
+        # 批次维度按max_batch分配，动态的空间维度使用input_hw
+        channels, height, width = model_input.shape[1:]
+        if not isinstance(height, int) or not isinstance(width, int):
+            if input_hw is None:
+                raise ValueError(f"{onnx_path} 的输入尺寸为动态维度，需要指定input_hw")
+            height, width = input_hw
+        self.input_buffer = np.zeros((max_batch, channels, height, width), dtype=np.float32)
+        probe = self.session.run([self.output_name], {self.input_name: self.input_buffer[:1]})[0]
+        self.output_buffer = np.zeros((max_batch,) + probe.shape[1:], dtype=np.float32)
         
-        logger.info(f"分类完成，缺陷类型分布: {[defect_types.count(i) for i in range(self.num_classes)]}")
-        return {
-            'defect_types': defect_types,
-            'heatmap': heatmap
-        } 
\ No newline at end of file
+        self.io_binding = self.session.io_binding()
+        self._bound_batch = 0
+        logger.info(f"ORT会话已创建: {onnx_path}，后端 {self.session.get_providers()[0]}")
+    
+    @property
+    def input_hw(self) -> Tuple[int, int]:
+        return self.input_buffer.shape[2], self.input_buffer.shape[3]
+    
+    def run(self, batch: int = 1) -> np.ndarray:
+        """对input_buffer的前batch个样本推理，返回output_buffer中对应部分的视图"""
+        if batch != self._bound_batch:
+            self.io_binding.bind_cpu_input(self.input_name, self.input_buffer[:batch])
+            self.io_binding.bind_output(self.output_name, 'cpu', 0, np.float32,
+                                        list(self.output_buffer[:batch].shape),
+                                        self.output_buffer.ctypes.data)
+            self._bound_batch = batch
+        self.session.run_with_iobinding(self.io_binding)
+        return self.output_buffer[:batch]
+
+
+class OrtModel1(Model1):
+    """基于ONNX Runtime的零件定位模型（无GPU的检测工位使用）
+    
+    输入为export_models.py导出的YOLO检测模型，输出shape为(1, 4 + 类别数, 候选框数)。
+    """
+    
+    def __init__(self, onnx_path: str = model_config.MODEL1_ONNX_PATH,
+                 min_confidence: float = model_config.MODEL1_CONFIDENCE_THRESHOLD,
+                 iou_threshold: float = model_config.MODEL1_IOU_THRESHOLD,
+                 warmup: bool = True):
+        self.min_confidence = min_confidence
+        self.iou_threshold = iou_threshold
+        self.last_latency_ms = 0.0
+        self.ort = OrtSession(onnx_path, max_batch=1)
+        self.imgsz = self.ort.input_hw[0]
+        self.preprocess = LetterboxInput(self.imgsz)
+        if warmup:
+            self.ort.run()
+        logger.info(f"Model1(ORT)初始化完成: {onnx_path}")
+    
+    def detect_and_crop(self, frame: np.ndarray) -> Tuple[List[DetectionResult], List[np.ndarray]]:
+        """检测零件位置并返回裁剪区域（接口同Model1.detect_and_crop）"""
+        if frame is None or len(frame.shape) != 3:
+            logger.error("输入帧格式错误")
+            return [], []
+        
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        scale, (pad_x, pad_y) = self.preprocess(frame, self.ort.input_buffer[0])
+        prediction = self.ort.run()[0].T  # (候选框数, 4 + 类别数)
+        
+        scores = prediction[:, 4:].max(axis=1)
+        keep = scores >= min(YoloModel1.candidate_confidence, self.min_confidence)
+        boxes, scores = prediction[keep, :4], scores[keep]
+        # cx, cy, w, h -> 原始帧中的 x, y, w, h
+        xywh = np.empty_like(boxes)
+        xywh[:, 0] = (boxes[:, 0] - boxes[:, 2] / 2 - pad_x) / scale
+        xywh[:, 1] = (boxes[:, 1] - boxes[:, 3] / 2 - pad_y) / scale
+        xywh[:, 2:] = boxes[:, 2:] / scale
+        indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), 0.0, self.iou_threshold)
+        
+        results = []
+        cropped_images = []
+        for i in np.asarray(indices, dtype=np.int64).reshape(-1):
+            x, y, w, h = xywh[i]
+            x1, x2 = np.clip([int(x), int(np.ceil(x + w))], 0, width)
+            y1, y2 = np.clip([int(y), int(np.ceil(y + h))], 0, height)
+            result = DetectionResult(
+                valid=bool(scores[i] >= self.min_confidence and x2 > x1 and y2 > y1),
+                bbox=[int(x1), int(y1), int(x2), int(y2)],
+                confidence=float(scores[i])
+            )
+            if result.valid:
+                cropped_images.append(frame[y1:y2, x1:x2])
+            results.append(result)
+        
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        if logger.isEnabledFor(FRAME):
+            logger.log(FRAME, f"检测到 {len(results)} 个零件，其中有效 {len(cropped_images)} 个，"
+                              f"耗时 {self.last_latency_ms:.1f} ms")
+        return results, cropped_images
+
+
+class OrtModel2(Model2):
+    """基于ONNX Runtime的缺陷分类模型
+    
+    输入为export_models.py导出的分类模型，输出shape为(N, num_classes)的类别概率，
+    类别0为正常。每个切片的缺陷强度取1 - P(正常)，按零件排成热力图。
+    模型输出形状不符（如误导出了检测/分割模型）时构造函数抛出ValueError。
+    """
+    
+    def __init__(self, onnx_path: str = model_config.MODEL2_ONNX_PATH,
+                 num_classes: int = 6, heatmap_size: Tuple[int, int] = (6, 9),
+                 max_batch: int = model_config.MODEL2_MAX_BATCH):
+        self.ort = OrtSession(onnx_path, max_batch=max_batch,
+                              input_hw=(model_config.MODEL2_IMGSZ, model_config.MODEL2_IMGSZ))
+        output_shape = self.ort.output_buffer.shape[1:]
+        if output_shape != (num_classes,):
+            raise ValueError(f"{onnx_path} 的输出形状为 {output_shape}，"
+                             f"Model2需要输出 ({num_classes},) 的类别概率（分类模型）")
+        super().__init__(num_classes=num_classes, heatmap_size=heatmap_size,
+                         input_size=self.ort.input_hw, max_batch=max_batch)
+    
+    def classify_tiles(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """对任意数量的切片进行分类（接口同Model2.classify_tiles）"""
+        probs = np.empty((len(batch), self.num_classes), dtype=np.float32)
+        for start in range(0, len(batch), self.ort.max_batch):
+            chunk = batch[start:start + self.ort.max_batch]
+            np.multiply(chunk.transpose(0, 3, 1, 2), 1 / 255.0,
+                        out=self.ort.input_buffer[:len(chunk)], casting='unsafe')
+            probs[start:start + len(chunk)] = self.ort.run(len(chunk))
+        
+        return probs.argmax(axis=1), 1.0 - probs[:, 0]
+
+
+# ================= 按配置创建模型 =================
+def create_model1() -> Model1:
+    """按model_config创建零件定位模型
+    
+    INFERENCE_RUNTIME为"ort"时使用ONNX Runtime，为"torch"时按MODEL1_BACKEND选择。
+    权重文件或依赖缺失时记录警告并回退到模拟实现（随机检测框）。
+    """
+    if model_config.INFERENCE_RUNTIME == 'ort':
+        model_path, model_cls = model_config.MODEL1_ONNX_PATH, OrtModel1
+    elif model_config.MODEL1_BACKEND == 'yolo':
+        model_path, model_cls = model_config.MODEL1_PATH, YoloModel1
+    else:
+        model_path, model_cls = None, None
+    
+    if model_cls is not None:
+        if not os.path.exists(model_path):
+            logger.warning(f"未找到Model1权重 {model_path}（model_config.MODEL1_PATH/MODEL1_ONNX_PATH），"
+                           f"使用模拟实现，检测结果为随机检测框")
+        else:
+            try:
+                return model_cls()
+            except ImportError as e:
+                logger.warning(f"无法加载Model1推理依赖({e})，使用模拟实现")
+    return Model1(min_confidence=model_config.MODEL1_CONFIDENCE_THRESHOLD)
+
+
+def create_model2() -> Model2:
+    """按model_config创建缺陷分类模型
+    
+    INFERENCE_RUNTIME为"ort"且模型文件存在时使用ONNX Runtime，否则使用模拟实现。
+    模型文件不是分类模型时记录错误并回退到模拟实现。
+    """
+    if model_config.INFERENCE_RUNTIME == 'ort':
+        if not os.path.exists(model_config.MODEL2_ONNX_PATH):
+            logger.warning(f"未找到Model2权重 {model_config.MODEL2_ONNX_PATH}，使用模拟实现")
+        else:
+            try:
+                return OrtModel2()
+            except ImportError as e:
+                logger.warning(f"无法加载Model2推理依赖({e})，使用模拟实现")
+            except ValueError as e:
+                logger.error(f"Model2模型不可用({e})，使用模拟实现")
+    return Model2(num_classes=6, heatmap_size=(6, 9))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""motion.py: Model1之前的运动/变化门控
+
+传送带空转或停止时画面基本不变，没有必要每帧都运行零件定位。门控在缩小后的灰度帧上
+做帧差（或背景建模），判断是否需要运行完整的检测；被跳过的帧沿用该视频源上一次的检测结果。
+缩小时先对原始帧做跨步取样，门控的耗时不随相机分辨率增长。
+
+判定带有迟滞：变化比例超过on_threshold时立即激活；激活后要连续hold_frames帧
+低于off_threshold才回到空闲（介于两个阈值之间的帧会重新开始计数），避免在阈值附近反复切换，
+也保证零件停稳后的画面会被检测到。
+空闲时每隔max_skipped帧强制检测一次，防止光照缓慢变化等情况下长期沿用旧结果。
+"""
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """单路视频源的运动门控（非线程安全，由该视频源的采集线程调用）
+
+    Args:
+        method (str): 'diff' 与上一帧做帧差；'mog2' 背景建模，适合空载时也在运动的传送带
+        width (int): 判定用的缩小宽度（像素），高度按比例
+        pixel_threshold (int): 帧差模式下，灰度差超过该值的像素视为变化
+        on_threshold (float): 变化像素比例超过该值时激活
+        off_threshold (float): 激活后变化像素比例低于该值的帧计为静止
+        hold_frames (int): 连续静止多少帧后回到空闲
+        max_skipped (int): 空闲时最多连续跳过的帧数，0表示不限
+    """
+
+    def __init__(self, method: str = 'diff', width: int = 160, pixel_threshold: int = 15,
+                 on_threshold: float = 0.01, off_threshold: float = 0.005,
+                 hold_frames: int = 15, max_skipped: int = 50):
+        if method not in ('diff', 'mog2'):
+            raise ValueError(f"未知的门控方法: {method}")
+        self.method = method
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.hold_frames = hold_frames
+        self.max_skipped = max_skipped
+
+        self.active = True  # 首帧总是检测
+        self.score = 0.0  # 最近一帧的变化像素比例
+        self.frames = 0
+        self.skipped = 0  # 累计跳过的帧数
+        self._still_frames = 0
+        self._consecutive_skipped = 0
+        self._previous: Optional[np.ndarray] = None
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if method == 'mog2' else None
+
+    def _small_gray(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.width, max(int(height * self.width / width), 1))
+        # 先按整数步长隔行隔列取样（跨步视图）到目标宽度的约两倍，灰度转换和区域平均
+        # 只在取样后的小图上进行，耗时基本与原始分辨率无关
+        step = max(width // (2 * self.width), 1)
+        small = frame[::step, ::step]
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        return cv2.resize(small, size, interpolation=cv2.INTER_AREA)
+
+    def _change_ratio(self, gray: np.ndarray) -> float:
+        if self._subtractor is not None:
+            mask = self._subtractor.apply(gray)
+            return float(np.count_nonzero(mask)) / mask.size
+        previous, self._previous = self._previous, gray
+        if previous is None:
+            return 1.0
+        diff = cv2.absdiff(gray, previous)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+
+    def update(self, frame: np.ndarray) -> bool:
+        """处理一帧，返回是否需要运行完整检测"""
+        self.frames += 1
+        self.score = self._change_ratio(self._small_gray(frame))
+
+        if self.score > self.on_threshold:
+            self.active = True
+            self._still_frames = 0
+        elif self.score >= self.off_threshold:
+            self._still_frames = 0  # 介于两个阈值之间的帧不算静止，打断连续静止计数
+        elif self.active:
+            self._still_frames += 1
+            if self._still_frames >= self.hold_frames:
+                self.active = False
+
+        run = self.active or (self.max_skipped > 0 and self._consecutive_skipped >= self.max_skipped)
+        if run:
+            self._consecutive_skipped = 0
+        else:
+            self._consecutive_skipped += 1
+            self.skipped += 1
+        return run
+
+    @property
+    def skip_rate(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def counters(self) -> Dict[str, float]:
+        return {
+            'gate_active': int(self.active),
+            'gate_skipped': self.skipped,
+            'gate_skip_rate': round(self.skip_rate, 3),
+        }
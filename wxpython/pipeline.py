@@ -0,0 +1,714 @@
+# -*- coding: utf-8 -*-
+"""pipeline.py: 分阶段检测流水线
+
+采集 -> 定位 -> 切片 -> 分类 -> 渲染，每个阶段运行在独立的工作线程上，
+阶段之间使用有界队列连接。下游处理不过来时上游阻塞（背压），
+整体吞吐量由最慢的阶段决定，而不是所有阶段耗时之和。
+
+多路视频源时，每路有独立的采集线程和输入队列，定位阶段按轮询顺序从各路取帧，
+定位/分类由所有视频源共用的工作线程池完成（每个工作线程持有独立的模型实例），
+分类阶段把队列中已有的多帧（可能来自不同视频源）合并为一个批次推理。
+
+启用跟踪时，切片阶段按视频源把检测结果关联到零件轨迹（见tracking.py），
+只对新出现或外观变化的零件切片分类，其余零件复用轨迹上缓存的结果，
+缺陷计数按零件去重。启用切片级结果缓存时（见tile_cache.py，默认关闭），
+切片送入Model2前先查询缓存，只有变化了的切片才真正推理。
+
+多个定位/分类工作线程时各帧完成的先后不确定，分类完成的帧先进入按视频源划分的重排缓冲，
+等该视频源所有更早采集的帧都完成（或被丢弃）后，才按采集顺序累计缺陷计数并放入输出队列。
+
+启用运动门控时，采集线程先在缩小的灰度帧上判断画面是否变化（见motion.py），
+静止的帧不做定位和分类，但仍经过各阶段和重排缓冲，按顺序输出时沿用该视频源
+在它之前最后一帧的结果，不会越过仍在处理中的较早的帧。
+
+渲染阶段由调用方提供输出队列（GUI 中每路视频源一个 render_queue），
+流水线本身不依赖 wx。
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from wxpython import model_config
+from wxpython.model_interface import Model1, Model2, DetectionResult
+from wxpython.motion import MotionGate
+from wxpython.stats import PipelineStats
+from wxpython.tile_cache import TileCache
+from wxpython.tiling import TileGrid, tile_image
+from wxpython.tracking import IouTracker, Track
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # 阶段间传递的结束哨兵
+_POLL_INTERVAL = 0.1  # 队列阻塞操作的轮询间隔（秒），用于及时响应停止信号
+
+
+@dataclass
+class FrameTask:
+    """在各阶段之间流转的单帧任务"""
+    frame_id: int
+    frame: np.ndarray
+    timestamp: float  # 采集时间（视频流提供时为快门时间）
+    camera: int = 0  # 视频源序号，用于把结果分发回对应的输出队列
+    detections: List[DetectionResult] = field(default_factory=list)
+    crops: List[np.ndarray] = field(default_factory=list)  # 与有效检测结果一一对应
+    tracks: List[Track] = field(default_factory=list)  # 与crops一一对应的零件轨迹（启用跟踪时）
+    slices: List[np.ndarray] = field(default_factory=list)  # 需要分类的零件的(rows, cols, th, tw, C)切片视图
+    slice_parts: List[int] = field(default_factory=list)  # slices中每一项对应的零件序号（crops下标）
+    tile_grids: List[TileGrid] = field(default_factory=list)  # 与slices对应的切片网格，用于映射回帧坐标
+    # 每个有结果的零件一项：part、track_id、defect_types、heatmap，cached表示复用了轨迹上的结果
+    classifications: List[Dict[str, Any]] = field(default_factory=list)
+    defect_counts: List[int] = field(default_factory=list)  # 本视频源截至本帧的累计缺陷计数
+    heatmap: Optional[np.ndarray] = None  # 本帧最后一个零件的热力图
+    gated: bool = False  # 被运动门控跳过，检测结果沿用该视频源上一次的结果
+
+    @property
+    def valid_detections(self) -> List[DetectionResult]:
+        return [det for det in self.detections if det.valid]
+
+
+def classify_tasks(model2: Model2, tasks: Sequence[FrameTask],
+                   tile_cache: Optional[TileCache] = None) -> np.ndarray:
+    """把多帧中所有待分类零件的切片合并为一个批次分类，结果追加到各帧任务的classifications
+
+    Args:
+        model2 (Model2): 缺陷分类模型
+        tasks (Sequence[FrameTask]): 已完成切片的帧任务
+        tile_cache (TileCache, optional): 切片结果缓存，命中的切片不送入模型
+
+    Returns:
+        np.ndarray: 每帧新分类的零件中各缺陷类别的切片数，形状为(len(tasks), num_classes)
+    """
+    counts = np.zeros((len(tasks), model2.num_classes), dtype=np.int64)
+    parts = [tiles for task in tasks for tiles in task.slices]
+    if not parts:
+        return counts
+
+    batch = model2.stack_slices(parts)
+    if tile_cache is None:
+        result = model2.classify_batch(batch)
+        all_types, heatmaps = result['defect_types'], result['heatmaps']
+    else:
+        # 只在同一相机、零件网格中同一位置的切片之间复用结果
+        scopes = [(task.camera, position) for task in tasks for _ in task.slice_parts
+                  for position in range(model2.slices_per_part)]
+        all_types, scores = tile_cache.classify(model2, batch, scopes)
+        heatmaps = scores.reshape(-1, *model2.heatmap_size)
+    per_part = model2.slices_per_part
+    part = 0
+    for i, task in enumerate(tasks):
+        for index in task.slice_parts:
+            defect_types = all_types[part * per_part:(part + 1) * per_part]
+            heatmap = heatmaps[part]
+            track_id = task.tracks[index].track_id if task.tracks else None
+            task.classifications.append({'part': index, 'track_id': track_id, 'cached': False,
+                                         'defect_types': defect_types.tolist(), 'heatmap': heatmap})
+            task.heatmap = heatmap
+            counts[i] += np.bincount(defect_types, minlength=model2.num_classes)
+            part += 1
+    return counts
+
+
+def _put(q: queue.Queue, item, stop_event: threading.Event) -> bool:
+    """阻塞放入队列，直到成功或收到停止信号
+
+    Returns:
+        bool: 是否成功放入
+    """
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class _NotifyingQueue(queue.Queue):
+    """放入元素时置位ready事件的队列，供FairScheduler等待任意一路有帧"""
+
+    def __init__(self, maxsize: int, ready: threading.Event):
+        super().__init__(maxsize)
+        self._ready = ready
+
+    def _put(self, item):
+        super()._put(item)
+        self._ready.set()
+
+
+class FairScheduler:
+    """多路视频源的轮询调度
+
+    每路视频源有独立的有界输入队列，get()从上次取帧位置的下一路开始轮询，
+    某一路帧率再高也只能按轮次取到自己的份额，不会饿死其他视频源；
+    处理不过来的那一路阻塞在自己的队列上（或由其最新帧缓冲丢帧）。
+    提供与queue.Queue相同的get(timeout)接口，可直接作为PipelineStage的输入队列。
+    所有视频源都结束后，每次get()都返回结束哨兵。
+
+    Args:
+        num_sources (int): 视频源数量
+        maxsize (int): 每路输入队列的容量
+    """
+
+    def __init__(self, num_sources: int, maxsize: int):
+        self._ready = threading.Event()
+        self.queues = [_NotifyingQueue(maxsize, self._ready) for _ in range(num_sources)]
+        self._finished = [False] * num_sources
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def _next(self):
+        count = len(self.queues)
+        for k in range(count):
+            i = (self._cursor + k) % count
+            if self._finished[i]:
+                continue
+            try:
+                item = self.queues[i].get_nowait()
+            except queue.Empty:
+                continue
+            if item is _STOP:  # 该路视频源已结束
+                self._finished[i] = True
+                continue
+            self._cursor = (i + 1) % count
+            return item
+        return _STOP if all(self._finished) else None
+
+    def get(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                # 先清除再轮询：轮询之后放入的帧会重新置位事件，不会漏掉
+                self._ready.clear()
+                item = self._next()
+            if item is not None:
+                return item
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise queue.Empty
+            self._ready.wait(remaining)
+
+    def qsize(self) -> int:
+        return sum(q.qsize() for q in self.queues)
+
+
+class _StopLatch:
+    """同一阶段的多个工作线程都结束后，才向下游发送结束哨兵
+
+    下游每个工作线程消费一个哨兵，因此最后结束的线程发送downstream个。
+    """
+
+    def __init__(self, workers: int, downstream: int):
+        self._remaining = workers
+        self.downstream = downstream
+        self._lock = threading.Lock()
+
+    def done(self) -> int:
+        """登记一个工作线程结束，返回该线程应发送的哨兵数"""
+        with self._lock:
+            self._remaining -= 1
+            return self.downstream if self._remaining == 0 else 0
+
+
+class _ReorderBuffer:
+    """按每路视频源的采集顺序输出帧
+
+    采集时register登记帧序号；处理完成（done）或被丢弃（drop）的帧先暂存，
+    同一视频源所有更早登记的帧都已完成或丢弃后，才依次调用finish并放入该视频源的输出队列。
+    每路视频源一把锁，某一路输出队列满时只阻塞这一路。
+    """
+
+    def __init__(self, out_queues: Sequence[queue.Queue], finish: Callable[[FrameTask], None],
+                 stop_event: threading.Event):
+        self.out_queues = out_queues
+        self.finish = finish
+        self.stop_event = stop_event
+        self._order = [deque() for _ in out_queues]  # 每路已登记、尚未输出的帧序号
+        self._ready: List[Dict[int, Optional[FrameTask]]] = [{} for _ in out_queues]  # 帧序号 -> 完成的任务（丢弃为None）
+        self._locks = [threading.Lock() for _ in out_queues]
+
+    def register(self, task: FrameTask):
+        with self._locks[task.camera]:
+            self._order[task.camera].append(task.frame_id)
+
+    def done(self, tasks: Sequence[FrameTask]):
+        for task in tasks:
+            self._arrive(task.camera, task.frame_id, task)
+
+    def drop(self, task: FrameTask):
+        self._arrive(task.camera, task.frame_id, None)
+
+    def waiting(self) -> int:
+        """已完成、在等待更早的帧的帧数"""
+        return sum(len(ready) for ready in self._ready)
+
+    def _arrive(self, camera: int, frame_id: int, task: Optional[FrameTask]):
+        with self._locks[camera]:
+            order, ready = self._order[camera], self._ready[camera]
+            ready[frame_id] = task
+            while order and order[0] in ready:
+                task = ready.pop(order.popleft())
+                if task is None:
+                    continue
+                try:
+                    self.finish(task)
+                except Exception:
+                    logger.exception(f"汇总视频源 {camera} 第 {task.frame_id} 帧的结果时出错")
+                    continue
+                if not _put(self.out_queues[camera], task, self.stop_event):
+                    return
+
+
+class PipelineStage(threading.Thread):
+    """流水线中的单个处理阶段
+
+    从输入队列取任务，调用处理函数后放入输出队列。处理函数返回None或出错时丢弃该任务，
+    并以该任务调用on_drop（如果提供）。
+    结束时按stop_latch向输出队列转发结束哨兵，未指定时转发一个。
+    处理函数的耗时以阶段名记录到stats。
+    """
+
+    def __init__(self, name: str, func: Callable[[FrameTask], Optional[FrameTask]],
+                 in_queue: queue.Queue, out_queue: Optional[queue.Queue],
+                 stop_event: threading.Event, stats: PipelineStats,
+                 stop_latch: Optional[_StopLatch] = None, thread_name: Optional[str] = None,
+                 on_drop: Optional[Callable[[FrameTask], None]] = None):
+        super().__init__(name=thread_name or name, daemon=True)
+        self.stage_name = name
+        self.func = func
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.stats = stats
+        self.stop_latch = stop_latch
+        self.on_drop = on_drop
+
+    def _dropped(self, tasks: Sequence[FrameTask]):
+        if self.on_drop is not None:
+            for task in tasks:
+                self.on_drop(task)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                item = self.in_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+            if item is _STOP:
+                break
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception:
+                logger.exception(f"阶段 {self.name} 处理第 {item.frame_id} 帧时出错")
+                self._dropped([item])
+                continue
+            self.stats.record(self.stage_name, time.perf_counter() - start)
+
+            if result is None:
+                self._dropped([item])
+            elif self.out_queue is not None:
+                _put(self.out_queue, result, self.stop_event)
+
+        # 通知下游结束
+        if self.out_queue is not None:
+            for _ in range(self.stop_latch.done() if self.stop_latch else 1):
+                _put(self.out_queue, _STOP, self.stop_event)
+
+
+class BatchStage(PipelineStage):
+    """批处理阶段：一次取出输入队列中已有的任务（最多max_batch个）一起处理
+
+    处理函数接收任务列表并返回任务列表，结果交给emit输出（处理函数的耗时不包括emit）；
+    处理出错时整批任务交给on_drop。输出由调用方负责，结束哨兵不会转发。
+    """
+
+    def __init__(self, name: str, func: Callable[[List[FrameTask]], List[FrameTask]],
+                 in_queue: queue.Queue, emit: Callable[[List[FrameTask]], None],
+                 stop_event: threading.Event, stats: PipelineStats, max_batch: int,
+                 thread_name: Optional[str] = None, on_drop: Optional[Callable[[FrameTask], None]] = None):
+        super().__init__(name, func, in_queue, None, stop_event, stats, thread_name=thread_name, on_drop=on_drop)
+        self.emit = emit
+        self.max_batch = max_batch
+
+    def run(self):
+        stopping = False
+        while not stopping and not self.stop_event.is_set():
+            try:
+                item = self.in_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                break
+
+            # 不等待，只取走队列中已经就绪的任务
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.in_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            start = time.perf_counter()
+            try:
+                results = self.func(batch)
+            except Exception:
+                frame_ids = [task.frame_id for task in batch]
+                logger.exception(f"阶段 {self.name} 处理帧 {frame_ids} 时出错")
+                self._dropped(batch)
+                continue
+            self.stats.record(self.stage_name, time.perf_counter() - start)
+            self.emit(results)
+
+
+class CaptureStage(threading.Thread):
+    """采集阶段：从视频流读取帧并送入该视频源的输入队列
+
+    on_capture在帧送入输入队列前调用，用于登记输出顺序和运动门控（可把帧标记为gated）。
+    被门控的帧仍经过各阶段，只是不做定位和分类，保证输出顺序与采集顺序一致。
+    """
+
+    def __init__(self, stream, out_queue: queue.Queue, stop_event: threading.Event, stats: PipelineStats,
+                 name: str = "capture", camera: int = 0,
+                 on_capture: Optional[Callable[[FrameTask], None]] = None):
+        super().__init__(name=name, daemon=True)
+        self.stream = stream
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.stats = stats
+        self.camera = camera
+        self.on_capture = on_capture
+        self.frame_id = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            try:
+                result = self.stream.read()
+            except Exception:
+                logger.exception(f"{self.name} 读取视频流出错")
+                break
+            self.stats.record(self.name, time.perf_counter() - start)
+            if result is None:  # 视频流已停止
+                break
+
+            task = FrameTask(frame_id=self.frame_id, frame=result['frame'],
+                             timestamp=result.get('timestamp', time.time()), camera=self.camera)
+            self.frame_id += 1
+            if self.on_capture is not None:
+                self.on_capture(task)
+            if not _put(self.out_queue, task, self.stop_event):
+                return
+        _put(self.out_queue, _STOP, self.stop_event)
+
+
+class MultiCameraPipeline:
+    """多路视频源共用推理工作线程池的检测流水线
+
+    每路视频源有独立的采集线程、输入队列和输出队列；定位和分类由共享的工作线程完成，
+    每个模型实例对应一个工作线程（模型实例不在线程间共享）。
+    统计中共享阶段使用阶段名（locate/slice/classify），每路视频源的指标以
+    ``<视频源名>/`` 为前缀，如 ``cam1/capture``、``cam1/latency``（快门到分类完成）。
+
+    Args:
+        streams (Sequence): 视频流对象，需提供read()和stop()
+        model1s (Sequence[Model1]): 零件定位模型实例，每个实例一个定位工作线程
+        model2s (Sequence[Model2]): 缺陷分类模型实例，每个实例一个分类工作线程
+        output_queues (Sequence[queue.Queue]): 每路视频源分类完成的FrameTask放入对应队列
+        queue_size (int): 阶段间队列的容量（每路输入队列同样使用该容量）
+        max_batch_frames (int, optional): 分类阶段一个批次最多合并的帧数，默认为视频源数量
+        slice_grid (Tuple[int, int]): 零件切片的行列数，默认与Model2热力图尺寸一致
+        stats (PipelineStats): 各阶段耗时统计，默认新建
+        names (Sequence[str], optional): 各视频源在统计中的名称，默认cam0、cam1...；
+            名称为空字符串时不加前缀
+        tracking (bool): 是否跨帧跟踪零件，只对新零件或外观变化的零件分类
+        tile_cache_size (int): 切片结果缓存的容量（切片数），0表示不使用缓存；
+            缓存由所有视频源和分类线程共用，有漏检风险，见tile_cache.py
+        motion_gating (bool): 是否在定位前按画面变化跳过静止的帧
+        locate_width (int, optional): 定位时的帧宽度，更大的帧先缩小再检测，
+            检测框映射回原始分辨率后裁剪切片（见Model1.locate）；None表示在原始帧上检测
+    """
+
+    def __init__(self, streams: Sequence, model1s: Sequence[Model1], model2s: Sequence[Model2],
+                 output_queues: Sequence[queue.Queue], queue_size: int = 2,
+                 max_batch_frames: Optional[int] = None,
+                 slice_grid: Optional[Tuple[int, int]] = None,
+                 stats: Optional[PipelineStats] = None,
+                 names: Optional[Sequence[str]] = None,
+                 tracking: bool = model_config.TRACKING_ENABLED,
+                 tile_cache_size: int = model_config.TILE_CACHE_SIZE,
+                 motion_gating: bool = model_config.MOTION_GATE_ENABLED,
+                 locate_width: Optional[int] = model_config.LOCATE_WORKING_WIDTH):
+        if not streams or len(streams) != len(output_queues):
+            raise ValueError("视频源与输出队列的数量必须一致且不能为空")
+        if not model1s or not model2s:
+            raise ValueError("至少需要一个Model1和一个Model2实例")
+
+        self.streams = list(streams)
+        self.output_queues = list(output_queues)
+        self.names = list(names) if names is not None else [f"cam{i}" for i in range(len(streams))]
+        self.num_classes = num_classes = model2s[0].num_classes
+        self.slice_grid = slice_grid or model2s[0].heatmap_size
+        self.queue_size = queue_size
+        self.max_batch_frames = max_batch_frames or len(self.streams)
+        self.locate_width = locate_width
+        self.stats = stats or PipelineStats()
+
+        # 每路视频源的累计缺陷计数，仅在按采集顺序汇总结果时（_finish）在锁内写入
+        self.defect_counts = [[0] * num_classes for _ in self.streams]
+        self._counts_lock = threading.Lock()
+        self.last_batch_frames = 0
+
+        # 每路视频源一个跟踪器，只在切片阶段（单线程）中更新
+        self.trackers: List[Optional[IouTracker]] = [
+            IouTracker(iou_threshold=model_config.TRACK_IOU_THRESHOLD,
+                       max_missed=model_config.TRACK_MAX_MISSED,
+                       appearance_threshold=model_config.TRACK_APPEARANCE_THRESHOLD,
+                       pending_timeout=model_config.TRACK_PENDING_TIMEOUT) if tracking else None
+            for _ in self.streams
+        ]
+        # 每路视频源一个运动门控，由该视频源的采集线程调用
+        self.gates: List[Optional[MotionGate]] = [
+            MotionGate(method=model_config.MOTION_GATE_METHOD, width=model_config.MOTION_GATE_WIDTH,
+                       on_threshold=model_config.MOTION_GATE_ON_THRESHOLD,
+                       off_threshold=model_config.MOTION_GATE_OFF_THRESHOLD,
+                       hold_frames=model_config.MOTION_GATE_HOLD_FRAMES,
+                       max_skipped=model_config.MOTION_GATE_MAX_SKIPPED) if motion_gating else None
+            for _ in self.streams
+        ]
+        self._last_results: List[Optional[FrameTask]] = [None] * len(self.streams)  # 每路最近一次完成检测的帧
+        self.tile_cache = TileCache(tile_cache_size, tolerance=model_config.TILE_CACHE_TOLERANCE,
+                                    hash_size=model_config.TILE_CACHE_HASH_SIZE) if tile_cache_size > 0 else None
+
+        self._stop_event = threading.Event()
+        self.scheduler = FairScheduler(len(self.streams), queue_size)
+        self.slice_queue = queue.Queue(maxsize=queue_size)
+        self.classify_queue = queue.Queue(maxsize=queue_size * len(self.streams))
+        self.reorder = _ReorderBuffer(self.output_queues, self._finish, self._stop_event)
+
+        self.threads: List[threading.Thread] = [
+            CaptureStage(stream, self.scheduler.queues[i], self._stop_event, self.stats,
+                         name=self.stat_name(i, "capture"), camera=i, on_capture=self._admit)
+            for i, stream in enumerate(self.streams)
+        ]
+        locate_latch = _StopLatch(len(model1s), 1)
+        self.threads += [
+            PipelineStage("locate", partial(self._locate, model1), self.scheduler, self.slice_queue,
+                          self._stop_event, self.stats, locate_latch, thread_name=f"locate-{i}",
+                          on_drop=self.reorder.drop)
+            for i, model1 in enumerate(model1s)
+        ]
+        self.threads.append(
+            PipelineStage("slice", self._slice, self.slice_queue, self.classify_queue,
+                          self._stop_event, self.stats, _StopLatch(1, len(model2s)), on_drop=self.reorder.drop))
+        self.threads += [
+            BatchStage("classify", partial(self._classify, model2), self.classify_queue, self.reorder.done,
+                       self._stop_event, self.stats, self.max_batch_frames, thread_name=f"classify-{i}",
+                       on_drop=self.reorder.drop)
+            for i, model2 in enumerate(model2s)
+        ]
+
+        # 队列深度、批次大小，以及每路视频流自身的计数器（丢帧数、重连次数等）
+        self.gauge_names = []
+        self._add_gauge('slice_queue', self.slice_queue.qsize)
+        self._add_gauge('classify_queue', self.classify_queue.qsize)
+        self._add_gauge('classify_batch', lambda: self.last_batch_frames)
+        self._add_gauge('reorder_waiting', self.reorder.waiting)
+        if self.tile_cache is not None:
+            for name in self.tile_cache.counters():
+                self._add_gauge(name, lambda name=name: self.tile_cache.counters()[name])
+        for i, stream in enumerate(self.streams):
+            self._add_gauge(self.stat_name(i, 'locate_queue'), self.scheduler.queues[i].qsize)
+            for counter in (self.trackers[i], self.gates[i]):
+                if counter is not None:
+                    for name in counter.counters():
+                        self._add_gauge(self.stat_name(i, name),
+                                        lambda counter=counter, name=name: counter.counters()[name])
+            if hasattr(stream, 'counters'):
+                for name in stream.counters():
+                    self._add_gauge(self.stat_name(i, name), lambda stream=stream, name=name: stream.counters()[name])
+
+    def stat_name(self, camera: int, name: str) -> str:
+        """视频源camera的指标名"""
+        prefix = self.names[camera]
+        return f"{prefix}/{name}" if prefix else name
+
+    def _add_gauge(self, name: str, getter: Callable[[], float]):
+        self.gauge_names.append(name)
+        self.stats.add_gauge(name, getter)
+
+    # ---------------------------
+    # 各阶段处理函数
+    # ---------------------------
+    def _admit(self, task: FrameTask):
+        """采集线程在帧送入输入队列前调用：登记输出顺序，启用运动门控时做门控判断"""
+        self.reorder.register(task)
+        if self.gates[task.camera] is not None:
+            self._gate(task)
+
+    def _gate(self, task: FrameTask):
+        """运动门控（采集线程调用）：画面静止时把帧标记为gated，跳过定位和分类
+
+        被门控的帧不直接输出，而是和其他帧一样经过各阶段队列和重排缓冲，按顺序汇总时再沿用
+        该视频源在它之前最后一帧的结果（见_fill_gated），不会越过仍在处理中的较早的帧。
+        """
+        start = time.perf_counter()
+        task.gated = not self.gates[task.camera].update(task.frame)
+        self.stats.record(self.stat_name(task.camera, 'gate'), time.perf_counter() - start)
+
+    def _fill_gated(self, task: FrameTask):
+        """用该视频源最近一次完成检测的结果补全被门控的帧（需持有_counts_lock）"""
+        last = self._last_results[task.camera]
+        if last is not None:
+            task.detections = last.detections
+            task.classifications = [dict(result, cached=True) for result in last.classifications]
+            task.heatmap = last.heatmap
+        task.defect_counts = list(self.defect_counts[task.camera])
+
+    def _locate(self, model1: Model1, task: FrameTask) -> FrameTask:
+        if not task.gated:
+            task.detections, task.crops = model1.locate(task.frame, self.locate_width)
+        return task
+
+    def _slice(self, task: FrameTask) -> FrameTask:
+        if task.gated:
+            return task
+        # 多个定位线程时同一视频源的帧可能略微乱序，IoU关联对此不敏感
+        tracker = self.trackers[task.camera]
+        if tracker is None:
+            needs_classify = [True] * len(task.crops)
+        else:
+            task.tracks, needs_classify = tracker.update(task.valid_detections, task.crops, task.frame_id)
+
+        for index, (crop, need) in enumerate(zip(task.crops, needs_classify)):
+            if not need:
+                continue
+            tiles, grid = tile_image(crop, *self.slice_grid)
+            task.slices.append(tiles)
+            task.slice_parts.append(index)
+            task.tile_grids.append(grid)
+        if tracker is not None:
+            # 全部切片成功后才标记送检，切片出错时这些零件在下一帧重新送检
+            for index in task.slice_parts:
+                tracker.mark_pending(task.tracks[index], task.frame_id)
+        return task
+
+    def _classify(self, model2: Model2, tasks: List[FrameTask]) -> List[FrameTask]:
+        # 批次内所有帧（可能来自不同视频源）的零件切片一次前向完成分类，计数在_finish中按顺序累计
+        try:
+            classify_tasks(model2, tasks, self.tile_cache)
+        except Exception:
+            self._release_tracks(tasks)  # 分类失败的零件在下一帧重新送检
+            raise
+        self.last_batch_frames = len(tasks)
+        return tasks
+
+    def _finish(self, task: FrameTask):
+        """按采集顺序汇总一帧的结果（重排缓冲调用）：更新轨迹和累计计数，补全被门控的帧"""
+        with self._counts_lock:
+            if task.gated:
+                self._fill_gated(task)
+            else:
+                totals = self.defect_counts[task.camera]
+                if task.tracks:
+                    task_counts = self._update_tracks(task)
+                else:
+                    task_counts = np.zeros(self.num_classes, dtype=np.int64)
+                    for result in task.classifications:
+                        task_counts += np.bincount(result['defect_types'], minlength=self.num_classes)
+                for k, n in enumerate(task_counts):
+                    totals[k] += int(n)
+                task.defect_counts = list(totals)
+                self._last_results[task.camera] = task
+        self.stats.record(self.stat_name(task.camera, 'latency'), time.time() - task.timestamp)
+
+    def _update_tracks(self, task: FrameTask) -> np.ndarray:
+        """把新结果缓存到轨迹上，为其余零件补上缓存结果
+
+        Returns:
+            np.ndarray: 本帧带来的缺陷计数变化。每个零件只计入最新一次分类的结果，
+            重新分类时先扣除该零件之前计入的数量
+        """
+        num_classes = len(self.defect_counts[task.camera])
+        delta = np.zeros(num_classes, dtype=np.int64)
+        for result in task.classifications:
+            track = task.tracks[result['part']]
+            counts = np.bincount(result['defect_types'], minlength=num_classes)
+            if track.counted is not None:
+                delta -= track.counted
+            delta += counts
+            track.counted = counts
+            IouTracker.complete(track, task.frame_id, result)
+
+        classified = {result['part'] for result in task.classifications}
+        for index, track in enumerate(task.tracks):
+            if index not in classified and track.verdict is not None:
+                task.classifications.append(dict(track.verdict, part=index, cached=True))
+        task.classifications.sort(key=lambda result: result['part'])
+        if task.classifications:
+            task.heatmap = task.classifications[-1]['heatmap']
+        return delta
+
+    @staticmethod
+    def _release_tracks(tasks: Sequence[FrameTask]):
+        """清除这些帧对零件轨迹设置的送检标记"""
+        for task in tasks:
+            if task.tracks:
+                for index in task.slice_parts:
+                    IouTracker.release(task.tracks[index], task.frame_id)
+
+    # ---------------------------
+    # 生命周期
+    # ---------------------------
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        logger.info(f"检测流水线已启动：{len(self.streams)} 路视频源")
+
+    def stop(self):
+        """停止所有阶段（不关闭视频流）"""
+        self._stop_event.set()
+        for name in self.gauge_names:
+            self.stats.remove_gauge(name)
+
+    def join(self, timeout: Optional[float] = None):
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return any(thread.is_alive() for thread in self.threads)
+
+
+class InspectionPipeline(MultiCameraPipeline):
+    """单路视频源的分阶段检测流水线
+
+    Args:
+        stream: 视频流对象，需提供read()和stop()
+        model1 (Model1): 零件定位模型
+        model2 (Model2): 缺陷分类模型
+        output_queue (queue.Queue): 分类完成的FrameTask放入该队列，交给渲染阶段
+        queue_size (int): 阶段间队列的容量
+        slice_grid (Tuple[int, int]): 零件切片的行列数，默认与Model2热力图尺寸一致
+        stats (PipelineStats): 各阶段耗时统计，默认新建
+    """
+
+    def __init__(self, stream, model1: Model1, model2: Model2,
+                 output_queue: queue.Queue, queue_size: int = 2,
+                 slice_grid: Optional[Tuple[int, int]] = None,
+                 stats: Optional[PipelineStats] = None):
+        super().__init__([stream], [model1], [model2], [output_queue], queue_size=queue_size,
+                         slice_grid=slice_grid, stats=stats, names=[''])
+        self.stream = stream
+        self.output_queue = output_queue
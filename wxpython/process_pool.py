@@ -0,0 +1,466 @@
+# -*- coding: utf-8 -*-
+"""process_pool.py: 共享内存帧环与多进程推理
+
+线程池模式下，定位/分类前后的numpy预处理和后处理受GIL限制，难以随核数扩展。
+多进程模式中，父进程只负责采集、调度和汇总：
+
+- 采集线程读到的帧由调度线程写入共享内存帧环（multiprocessing.shared_memory）的空闲槽位，
+  这是跨进程唯一的一次复制；
+- 工作进程按槽位序号直接在共享内存上构造numpy视图，完成定位、切片、分类，
+  任务和结果都只是很小的记录（槽位序号、检测框、切片标签和热力图），不序列化帧；
+- 结果返回后父进程立即归还槽位，用原始帧（父进程中的数组）组装FrameTask交给输出队列。
+
+槽位数决定同时在途的帧数，槽位用完时调度线程阻塞（背压）。
+多个工作进程的结果返回顺序不确定，汇总线程按每路视频源的派发顺序逐帧输出（跟踪、计数也按此顺序），
+较早的帧未返回时后面的帧先暂存；被运动门控跳过的帧不占用槽位，同样排在这个顺序中。
+每个工作进程自行创建模型实例和切片结果缓存。跨帧跟踪需要按视频源串行更新，
+由父进程的汇总线程完成：工作进程仍对每个零件分类，汇总时已有结果的零件改用轨迹上缓存的结果，
+缺陷计数和结果存储与线程模式一样按零件去重。
+
+工作进程意外退出时，它手上的任务无法确定，汇总线程归还所有在途帧的槽位并停止流水线，
+不会一直等待永远不会返回的结果。
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from wxpython import model_config
+from wxpython.model_interface import DetectionResult, create_model1, create_model2
+from wxpython.motion import MotionGate
+from wxpython.pipeline import (CaptureStage, FairScheduler, FrameTask, MultiCameraPipeline, _POLL_INTERVAL, _STOP,
+                               _put, classify_tasks)
+from wxpython.stats import PipelineStats
+from wxpython.tile_cache import TileCache
+from wxpython.tiling import tile_image
+from wxpython.tracking import IouTracker
+
+logger = logging.getLogger(__name__)
+
+
+class FrameRing:
+    """共享内存中固定数量、固定容量的帧槽位
+
+    父进程以create=True创建并负责unlink；工作进程按名称打开同一块共享内存。
+
+    Args:
+        slots (int): 槽位数
+        slot_bytes (int): 每个槽位的字节数，帧的nbytes不能超过该值
+        name (str, optional): 打开已有共享内存时的名称
+        create (bool): 是否新建
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None, create: bool = True):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=slots * slot_bytes)
+        self.name = self.shm.name
+
+    def view(self, slot: int, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """槽位上的numpy视图（不复制）"""
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot: int, frame: np.ndarray):
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"帧大小 {frame.nbytes} 字节超过槽位容量 {self.slot_bytes} 字节")
+        self.view(slot, frame.shape, frame.dtype)[...] = frame
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+@dataclass
+class FrameJob:
+    """发给工作进程的任务：帧在共享内存中的位置"""
+    slot: int
+    camera: int
+    frame_id: int
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+@dataclass
+class FrameResult:
+    """工作进程返回的结果记录"""
+    slot: int
+    camera: int
+    frame_id: int
+    detections: List[DetectionResult] = field(default_factory=list)
+    classifications: List[Dict[str, Any]] = field(default_factory=list)
+    counts: Optional[np.ndarray] = None  # 本帧各缺陷类别的切片数
+    timings: Dict[str, float] = field(default_factory=dict)  # 各阶段在工作进程中的耗时（秒）
+    error: Optional[str] = None
+
+
+def _worker_main(index: int, ring_name: str, slots: int, slot_bytes: int,
+                 jobs: multiprocessing.Queue, results: multiprocessing.Queue,
+                 slice_grid: Optional[Tuple[int, int]], tile_cache_size: int, locate_width: Optional[int]):
+    """工作进程：加载模型后循环处理帧任务，收到None时退出"""
+    try:
+        ring = FrameRing(slots, slot_bytes, name=ring_name, create=False)
+        model1, model2 = create_model1(), create_model2()
+    except Exception as e:
+        results.put(('error', index, repr(e)))
+        return
+    grid = slice_grid or model2.heatmap_size
+    tile_cache = TileCache(tile_cache_size, tolerance=model_config.TILE_CACHE_TOLERANCE,
+                           hash_size=model_config.TILE_CACHE_HASH_SIZE) if tile_cache_size > 0 else None
+    results.put(('ready', index, model2.num_classes))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        result = FrameResult(job.slot, job.camera, job.frame_id)
+        try:
+            start = time.perf_counter()
+            task = FrameTask(frame_id=job.frame_id, frame=ring.view(job.slot, job.shape, job.dtype),
+                             timestamp=0.0, camera=job.camera)
+            task.detections, task.crops = model1.locate(task.frame, locate_width)
+            located = time.perf_counter()
+            for i, crop in enumerate(task.crops):
+                tiles, tile_grid = tile_image(crop, *grid)
+                task.slices.append(tiles)
+                task.slice_parts.append(i)
+                task.tile_grids.append(tile_grid)
+            sliced = time.perf_counter()
+            result.counts = classify_tasks(model2, [task], tile_cache)[0]
+            result.detections = task.detections
+            result.classifications = task.classifications
+            result.timings = {'locate': located - start, 'slice': sliced - located,
+                              'classify': time.perf_counter() - sliced}
+        except Exception as e:
+            result.error = repr(e)
+        finally:
+            task = None  # 不再持有共享内存上的视图（含裁剪区域），否则无法关闭共享内存
+        results.put(result)
+    ring.close()
+
+
+class ProcessInspectionPipeline(MultiCameraPipeline):
+    """多进程推理的检测流水线，接口与MultiCameraPipeline相同
+
+    采集、运动门控和统计沿用线程模式的实现，定位/切片/分类由工作进程完成。
+    统计中locate/slice/classify为工作进程内的耗时，ipc为任务往返的额外耗时。
+
+    Args:
+        streams (Sequence): 视频流对象，需提供read()和stop()
+        output_queues (Sequence[queue.Queue]): 每路视频源分类完成的FrameTask放入对应队列
+        processes (int): 工作进程数
+        ring_slots (int, optional): 共享内存帧环的槽位数，默认为工作进程数的两倍加视频源数量
+        slot_bytes (int): 每个槽位的字节数，需容纳最大的一帧
+        queue_size (int): 每路输入队列的容量
+        slice_grid (Tuple[int, int], optional): 零件切片的行列数，默认与Model2热力图尺寸一致
+        stats (PipelineStats, optional): 各阶段耗时统计，默认新建
+        names (Sequence[str], optional): 各视频源在统计中的名称
+        tracking (bool): 是否在汇总时跨帧跟踪零件，每个零件只计入一次缺陷计数
+        tile_cache_size (int): 每个工作进程的切片结果缓存容量，0表示不使用缓存
+        motion_gating (bool): 是否在定位前按画面变化跳过静止的帧
+        locate_width (int, optional): 定位时的帧宽度，见MultiCameraPipeline
+        start_timeout (float): 等待工作进程加载模型的最长时间（秒）
+    """
+
+    def __init__(self, streams: Sequence, output_queues: Sequence[queue.Queue],
+                 processes: int = 2, ring_slots: Optional[int] = None,
+                 slot_bytes: int = model_config.FRAME_SLOT_BYTES, queue_size: int = 2,
+                 slice_grid: Optional[Tuple[int, int]] = None,
+                 stats: Optional[PipelineStats] = None,
+                 names: Optional[Sequence[str]] = None,
+                 tracking: bool = model_config.TRACKING_ENABLED,
+                 tile_cache_size: int = model_config.TILE_CACHE_SIZE,
+                 motion_gating: bool = model_config.MOTION_GATE_ENABLED,
+                 locate_width: Optional[int] = model_config.LOCATE_WORKING_WIDTH,
+                 start_timeout: float = model_config.PROCESS_START_TIMEOUT):
+        # 不调用父类__init__：阶段和模型都不在本进程中创建
+        if not streams or len(streams) != len(output_queues):
+            raise ValueError("视频源与输出队列的数量必须一致且不能为空")
+        self.streams = list(streams)
+        self.output_queues = list(output_queues)
+        self.names = list(names) if names is not None else [f"cam{i}" for i in range(len(streams))]
+        self.processes = max(processes, 1)
+        self.slice_grid = slice_grid
+        self.tile_cache_size = tile_cache_size
+        self.locate_width = locate_width
+        self.start_timeout = start_timeout
+        self.stats = stats or PipelineStats()
+
+        self.num_classes = 0  # 工作进程加载模型后确定
+        self.defect_counts: List[List[int]] = []
+        self._counts_lock = threading.Lock()
+        # 每路视频源一个跟踪器，只在汇总线程中更新
+        self.trackers: List[Optional[IouTracker]] = [
+            IouTracker(iou_threshold=model_config.TRACK_IOU_THRESHOLD,
+                       max_missed=model_config.TRACK_MAX_MISSED,
+                       appearance_threshold=model_config.TRACK_APPEARANCE_THRESHOLD,
+                       pending_timeout=model_config.TRACK_PENDING_TIMEOUT) if tracking else None
+            for _ in self.streams
+        ]
+        self.gates: List[Optional[MotionGate]] = [
+            MotionGate(method=model_config.MOTION_GATE_METHOD, width=model_config.MOTION_GATE_WIDTH,
+                       on_threshold=model_config.MOTION_GATE_ON_THRESHOLD,
+                       off_threshold=model_config.MOTION_GATE_OFF_THRESHOLD,
+                       hold_frames=model_config.MOTION_GATE_HOLD_FRAMES,
+                       max_skipped=model_config.MOTION_GATE_MAX_SKIPPED) if motion_gating else None
+            for _ in self.streams
+        ]
+        self._last_results: List[Optional[FrameTask]] = [None] * len(self.streams)
+
+        self._stop_event = threading.Event()
+        self.scheduler = FairScheduler(len(self.streams), queue_size)
+        self.ring = FrameRing(ring_slots or self.processes * 2 + len(self.streams), slot_bytes)
+        self._free_slots: queue.Queue = queue.Queue()
+        for slot in range(self.ring.slots):
+            self._free_slots.put(slot)
+        self._pending: Dict[Tuple[int, int], Tuple[FrameTask, int, float]] = {}  # (视频源, 帧序号) -> (任务, 槽位, 派发时刻)
+        self._order: List[deque] = [deque() for _ in self.streams]  # 每路视频源按派发顺序排列的待输出帧
+        self._arrived: Dict[Tuple[int, int], Tuple[FrameResult, float]] = {}  # 已返回、等待按顺序输出的(结果, 往返耗时)
+        self._pending_lock = threading.Lock()
+        self._dispatch_done = threading.Event()
+
+        context = multiprocessing.get_context('spawn')  # 不继承父进程的线程和模型状态
+        self._jobs = context.Queue()
+        self._results = context.Queue()
+        self.workers = [
+            context.Process(target=_worker_main, name=f"inference-{i}", daemon=True,
+                            args=(i, self.ring.name, self.ring.slots, self.ring.slot_bytes,
+                                  self._jobs, self._results, slice_grid, tile_cache_size, locate_width))
+            for i in range(self.processes)
+        ]
+
+        self.threads: List[threading.Thread] = [
+            CaptureStage(stream, self.scheduler.queues[i], self._stop_event, self.stats,
+                         name=self.stat_name(i, "capture"), camera=i,
+                         on_capture=self._gate if self.gates[i] is not None else None)
+            for i, stream in enumerate(self.streams)
+        ]
+        self.threads.append(threading.Thread(target=self._dispatch, name="dispatch", daemon=True))
+        self.threads.append(threading.Thread(target=self._collect, name="collect", daemon=True))
+
+        self.gauge_names = []
+        self._add_gauge('ring_free_slots', self._free_slots.qsize)
+        self._add_gauge('frames_in_flight', lambda: len(self._pending))
+        for i, stream in enumerate(self.streams):
+            self._add_gauge(self.stat_name(i, 'locate_queue'), self.scheduler.queues[i].qsize)
+            for counter in (self.trackers[i], self.gates[i]):
+                if counter is not None:
+                    for name in counter.counters():
+                        self._add_gauge(self.stat_name(i, name),
+                                        lambda counter=counter, name=name: counter.counters()[name])
+            if hasattr(stream, 'counters'):
+                for name in stream.counters():
+                    self._add_gauge(self.stat_name(i, name), lambda stream=stream, name=name: stream.counters()[name])
+
+    # ---------------------------
+    # 调度与汇总（父进程中的线程）
+    # ---------------------------
+    def _acquire_slot(self) -> Optional[int]:
+        while not self._stop_event.is_set():
+            try:
+                return self._free_slots.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+    def _dispatch(self):
+        """调度线程：按轮询顺序取帧，写入空闲槽位后派发给工作进程"""
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    task = self.scheduler.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if task is _STOP:  # 所有视频源都已结束
+                    break
+                if task.gated:
+                    with self._pending_lock:
+                        self._order[task.camera].append(task)
+                    continue
+                slot = self._acquire_slot()
+                if slot is None:
+                    break
+                start = time.perf_counter()
+                try:
+                    self.ring.write(slot, task.frame)
+                except ValueError:
+                    logger.exception(f"{self.stat_name(task.camera, 'capture')} 帧 {task.frame_id} 无法放入帧环")
+                    self._free_slots.put(slot)
+                    continue
+                self.stats.record('ring_write', time.perf_counter() - start)
+                with self._pending_lock:
+                    if self._stop_event.is_set():  # 工作进程已退出，在途帧已被丢弃
+                        self._free_slots.put(slot)
+                        break
+                    self._pending[(task.camera, task.frame_id)] = (task, slot, time.perf_counter())
+                    self._order[task.camera].append(task)
+                self._jobs.put(FrameJob(slot, task.camera, task.frame_id, task.frame.shape, task.frame.dtype.str))
+        finally:
+            self._dispatch_done.set()
+
+    def _collect(self):
+        """汇总线程：归还槽位，按每路视频源的派发顺序补全FrameTask并送入输出队列"""
+        checked = time.monotonic()
+        while not self._stop_event.is_set():
+            self._drain()
+            if self._dispatch_done.is_set() and not self._pending and not any(self._order):
+                break
+            if time.monotonic() - checked >= _POLL_INTERVAL:
+                checked = time.monotonic()
+                if not self._workers_alive():
+                    break
+            try:
+                result = self._results.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            self._free_slots.put(result.slot)
+            with self._pending_lock:
+                _, _, dispatched = self._pending.pop((result.camera, result.frame_id))
+                self._arrived[(result.camera, result.frame_id)] = (result, time.perf_counter() - dispatched)
+
+    def _drain(self):
+        """依次输出每路视频源队首已经可以输出的帧（结果已返回，或被门控的帧）"""
+        for camera, order in enumerate(self._order):
+            while True:
+                with self._pending_lock:
+                    if not order:
+                        break
+                    task = order[0]
+                    arrived = None
+                    if not task.gated:
+                        arrived = self._arrived.pop((camera, task.frame_id), None)
+                        if arrived is None:
+                            break  # 较早的帧仍在处理中
+                    order.popleft()
+                if arrived is None:
+                    with self._counts_lock:
+                        self._fill_gated(task)
+                elif not self._complete(task, *arrived):
+                    continue
+                _put(self.output_queues[camera], task, self._stop_event)
+
+    def _complete(self, task: FrameTask, result: FrameResult, elapsed: float) -> bool:
+        """用工作进程返回的记录补全FrameTask并更新计数，处理出错时返回False"""
+        if result.error is not None:
+            logger.error(f"工作进程处理 {self.stat_name(task.camera, 'frame')} {task.frame_id} 时出错: {result.error}")
+            return False
+
+        for name, seconds in result.timings.items():
+            self.stats.record(name, seconds)
+        self.stats.record('ipc', max(elapsed - sum(result.timings.values()), 0.0))
+
+        task.detections = result.detections
+        task.classifications = result.classifications
+        if task.classifications:
+            task.heatmap = task.classifications[-1]['heatmap']
+        with self._counts_lock:
+            totals = self.defect_counts[task.camera]
+            counts = result.counts
+            if self.trackers[task.camera] is not None:
+                counts = self._track(self.trackers[task.camera], task)
+            for k, n in enumerate(counts):
+                totals[k] += int(n)
+            task.defect_counts = list(totals)
+            self._last_results[task.camera] = task
+        self.stats.record(self.stat_name(task.camera, 'latency'), time.time() - task.timestamp)
+        return True
+
+    def _track(self, tracker: IouTracker, task: FrameTask) -> np.ndarray:
+        """用父进程中的原始帧更新跟踪器，只保留需要（重新）分类的零件的新结果
+
+        Returns:
+            np.ndarray: 本帧带来的缺陷计数变化，见MultiCameraPipeline._update_tracks
+        """
+        detections = task.valid_detections
+        task.crops = [task.frame[y1:y2, x1:x2] for x1, y1, x2, y2 in (det.bbox for det in detections)]
+        task.tracks, needs_classify = tracker.update(detections, task.crops, task.frame_id)
+        fresh = []
+        for result in task.classifications:
+            if needs_classify[result['part']]:
+                track = task.tracks[result['part']]
+                tracker.mark_pending(track, task.frame_id)
+                fresh.append(dict(result, track_id=track.track_id))
+        task.classifications = fresh
+        task.slice_parts = [result['part'] for result in fresh]
+        return self._update_tracks(task)
+
+    def _workers_alive(self) -> bool:
+        """检查工作进程，有进程意外退出时丢弃所有在途帧并停止流水线"""
+        dead = [worker for worker in self.workers if not worker.is_alive()]
+        if not dead:
+            return True
+        for worker in dead:
+            logger.error(f"工作进程 {worker.name} 意外退出（退出码 {worker.exitcode}），停止检测流水线")
+        # 无法确定退出的进程持有哪个任务，丢弃全部在途帧并归还其槽位，调度线程随停止信号退出
+        with self._pending_lock:
+            self._stop_event.set()
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._arrived.clear()
+            for order in self._order:
+                order.clear()
+        for _, slot, _ in pending:
+            self._free_slots.put(slot)
+        logger.error(f"丢弃 {len(pending)} 个在途帧")
+        return False
+
+    # ---------------------------
+    # 生命周期
+    # ---------------------------
+    def start(self):
+        """启动工作进程并等待其加载模型，再启动采集、调度和汇总线程"""
+        for worker in self.workers:
+            worker.start()
+        deadline = time.monotonic() + self.start_timeout
+        ready = 0
+        try:
+            while ready < len(self.workers):
+                try:
+                    message = self._results.get(timeout=max(deadline - time.monotonic(), 0.001))
+                except queue.Empty:
+                    raise RuntimeError(f"工作进程未在 {self.start_timeout} 秒内完成模型加载")
+                status, index, payload = message
+                if status == 'error':
+                    raise RuntimeError(f"工作进程 {index} 加载模型失败: {payload}")
+                self.num_classes = payload
+                ready += 1
+        except Exception:
+            self.stop()
+            self._shutdown_workers()
+            raise
+        self.defect_counts = [[0] * self.num_classes for _ in self.streams]
+        for thread in self.threads:
+            thread.start()
+        logger.info(f"检测流水线已启动：{len(self.streams)} 路视频源，{len(self.workers)} 个推理进程，"
+                    f"帧环 {self.ring.slots} 个槽位")
+
+    def join(self, timeout: Optional[float] = None):
+        super().join(timeout)
+        self._shutdown_workers(timeout)
+
+    def _shutdown_workers(self, timeout: Optional[float] = None):
+        """通知工作进程退出，超时未退出的强制结束，最后释放共享内存"""
+        if self.ring is None:
+            return
+        for worker in self.workers:
+            if worker.is_alive():
+                self._jobs.put(None)
+        for worker in self.workers:
+            if worker.pid is None:
+                continue
+            worker.join(timeout if timeout is not None else 5)
+            if worker.is_alive():
+                logger.warning(f"工作进程 {worker.name} 未响应退出信号，强制结束")
+                worker.terminate()
+                worker.join(1)
+        self.ring.close()
+        self.ring.unlink()
+        self.ring = None
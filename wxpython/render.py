@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""render.py: 与GUI无关的帧渲染
+
+把帧一次缩放到显示尺寸，写入预分配的双缓冲区并原地绘制检测框。
+VideoCanvas和离线基准测试共用这一渲染路径。
+
+渲染任务经CoalescingQueue交给渲染线程：显示跟不上时只渲染最新的帧，
+较旧的帧直接丢弃，不会在内存中堆积，也不会显示过时的画面。
+"""
+import collections
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from wxpython.model_interface import DetectionResult
+
+
+def prepare_boxes(detections: List[DetectionResult]) -> List[Tuple]:
+    """准备绘制边界框的数据
+
+    Args:
+        detections (List[DetectionResult]): 检测结果列表
+
+    Returns:
+        List[Tuple]: 包含(bbox, label, color)的列表
+    """
+    boxes = []
+    for det in detections:
+        if not det.valid:
+            continue
+
+        # 根据置信度选择颜色
+        color = (0, 255, 0) if det.confidence >= 0.8 else (0, 165, 255)
+        label = f"Part {det.confidence:.2f}"
+        boxes.append((det.bbox, label, color))
+
+    return boxes
+
+
+class FrameRenderer:
+    """双缓冲帧渲染器
+
+    渲染线程写后缓冲区，完成后与前缓冲区交换；显示端在锁内读取前缓冲区。
+
+    Attributes:
+        target_size (Tuple[int, int]): 显示区域尺寸 (w, h)，帧按宽高比缩放到其内
+    """
+
+    def __init__(self, target_size: Tuple[int, int] = (1, 1)):
+        self.target_size = target_size
+        self.lock = threading.Lock()
+        self._front: Optional[np.ndarray] = None  # 前缓冲区：显示端读取
+        self._back: Optional[np.ndarray] = None   # 后缓冲区：渲染线程写入
+
+    @property
+    def front(self) -> Optional[np.ndarray]:
+        """最近一次渲染完成的帧，读取时应持有lock"""
+        return self._front
+
+    def render(self, frame: np.ndarray, boxes: List[Tuple]) -> np.ndarray:
+        """缩放帧并绘制叠加框
+
+        Args:
+            frame (np.ndarray): RGB帧，不会被修改
+            boxes (List[Tuple]): 原始帧坐标下的(bbox, label, color)列表
+
+        Returns:
+            np.ndarray: 渲染结果（交换后的前缓冲区）
+        """
+        if frame.ndim == 2:  # 灰度图像
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
+        elif frame.shape[2] == 4:  # RGBA图像
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2RGB)
+
+        # 保持宽高比，一次缩放到显示尺寸
+        height, width = frame.shape[:2]
+        target_w, target_h = self.target_size
+        scale = min(target_w / width, target_h / height)
+        target_shape = (max(int(height * scale), 1), max(int(width * scale), 1), 3)
+        if self._back is None or self._back.shape != target_shape:
+            self._back = np.empty(target_shape, dtype=np.uint8)
+        buffer = self._back
+        cv2.resize(frame, (target_shape[1], target_shape[0]), dst=buffer, interpolation=cv2.INTER_LINEAR)
+
+        # 在缩放后的缓冲区上原地绘制边界框
+        for box, label, color in boxes:
+            x1, y1, x2, y2 = (int(v * scale) for v in box)
+            cv2.rectangle(buffer, (x1, y1), (x2, y2), color, 2)
+
+            # 添加标签
+            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+            cv2.rectangle(buffer, (x1, y1 - 20), (x1 + label_size[0], y1), color, -1)
+            cv2.putText(buffer, label, (x1, y1 - 5),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+        # 交换前后缓冲区
+        with self.lock:
+            self._front, self._back = buffer, self._front
+        return buffer
+
+
+class CoalescingQueue:
+    """只保留最新任务的有界队列（线程安全）
+
+    put()从不阻塞：队列已满时丢弃最旧的任务。close()清空待处理的任务并放入结束标记None，
+    之后的put()被忽略，消费者取到None后退出。
+
+    Args:
+        maxsize (int): 最多保留的待处理任务数，通常为1~2
+    """
+
+    def __init__(self, maxsize: int = 1):
+        self.maxsize = max(maxsize, 1)
+        self._items: collections.deque = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.received = 0  # 放入的任务数
+        self.dropped = 0  # 被更新的任务顶替而丢弃的任务数
+
+    def put(self, item: Any) -> bool:
+        """放入任务，返回是否因此丢弃了较旧的任务"""
+        with self._cond:
+            if self._closed:
+                return False
+            self.received += 1
+            dropped = len(self._items) >= self.maxsize
+            if dropped:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+            return dropped
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """取出最旧的待处理任务，超时抛出queue.Empty，关闭后返回None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                raise queue.Empty
+            if self._closed:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        """丢弃待处理的任务并通知消费者结束（不阻塞）"""
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    @property
+    def drop_rate(self) -> float:
+        return self.dropped / self.received if self.received else 0.0
+
+    def counters(self) -> Dict[str, float]:
+        return {
+            'render_queue': self.qsize(),
+            'render_dropped': self.dropped,
+            'render_drop_rate': round(self.drop_rate, 3),
+        }
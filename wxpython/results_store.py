@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""results_store.py: 检测结果的持久化存储
+
+每个新分类的零件（不含复用轨迹缓存或运动门控沿用的结果）写入本地SQLite数据库一行：
+采集时间、视频源、帧序号、轨迹、边界框、全部切片的缺陷类型和热力图。
+
+结果线程只把记录放入有界队列（不阻塞，队列满时丢弃并计数），
+由单独的写入线程按批次在一个事务中写入。数据库使用WAL模式，导出报告时可以边写边读；
+导出按游标分批读取并逐行写入CSV，不会把整个班次的结果读入内存。
+"""
+import csv
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from wxpython.pipeline import FrameTask
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parts (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    camera INTEGER NOT NULL,
+    frame_id INTEGER NOT NULL,
+    track_id INTEGER,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+    defect_tiles INTEGER NOT NULL,
+    tile_labels BLOB NOT NULL,
+    heatmap_rows INTEGER NOT NULL,
+    heatmap_cols INTEGER NOT NULL,
+    heatmap BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_parts_timestamp ON parts (timestamp);
+CREATE INDEX IF NOT EXISTS idx_parts_camera_timestamp ON parts (camera, timestamp);
+CREATE INDEX IF NOT EXISTS idx_parts_defects ON parts (defect_tiles) WHERE defect_tiles > 0;
+"""
+
+_INSERT = """
+INSERT INTO parts (timestamp, camera, frame_id, track_id, x1, y1, x2, y2,
+                   defect_tiles, tile_labels, heatmap_rows, heatmap_cols, heatmap)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_CSV_HEADER = ['time', 'timestamp', 'camera', 'frame_id', 'track_id', 'x1', 'y1', 'x2', 'y2',
+               'defect_tiles', 'tile_labels', 'heatmap']
+
+_STOP = object()  # 写入线程的结束标记
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # WAL模式下断电最多丢失最后几个事务，不会损坏数据库
+    return conn
+
+
+def task_records(task: FrameTask) -> List[Tuple]:
+    """把一帧中新分类的零件转换为数据库记录"""
+    records = []
+    detections = task.valid_detections
+    for result in task.classifications:
+        if result['cached']:
+            continue
+        labels = np.asarray(result['defect_types'], dtype=np.uint8)
+        heatmap = np.asarray(result['heatmap'], dtype=np.float32)
+        x1, y1, x2, y2 = (int(v) for v in detections[result['part']].bbox)
+        records.append((
+            task.timestamp, task.camera, task.frame_id, result['track_id'], x1, y1, x2, y2,
+            int(np.count_nonzero(labels)), labels.tobytes(),
+            heatmap.shape[0], heatmap.shape[1], heatmap.tobytes(),
+        ))
+    return records
+
+
+class ResultStore:
+    """异步、分批写入的检测结果存储
+
+    Args:
+        path (str): SQLite数据库文件路径，目录不存在时自动创建
+        batch_size (int): 一个事务最多写入的记录数
+        flush_interval (float): 记录在队列中最多等待的时间（秒），到时即使不满一批也写入
+        queue_size (int): 待写入记录的队列容量，写入跟不上时新记录被丢弃
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 1.0,
+                 queue_size: int = 10000):
+        self.path = path
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.written = 0  # 已写入的记录数
+        self.dropped = 0  # 队列满时丢弃的记录数
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = _connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._thread = threading.Thread(target=self._writer, name="result-store", daemon=True)
+        self._thread.start()
+
+    def submit(self, task: FrameTask):
+        """登记一帧的结果（检测服务的结果回调，不阻塞）"""
+        for record in task_records(task):
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+
+    def _writer(self):
+        """写入线程：攒够一批或等待超过flush_interval后在一个事务中写入"""
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get(timeout=max(deadline - time.monotonic(), 0.001))
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            if not batch:
+                continue
+            try:
+                with self._conn:
+                    self._conn.executemany(_INSERT, batch)
+                self.written += len(batch)
+            except sqlite3.Error:
+                logger.exception(f"写入检测结果失败，丢弃 {len(batch)} 条记录")
+                self.dropped += len(batch)
+
+    def counters(self) -> Dict[str, int]:
+        return {
+            'results_written': self.written,
+            'results_pending': self._queue.qsize(),
+            'results_dropped': self.dropped,
+        }
+
+    def close(self, timeout: float = 5.0):
+        """写完队列中剩余的记录后关闭数据库"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)  # 写入线程持续消费队列，这里最多等待一个批次
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("检测结果写入线程未在超时内结束")
+            return
+        self._conn.close()
+        logger.info(f"检测结果已保存至 {self.path}（{self.written} 条，丢弃 {self.dropped} 条）")
+
+
+def export_csv(db_path: str, csv_path: str, start: Optional[float] = None,
+               end: Optional[float] = None, chunk_size: int = 1000) -> int:
+    """把数据库中的零件记录按时间顺序导出为CSV
+
+    使用独立的只读连接按游标分批读取，可在检测进行中导出（只包含已提交的记录）。
+
+    Args:
+        db_path (str): 数据库文件路径
+        csv_path (str): 输出的CSV文件路径
+        start (float, optional): 起始时间戳（含），默认不限
+        end (float, optional): 结束时间戳（不含），默认不限
+        chunk_size (int): 每次从数据库读取的行数
+
+    Returns:
+        int: 导出的记录数
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            "SELECT timestamp, camera, frame_id, track_id, x1, y1, x2, y2, defect_tiles, "
+            "tile_labels, heatmap_rows, heatmap_cols, heatmap FROM parts "
+            "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+            (start if start is not None else float('-inf'), end if end is not None else float('inf')))
+        count = 0
+        with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:  # 带BOM，Excel可直接打开
+            writer = csv.writer(f)
+            writer.writerow(_CSV_HEADER)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for (timestamp, camera, frame_id, track_id, x1, y1, x2, y2, defect_tiles,
+                     tile_labels, heatmap_rows, heatmap_cols, heatmap) in rows:
+                    labels = np.frombuffer(tile_labels, dtype=np.uint8)
+                    values = np.frombuffer(heatmap, dtype=np.float32).reshape(heatmap_rows, heatmap_cols)
+                    writer.writerow([
+                        datetime.fromtimestamp(timestamp).isoformat(sep=' ', timespec='milliseconds'),
+                        f"{timestamp:.3f}", camera, frame_id, track_id, x1, y1, x2, y2, defect_tiles,
+                        ' '.join(map(str, labels)),
+                        ';'.join(' '.join(f"{v:.3f}" for v in row) for row in values),
+                    ])
+                count += len(rows)
+        return count
+    finally:
+        conn.close()
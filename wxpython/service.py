@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""service.py: 不依赖wx的检测服务
+
+把 视频流 -> 定位 -> 切片 -> 分类 -> 汇总 封装为可独立运行的服务，
+只导入numpy/OpenCV和推理后端，不导入wx和matplotlib。
+GUI只是服务的一个客户端：通过add_sink()接收每帧结果并负责显示；
+生产工位上不需要界面时直接以守护进程方式运行本模块。
+
+视频源用字符串描述：
+
+- ``camera:0`` 或 ``0``: 本地摄像头
+- ``rtsp://...``、``http://...``: 网络视频流
+- 视频文件或图像目录的路径: 文件回放
+
+用法::
+
+    python -m wxpython.service                                  # 使用model_config.SERVICE_SOURCES
+    python -m wxpython.service --sources camera:0 rtsp://192.168.1.100/ --stats-json stats.json
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from wxpython import model_config
+from wxpython.heatmap import HeatmapAccumulator
+from wxpython.log_config import configure_logging
+from wxpython.model_interface import Model1, Model2, create_model1, create_model2
+from wxpython.pipeline import FrameTask, MultiCameraPipeline
+from wxpython.process_pool import ProcessInspectionPipeline
+from wxpython.results_store import ResultStore
+from wxpython.stats import PipelineStats
+from wxpython.streams import CameraStream, NetworkStream, ReplayStream
+
+logger = logging.getLogger(__name__)
+
+_POLL_INTERVAL = 0.1  # 阻塞操作的轮询间隔（秒），用于及时响应停止信号
+
+
+def open_stream(source: str, pacing: str = 'realtime', loop: bool = False):
+    """按视频源描述打开视频流
+
+    Args:
+        source (str): 视频源描述，见模块说明
+        pacing (str): 文件回放的节奏，见ReplayStream
+        loop (bool): 文件回放结束后是否从头循环
+
+    Returns:
+        视频流对象
+    """
+    if source.startswith('camera:'):
+        return CameraStream(int(source.split(':', 1)[1]))
+    if source.isdigit():
+        return CameraStream(int(source))
+    if '://' in source:
+        return NetworkStream(source)
+    if os.path.exists(source):
+        return ReplayStream(source, pacing=pacing, loop=loop)
+    raise ValueError(f"无法识别的视频源: {source}")
+
+
+@dataclass
+class CameraTotals:
+    """单路视频源的累计结果"""
+    name: str
+    frames: int = 0  # 已分类的帧数
+    parts: int = 0  # 检测到的有效零件数（逐帧累计）
+    defect_counts: List[int] = field(default_factory=list)  # 各类别切片数
+    last_timestamp: float = 0.0  # 最近一帧的采集时间
+
+
+class ResultAggregator:
+    """汇总各路视频源的检测结果（线程安全）
+
+    新分类的零件（不含复用的缓存结果）同时累计到所有视频源共用的长期热力图heatmaps。
+    """
+
+    def __init__(self, names: Sequence[str], num_classes: int,
+                 heatmap_alpha: float = model_config.HEATMAP_EWMA_ALPHA):
+        self.num_classes = num_classes
+        self.cameras = [CameraTotals(name=name, defect_counts=[0] * num_classes) for name in names]
+        self.last_heatmap: Optional[np.ndarray] = None
+        self.heatmap_alpha = heatmap_alpha
+        self.heatmaps: Optional[HeatmapAccumulator] = None  # 收到第一个热力图时按其尺寸创建
+        self._lock = threading.Lock()
+
+    def update(self, task: FrameTask):
+        with self._lock:
+            totals = self.cameras[task.camera]
+            totals.frames += 1
+            totals.parts += len(task.classifications)
+            totals.last_timestamp = task.timestamp
+            if task.defect_counts:
+                totals.defect_counts = list(task.defect_counts)
+            if task.heatmap is not None:
+                self.last_heatmap = task.heatmap
+                if self.heatmaps is None:
+                    self.heatmaps = HeatmapAccumulator(task.heatmap.shape, self.heatmap_alpha)
+        new_parts = [result for result in task.classifications if not result['cached']]
+        if new_parts and self.heatmaps is not None:
+            self.heatmaps.update([result['defect_types'] for result in new_parts],
+                                 np.stack([result['heatmap'] for result in new_parts]))
+
+    def total_defect_counts(self) -> List[int]:
+        """所有视频源合计的各类别切片数"""
+        with self._lock:
+            return [sum(c.defect_counts[k] for c in self.cameras) for k in range(self.num_classes)]
+
+    def summary(self) -> List[Dict]:
+        with self._lock:
+            return [asdict(c) for c in self.cameras]
+
+    def format_summary(self) -> str:
+        lines = []
+        for c in self.summary():
+            defects = sum(c['defect_counts'][1:])  # 不包括正常类别
+            lines.append(f"{c['name']}: {c['frames']} 帧, {c['parts']} 个零件, 缺陷切片 {defects}")
+        return '\n'.join(lines)
+
+
+class InspectionService:
+    """无界面的检测服务
+
+    Args:
+        sources (Sequence): 视频源描述字符串或已打开的视频流对象
+        model1s (Sequence[Model1], optional): 定位模型实例，默认在load_models()中按model_config创建
+        model2s (Sequence[Model2], optional): 分类模型实例，同上
+        workers (int): 未提供模型实例时，定位/分类各创建的工作线程数
+        max_batch_frames (int, optional): 分类阶段一个批次最多合并的帧数
+        slice_grid (Tuple[int, int], optional): 零件切片的行列数
+        stats (PipelineStats, optional): 统计对象，默认新建
+        pacing (str): 文件回放的节奏
+        queue_size (int): 流水线阶段间队列的容量
+        processes (int): 大于0时定位/分类在该数量的工作进程中运行（各进程自行创建模型，
+            忽略model1s/model2s和workers），0表示使用线程池
+    """
+
+    def __init__(self, sources: Sequence[Union[str, object]],
+                 model1s: Optional[Sequence[Model1]] = None,
+                 model2s: Optional[Sequence[Model2]] = None,
+                 workers: int = model_config.INFERENCE_WORKERS,
+                 max_batch_frames: Optional[int] = model_config.MAX_BATCH_FRAMES,
+                 slice_grid: Optional[Tuple[int, int]] = None,
+                 stats: Optional[PipelineStats] = None,
+                 pacing: str = 'realtime', queue_size: int = 2,
+                 processes: int = model_config.INFERENCE_PROCESSES):
+        if not sources:
+            raise ValueError("至少需要一个视频源")
+        self.sources = list(sources)
+        self.model1s = list(model1s) if model1s else []
+        self.model2s = list(model2s) if model2s else []
+        self.workers = max(workers, 1)
+        self.max_batch_frames = max_batch_frames
+        self.slice_grid = slice_grid
+        self.stats = stats or PipelineStats()
+        self.pacing = pacing
+        self.queue_size = queue_size
+        self.processes = processes
+
+        self.streams = []
+        self.pipeline: Optional[MultiCameraPipeline] = None
+        self.aggregator: Optional[ResultAggregator] = None
+        self._sinks: List[Callable[[FrameTask], None]] = []
+        self._result_threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+
+    def add_sink(self, sink: Callable[[FrameTask], None]):
+        """登记结果回调，每帧汇总后在该视频源的结果线程中调用"""
+        self._sinks.append(sink)
+
+    def load_models(self):
+        """按model_config创建尚未提供的模型实例（多进程模式下由工作进程创建）"""
+        if self.processes > 0:
+            return
+        if not self.model1s:
+            self.model1s = [create_model1() for _ in range(self.workers)]
+        if not self.model2s:
+            self.model2s = [create_model2() for _ in range(self.workers)]
+
+    def stat_name(self, camera: int, name: str) -> str:
+        return self.pipeline.stat_name(camera, name)
+
+    # ---------------------------
+    # 生命周期
+    # ---------------------------
+    def start(self):
+        """打开视频流并启动流水线，任一视频源打开失败时关闭已打开的视频流并抛出异常"""
+        self.load_models()
+        try:
+            for source in self.sources:
+                self.streams.append(open_stream(source, self.pacing) if isinstance(source, str) else source)
+        except Exception:
+            self._close_streams()
+            raise
+
+        output_queues = [queue.Queue(maxsize=self.queue_size) for _ in self.streams]
+        try:
+            if self.processes > 0:
+                self.pipeline = ProcessInspectionPipeline(
+                    streams=self.streams,
+                    output_queues=output_queues,
+                    processes=self.processes,
+                    queue_size=self.queue_size,
+                    slice_grid=self.slice_grid,
+                    stats=self.stats,
+                )
+            else:
+                self.pipeline = MultiCameraPipeline(
+                    streams=self.streams,
+                    model1s=self.model1s,
+                    model2s=self.model2s,
+                    output_queues=output_queues,
+                    queue_size=self.queue_size,
+                    max_batch_frames=self.max_batch_frames,
+                    slice_grid=self.slice_grid,
+                    stats=self.stats,
+                )
+            self.pipeline.start()  # 多进程模式下等待工作进程加载模型
+        except Exception:
+            self._close_streams()
+            raise
+        self.aggregator = ResultAggregator(self.pipeline.names, self.pipeline.num_classes)
+        self._stop_event.clear()
+        self._result_threads = [
+            threading.Thread(target=self._result_worker, args=(output_queue,),
+                             name=f"result-{i}", daemon=True)
+            for i, output_queue in enumerate(output_queues)
+        ]
+        for thread in self._result_threads:
+            thread.start()
+        logger.info(f"检测服务已启动：{', '.join(str(s) for s in self.sources)}")
+
+    def _result_worker(self, output_queue: queue.Queue):
+        """结果线程：汇总一路视频源的结果并转交给各回调"""
+        while not self._stop_event.is_set():
+            try:
+                task = output_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if not self.pipeline.is_alive():  # 所有视频源已结束且结果已取完
+                    break
+                continue
+            self.aggregator.update(task)
+            for sink in self._sinks:
+                try:
+                    sink(task)
+                except Exception:
+                    logger.exception("结果回调出错")
+
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._result_threads)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待所有视频源结束，返回服务是否已结束"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._result_threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        return not self.is_running()
+
+    def _close_streams(self):
+        for stream in self.streams:
+            stream.stop()
+        self.streams = []
+
+    def stop(self):
+        """停止视频流、流水线和结果线程"""
+        self._close_streams()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline.join()
+        self._stop_event.set()
+        for thread in self._result_threads:
+            thread.join(timeout=1)
+        self._result_threads = []
+        logger.info("检测服务已停止")
+
+
+def write_report(path: str, service: InspectionService):
+    """把当前统计和汇总结果写入JSON（先写临时文件再替换，读取方不会读到半个文件）"""
+    report = {
+        'stats': service.stats.snapshot(),
+        'cameras': service.aggregator.summary(),
+    }
+    if service.aggregator.heatmaps is not None:
+        report['heatmap'] = service.aggregator.heatmaps.snapshot()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面检测服务")
+    parser.add_argument('--sources', nargs='+', default=model_config.SERVICE_SOURCES,
+                        help="视频源：camera:<编号>、rtsp://...、视频文件或图像目录")
+    parser.add_argument('--workers', type=int, default=model_config.INFERENCE_WORKERS,
+                        help="定位/分类各自的工作线程数")
+    parser.add_argument('--processes', type=int, default=model_config.INFERENCE_PROCESSES,
+                        help="定位/分类的工作进程数，0表示使用线程池")
+    parser.add_argument('--pacing', choices=('realtime', 'fast', 'fixed'), default='realtime',
+                        help="文件回放的节奏")
+    parser.add_argument('--report-interval', type=float, default=model_config.SERVICE_REPORT_INTERVAL,
+                        help="输出统计的间隔（秒）")
+    parser.add_argument('--stats-json', help="定期把统计和汇总结果写入该JSON文件")
+    parser.add_argument('--results-db', default=model_config.RESULTS_DB_PATH,
+                        help="逐零件检测结果的SQLite数据库，设为空字符串时不保存")
+    parser.add_argument('--duration', type=float, help="运行指定秒数后退出，默认一直运行")
+    args = parser.parse_args()
+    configure_logging()
+
+    service = InspectionService(args.sources, workers=args.workers, pacing=args.pacing,
+                                processes=args.processes)
+    store = None
+    if args.results_db:
+        store = ResultStore(args.results_db, batch_size=model_config.RESULTS_BATCH_SIZE,
+                            flush_interval=model_config.RESULTS_FLUSH_INTERVAL,
+                            queue_size=model_config.RESULTS_QUEUE_SIZE)
+        service.add_sink(store.submit)
+        for name in store.counters():
+            service.stats.add_gauge(name, lambda name=name: store.counters()[name])
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop_event.set())
+
+    service.start()
+    start = last_report = time.monotonic()
+    try:
+        while not stop_event.wait(0.5):
+            now = time.monotonic()
+            if not service.is_running() or (args.duration is not None and now - start >= args.duration):
+                break
+            if now - last_report >= args.report_interval:
+                last_report = now
+                logger.info(f"性能统计\n{service.stats.format_summary()}\n{service.aggregator.format_summary()}")
+                if args.stats_json:
+                    write_report(args.stats_json, service)
+    finally:
+        service.stop()
+        if store is not None:
+            store.close()
+        logger.info(f"汇总\n{service.aggregator.format_summary()}")
+        if args.stats_json:
+            write_report(args.stats_json, service)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""stats.py: 流水线各阶段的耗时与吞吐量统计
+
+每个阶段在固定长度的环形窗口内记录最近的耗时，按需计算p50/p95/p99和FPS；
+另外可以登记队列深度、丢帧数等实时指标（以回调函数的形式在快照时读取）。
+统计结果可显示在界面状态区，也可导出为CSV/JSON，便于更换模型后对比性能。
+"""
+import csv
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_WINDOW = 300  # 每个阶段保留的最近样本数
+
+
+class RollingStats:
+    """单个阶段的滚动耗时统计（线程安全）
+
+    Attributes:
+        window (int): 环形窗口长度
+        count (int): 累计样本数
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.count = 0
+        self._durations = np.zeros(window, dtype=np.float64)  # 秒
+        self._timestamps = np.zeros(window, dtype=np.float64)  # 记录时刻，用于计算FPS
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timestamp: Optional[float] = None):
+        with self._lock:
+            i = self.count % self.window
+            self._durations[i] = seconds
+            self._timestamps[i] = time.perf_counter() if timestamp is None else timestamp
+            self.count += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """返回当前窗口的统计：样本数、p50/p95/p99/平均耗时（毫秒）和FPS"""
+        with self._lock:
+            n = min(self.count, self.window)
+            durations = self._durations[:n].copy()
+            timestamps = self._timestamps[:n].copy()
+            count = self.count
+        if n == 0:
+            return {'count': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'mean_ms': 0.0, 'fps': 0.0}
+        p50, p95, p99 = np.percentile(durations, [50, 95, 99]) * 1000
+        span = timestamps.max() - timestamps.min()
+        fps = (n - 1) / span if n > 1 and span > 0 else 0.0
+        return {
+            'count': count,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'mean_ms': float(durations.mean() * 1000),
+            'fps': float(fps),
+        }
+
+
+class PipelineStats:
+    """流水线统计汇总
+
+    用法::
+
+        stats = PipelineStats()
+        with stats.time('locate'):
+            model1.detect_and_crop(frame)
+        stats.add_gauge('render_queue', render_queue.qsize)
+        print(stats.format_summary())
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.stages: Dict[str, RollingStats] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> RollingStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(name, RollingStats(self.window))
+        return stats
+
+    def record(self, name: str, seconds: float):
+        self.stage(name).record(seconds)
+
+    @contextmanager
+    def time(self, name: str):
+        """统计代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage(name).record(time.perf_counter() - start)
+
+    def add_gauge(self, name: str, getter: Callable[[], float]):
+        """登记一个实时指标（如队列深度、丢帧数），快照时调用getter读取"""
+        self.gauges[name] = getter
+
+    def remove_gauge(self, name: str):
+        self.gauges.pop(name, None)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        gauges = {}
+        for name, getter in list(self.gauges.items()):
+            try:
+                gauges[name] = getter()
+            except Exception:
+                gauges[name] = None
+        return {
+            'timestamp': time.time(),
+            'stages': {name: stats.snapshot() for name, stats in list(self.stages.items())},
+            'gauges': gauges,
+        }
+
+    def format_summary(self, snapshot: Optional[Dict] = None) -> str:
+        """格式化为多行文本，用于界面显示"""
+        snapshot = snapshot or self.snapshot()
+        width = max((len(name) for name in snapshot['stages']), default=8)
+        lines = [f"{name:<{width}} {s['fps']:5.1f}fps p50 {s['p50_ms']:6.1f} p95 {s['p95_ms']:6.1f} "
+                 f"p99 {s['p99_ms']:6.1f} ms"
+                 for name, s in snapshot['stages'].items()]
+        if snapshot['gauges']:
+            lines.append('  '.join(f"{name}: {value}" for name, value in snapshot['gauges'].items()))
+        return '\n'.join(lines)
+
+    def to_rows(self, snapshot: Optional[Dict] = None) -> List[Dict]:
+        """展开为表格行，每个阶段一行，实时指标各占一行"""
+        snapshot = snapshot or self.snapshot()
+        rows = [dict(timestamp=snapshot['timestamp'], name=name, **stats)
+                for name, stats in snapshot['stages'].items()]
+        rows += [dict(timestamp=snapshot['timestamp'], name=name, value=value)
+                 for name, value in snapshot['gauges'].items()]
+        return rows
+
+    def export_csv(self, path: str, snapshot: Optional[Dict] = None):
+        rows = self.to_rows(snapshot)
+        fields = ['timestamp', 'name', 'count', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'fps', 'value']
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def export_json(self, path: str, snapshot: Optional[Dict] = None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot or self.snapshot(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+"""streams.py: 视频流源
+
+所有视频流提供相同的接口：
+
+- ``read()``: 返回 ``{'frame': RGB帧, 'timestamp': 采集时间, ...}``，流结束或已停止时返回None
+- ``stop()``: 停止并释放资源
+
+流水线的采集阶段只依赖这一接口，因此摄像头、文件回放等来源可以互换。
+"""
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from wxpython import model_config
+from wxpython.log_config import FRAME
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+_POLL_INTERVAL = 0.1  # 阻塞操作的轮询间隔（秒），用于及时响应停止信号
+
+
+class LatestFrameBuffer:
+    """单槽环形缓冲区：只保留最新的一帧
+
+    采集线程不断覆盖写入，消费端按自己的节奏取走最新帧；
+    未被取走就被覆盖的帧计入丢帧数。
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0  # 被覆盖（丢弃）的帧数
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """取走最新帧，超时或缓冲区关闭时返回None"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class CameraStream:
+    """摄像头流类
+
+    Args:
+        cam_id (int): 摄像头编号
+        latest_only (bool): 为True时由独立的采集线程持有VideoCapture，
+            只保留最新一帧，检测端处理不过来时旧帧直接丢弃，
+            从快门到判定的延迟不会随负载累积
+        resolution (Tuple[int, int], optional): 请求的采集分辨率 (w, h)，None表示使用摄像头默认值
+    """
+    def __init__(self, cam_id, latest_only=True, resolution=model_config.CAMERA_RESOLUTION):
+        self.cam_id = cam_id
+        self.is_running = True
+        self.latest_only = latest_only
+        logger.info(f"正在尝试打开摄像头 {cam_id}")
+        
+        # 初始化摄像头
+        self.cap = cv2.VideoCapture(cam_id)
+        if not self.cap.isOpened():
+            logger.error(f"摄像头 {cam_id} 打开失败")
+            raise Exception(f"无法打开摄像头 {cam_id}")
+        else:
+            logger.info(f"摄像头 {cam_id} 打开成功")
+            
+        # 设置摄像头参数
+        if resolution:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+            logger.info(f"摄像头 {cam_id} 采集分辨率: "
+                        f"{int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}")
+
+        # 最新帧模式：启动独立采集线程
+        self.buffer = None
+        self.grabber = None
+        if latest_only:
+            self.buffer = LatestFrameBuffer()
+            self.grabber = threading.Thread(target=self._grab_worker, daemon=True)
+            self.grabber.start()
+
+    @property
+    def dropped_frames(self):
+        """最新帧模式下被丢弃的帧数"""
+        return self.buffer.dropped if self.buffer is not None else 0
+
+    def counters(self):
+        """视频流计数器，供统计模块显示"""
+        return {'dropped_frames': self.dropped_frames}
+
+    def _grab_worker(self):
+        """采集线程：持续读取摄像头并覆盖写入单槽缓冲区"""
+        while self.is_running:
+            ret, frame = self.cap.read()
+            if not ret:
+                logger.warning("无法从摄像头读取帧")
+                break
+            # 颜色转换留到read()中进行，被丢弃的帧不做多余处理
+            self.buffer.put((frame, time.time()))
+        self.buffer.close()
+
+    def read(self):
+        if not self.is_running:
+            logger.debug("摄像头流已停止")
+            return None
+            
+        try:
+            if self.latest_only:
+                item = None
+                while item is None and self.is_running and self.grabber.is_alive():
+                    item = self.buffer.get(timeout=0.5)
+                if item is None:
+                    return None
+                frame, timestamp = item
+            else:
+                ret, frame = self.cap.read()
+                timestamp = time.time()
+                if not ret:
+                    logger.warning("无法从摄像头读取帧")
+                    return None
+                
+            # 将BGR原地转换为RGB格式（帧由VideoCapture新分配，不与其他地方共享）
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+            if logger.isEnabledFor(FRAME):
+                logger.log(FRAME, f"成功读取帧，尺寸: {frame.shape}, 类型: {frame.dtype}")
+            
+            return {
+                'frame': frame,
+                'timestamp': timestamp,  # 采集（快门）时间
+                'dropped_frames': self.dropped_frames
+            }
+        except Exception:
+            logger.exception("读取摄像头帧时发生错误")
+            return None
+        
+    def stop(self):
+        """停止摄像头"""
+        self.is_running = False
+        if self.grabber is not None:
+            self.buffer.close()
+            self.grabber.join(timeout=1)
+            logger.info(f"摄像头 {self.cam_id} 共丢弃 {self.dropped_frames} 帧")
+        if self.cap is not None:
+            self.cap.release()
+
+
+class NetworkStream:
+    """网络视频流（RTSP/HTTP等）
+
+    由独立的解码线程持有VideoCapture并写入单槽缓冲区，只保留最新一帧，
+    网络抖动时不会阻塞流水线。连接断开或打开失败时按指数退避自动重连，
+    重连期间read()阻塞等待，直到恢复或流被停止。
+
+    FFmpeg选项通过OPENCV_FFMPEG_CAPTURE_OPTIONS环境变量传入（进程级设置），
+    默认使用TCP传输并关闭输入缓冲以降低延迟，解码使用软件解码，不依赖硬件加速。
+    本地视频文件路径也可作为地址，用于在没有网络摄像头时测试（读到文件末尾即触发重连）。
+
+    Args:
+        url (str): 流地址，如 rtsp://192.168.1.100/stream；没有协议前缀时按RTSP处理
+        ffmpeg_options (str): FFmpeg选项，格式为 "key;value|key;value"，None表示不设置
+        reconnect_delay (float): 首次重连等待时间（秒）
+        max_reconnect_delay (float): 重连等待时间上限（秒）
+        max_reconnects (int, optional): 最大连续重连次数，None表示不限
+        timeout_ms (int): 打开和读取的超时时间（毫秒）
+    """
+    JITTER_WINDOW = 300  # 计算抖动时使用的最近帧间隔数
+
+    def __init__(self, url: str, ffmpeg_options: Optional[str] = model_config.RTSP_FFMPEG_OPTIONS,
+                 reconnect_delay: float = 0.5, max_reconnect_delay: float = 10.0,
+                 max_reconnects: Optional[int] = None, timeout_ms: int = 5000):
+        if '://' not in url and not os.path.exists(url):
+            url = f"rtsp://{url}"
+        self.url = url
+        self.ffmpeg_options = ffmpeg_options
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_reconnects = max_reconnects
+        self.timeout_ms = timeout_ms
+
+        self.is_running = True
+        self.connected = False
+        self.reconnects = 0  # 累计重连次数
+        self.frames_received = 0
+        self._intervals = deque(maxlen=self.JITTER_WINDOW)  # 最近的帧到达间隔（秒）
+        self._last_arrival = None
+        self._stop_event = threading.Event()
+
+        self.buffer = LatestFrameBuffer()
+        self.decoder = threading.Thread(target=self._decode_worker, name="network-decode", daemon=True)
+        self.decoder.start()
+
+    @property
+    def dropped_frames(self):
+        """被新帧覆盖而丢弃的帧数"""
+        return self.buffer.dropped
+
+    @property
+    def jitter_ms(self):
+        """帧到达间隔的标准差（毫秒）"""
+        if len(self._intervals) < 2:
+            return 0.0
+        return float(np.std(self._intervals) * 1000)
+
+    def counters(self):
+        """视频流计数器，供统计模块显示"""
+        return {
+            'dropped_frames': self.dropped_frames,
+            'reconnects': self.reconnects,
+            'jitter_ms': round(self.jitter_ms, 1),
+        }
+
+    def _open(self):
+        if self.ffmpeg_options:
+            os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = self.ffmpeg_options
+        params = [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, self.timeout_ms,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.timeout_ms,
+            cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_NONE,
+        ]
+        cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG, params)
+        if cap.isOpened():
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _decode_worker(self):
+        """解码线程：读取网络流写入单槽缓冲区，断线后按指数退避重连"""
+        delay = self.reconnect_delay
+        failures = 0  # 连续失败次数，收到帧后清零
+        while self.is_running:
+            cap = self._open()
+            if cap.isOpened():
+                logger.info(f"已连接 {self.url}")
+                self.connected = True
+                while self.is_running:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    now = time.perf_counter()
+                    if self._last_arrival is not None:
+                        self._intervals.append(now - self._last_arrival)
+                    self._last_arrival = now
+                    self.frames_received += 1
+                    failures, delay = 0, self.reconnect_delay
+                    self.buffer.put((frame, time.time()))
+                self.connected = False
+            cap.release()
+
+            if not self.is_running:
+                break
+            failures += 1
+            if self.max_reconnects is not None and failures > self.max_reconnects:
+                logger.error(f"{self.url} 连续 {failures - 1} 次重连失败，停止重连")
+                break
+            self.reconnects += 1
+            self._last_arrival = None
+            logger.warning(f"{self.url} 连接中断，{delay:.1f} 秒后第 {self.reconnects} 次重连")
+            if self._stop_event.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
+        self.buffer.close()
+
+    def read(self):
+        if not self.is_running:
+            return None
+
+        item = None
+        while item is None and self.is_running and self.decoder.is_alive():
+            item = self.buffer.get(timeout=0.5)
+        if item is None:
+            return None
+        frame, timestamp = item
+
+        # 将BGR原地转换为RGB格式
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
+        if logger.isEnabledFor(FRAME):
+            logger.log(FRAME, f"收到网络帧，尺寸: {frame.shape}，抖动 {self.jitter_ms:.1f} ms")
+        return {
+            'frame': frame,
+            'timestamp': timestamp,
+            'dropped_frames': self.dropped_frames
+        }
+
+    def stop(self):
+        """停止网络流"""
+        self.is_running = False
+        self._stop_event.set()
+        self.buffer.close()
+        self.decoder.join(timeout=self.timeout_ms / 1000 + 1)
+        logger.info(f"{self.url} 共重连 {self.reconnects} 次，丢弃 {self.dropped_frames} 帧")
+
+
+def _natural_key(name: str):
+    """按数字大小排序文件名（2.png 排在 10.png 之前）"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+class ReplayStream:
+    """文件回放视频流
+
+    从图像目录或视频文件读取帧，接口与CameraStream相同，
+    用于无摄像头环境下的压力测试和现场问题的确定性复现。
+    解码在预取线程中提前进行，预取队列满时解码线程阻塞，不会丢帧。
+
+    Args:
+        path (str): 图像目录或视频文件路径
+        pacing (str): 节奏控制
+            - 'realtime': 按源帧率（视频的FPS，图像目录使用fps参数，默认25）输出
+            - 'fast': 不等待，尽可能快
+            - 'fixed': 按fps参数指定的固定帧率输出
+        fps (float, optional): 帧率，pacing为'fixed'时必填
+        loop (bool): 播放结束后是否从头循环（一整轮都没有可读取的帧时结束回放）
+        prefetch (int): 预取队列长度
+    """
+    PACING_MODES = ('realtime', 'fast', 'fixed')
+    DEFAULT_IMAGE_FPS = 25.0
+
+    def __init__(self, path: str, pacing: str = 'realtime', fps: Optional[float] = None,
+                 loop: bool = False, prefetch: int = 8):
+        if pacing not in self.PACING_MODES:
+            raise ValueError(f"不支持的节奏模式: {pacing}，可选 {self.PACING_MODES}")
+        if pacing == 'fixed' and not fps:
+            raise ValueError("pacing为'fixed'时必须指定fps")
+
+        self.path = path
+        self.pacing = pacing
+        self.loop = loop
+        self.is_running = True
+        self.cap = None
+        self.files: List[str] = []
+
+        if os.path.isdir(path):
+            self.files = sorted((f for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS)),
+                                key=_natural_key)
+            if not self.files:
+                raise Exception(f"目录中没有图像文件: {path}")
+            source_fps = self.DEFAULT_IMAGE_FPS
+        else:
+            self.cap = cv2.VideoCapture(path)
+            if not self.cap.isOpened():
+                raise Exception(f"无法打开视频文件 {path}")
+            source_fps = self.cap.get(cv2.CAP_PROP_FPS) or self.DEFAULT_IMAGE_FPS
+
+        if pacing == 'fast':
+            self.frame_interval = 0.0
+        elif pacing == 'fixed':
+            self.frame_interval = 1.0 / fps
+        else:
+            self.frame_interval = 1.0 / (fps or source_fps)
+
+        self.frame_index = 0
+        self._start_time = None
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._decoder = threading.Thread(target=self._decode_worker, name="replay-decode", daemon=True)
+        self._decoder.start()
+        logger.info(f"开始回放 {path}，节奏 {pacing}，帧间隔 {self.frame_interval * 1000:.1f} ms")
+
+    def _iter_frames(self) -> Iterator[tuple]:
+        """按顺序产生 (来源名称, BGR帧)"""
+        if self.cap is None:
+            for name in self.files:
+                frame = cv2.imread(os.path.join(self.path, name))
+                if frame is None:
+                    logger.warning(f"无法读取图像 {name}，跳过")
+                    continue
+                yield name, frame
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            index = 0
+            while True:
+                ret, frame = self.cap.read()
+                if not ret:
+                    return
+                yield f"{os.path.basename(self.path)}#{index}", frame
+                index += 1
+
+    def _put(self, item) -> bool:
+        """阻塞放入预取队列，直到成功或回放被停止"""
+        while self.is_running:
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode_worker(self):
+        """预取线程：解码并转换为RGB后放入队列"""
+        try:
+            while self.is_running:
+                frames = 0
+                for name, frame in self._iter_frames():
+                    if not self._put((name, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame))):
+                        return
+                    frames += 1
+                if not self.loop:
+                    break
+                if frames == 0:  # 整轮没有读到任何帧，循环回放只会空转
+                    logger.error(f"{self.path} 中没有可读取的帧，停止回放")
+                    break
+        except Exception:
+            logger.exception("回放解码线程出错")
+        finally:
+            self._put(None)  # 结束标记
+
+    def read(self):
+        if not self.is_running:
+            return None
+
+        item = None
+        while self.is_running:
+            try:
+                item = self._queue.get(timeout=_POLL_INTERVAL)
+                break
+            except queue.Empty:
+                continue
+        if item is None:  # 回放结束或已停止
+            return None
+        name, frame = item
+
+        # 按节奏等待到本帧的计划时间
+        now = time.perf_counter()
+        if self._start_time is None:
+            self._start_time = now
+        if self.frame_interval:
+            delay = self._start_time + self.frame_index * self.frame_interval - now
+            if delay > 0:
+                time.sleep(delay)
+
+        if logger.isEnabledFor(FRAME):
+            logger.log(FRAME, f"回放第 {self.frame_index} 帧: {name}")
+        result = {
+            'frame': frame,
+            'timestamp': time.time(),
+            'frame_index': self.frame_index,
+            'source': name
+        }
+        self.frame_index += 1
+        return result
+
+    def stop(self):
+        """停止回放"""
+        self.is_running = False
+        # 清空队列，让阻塞在put上的解码线程退出
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._decoder.join(timeout=1)
+        if self.cap is not None:
+            self.cap.release()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""tile_cache.py: Model2前的切片级结果缓存
+
+传送带静止时，相邻帧中同一位置的切片几乎完全相同。缓存以切片的降采样哈希为键，
+命中的切片直接复用上次的缺陷类型和缺陷强度，只有变化了的切片才送入分类模型。
+
+哈希取切片灰度图的 hash_size x hash_size 块均值，再按tolerance（灰度级）量化；
+键中还包含视频源和切片在零件网格中的位置，只在同一相机、同一位置的切片之间复用结果。
+
+漏检风险：块均值哈希看不到小于一个哈希块的细节。在均匀的工业表面上，带细小划痕的切片
+可能与之前某个正常零件同一位置的切片得到相同的键，直接复用"正常"的结果，造成漏检。
+tolerance越大、容量越大（记住的零件越多），命中率越高，这种风险也越大。
+因此缓存默认关闭（model_config.TILE_CACHE_SIZE = 0），只建议在确认画面长时间静止、
+漏检代价可以接受的工位上启用，并使用较小的tolerance。
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from wxpython.model_interface import Model2
+
+
+class TileCache:
+    """有界LRU切片结果缓存（线程安全，可由多个分类线程共用）
+
+    Args:
+        capacity (int): 最多缓存的切片数，超出时淘汰最久未使用的
+        tolerance (float): 量化步长（灰度级，0~255），不大于1时只做取整
+        hash_size (int): 降采样哈希的边长
+    """
+
+    def __init__(self, capacity: int = 1024, tolerance: float = 2.0, hash_size: int = 8):
+        self.capacity = capacity
+        self.tolerance = max(float(tolerance), 1.0)
+        self.hash_size = hash_size
+        self._entries: "OrderedDict[bytes, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self, batch: np.ndarray, scopes: Optional[Sequence[Tuple[int, int]]] = None) -> List[bytes]:
+        """计算一批切片(N, h, w, C)的哈希键
+
+        Args:
+            batch (np.ndarray): 切片张量
+            scopes (Sequence[Tuple[int, int]], optional): 每个切片的 (视频源, 切片位置)，
+                作为键的前缀，不同相机、不同位置的切片互不复用结果
+        """
+        n, h, w = batch.shape[:3]
+        size = self.hash_size
+        gray = batch.mean(axis=3, dtype=np.float32) if batch.ndim == 4 else batch.astype(np.float32)
+        if h % size == 0 and w % size == 0:
+            # 输入尺寸能整除时直接按块求均值，不逐个缩放
+            blocks = gray.reshape(n, size, h // size, size, w // size).mean(axis=(2, 4))
+        else:
+            blocks = np.stack([cv2.resize(g, (size, size), interpolation=cv2.INTER_AREA) for g in gray])
+        quantized = np.floor(blocks / self.tolerance).astype(np.uint8).reshape(n, -1)
+        if scopes is not None:
+            quantized = np.concatenate([np.asarray(scopes, dtype=np.int32).view(np.uint8).reshape(n, -1),
+                                        quantized], axis=1)
+        return [row.tobytes() for row in quantized]
+
+    def classify(self, model2: Model2, batch: np.ndarray,
+                 scopes: Optional[Sequence[Tuple[int, int]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """分类一批切片，命中缓存的切片不送入模型
+
+        Args:
+            model2 (Model2): 缺陷分类模型
+            batch (np.ndarray): shape为(N, h, w, C)的切片张量
+            scopes (Sequence[Tuple[int, int]], optional): 每个切片的 (视频源, 切片位置)，见keys
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 同Model2.classify_tiles
+        """
+        keys = self.keys(batch, scopes)
+        defect_types = np.empty(len(batch), dtype=np.int64)
+        scores = np.empty(len(batch), dtype=np.float32)
+        missed: Dict[bytes, List[int]] = {}  # 未命中的键 -> 批次中所有相同键的切片序号
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    missed.setdefault(key, []).append(i)
+                    continue
+                self._entries.move_to_end(key)
+                defect_types[i], scores[i] = entry
+            num_missed = sum(len(indices) for indices in missed.values())
+            self.hits += len(keys) - num_missed
+            self.misses += num_missed
+
+        if missed:
+            # 批次内相同的切片只推理一次
+            firsts = [indices[0] for indices in missed.values()]
+            miss_types, miss_scores = model2.classify_tiles(batch[firsts])
+            with self._lock:
+                for (key, indices), defect_type, score in zip(missed.items(), miss_types, miss_scores):
+                    defect_types[indices] = defect_type
+                    scores[indices] = score
+                    self._entries[key] = (int(defect_type), float(score))
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+        return defect_types, scores
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def counters(self) -> Dict[str, float]:
+        return {
+            'tile_cache_hits': self.hits,
+            'tile_cache_misses': self.misses,
+            'tile_cache_hit_rate': round(self.hit_rate, 3),
+            'tile_cache_size': len(self._entries),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
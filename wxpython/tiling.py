@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""tiling.py: 零拷贝图像切片
+
+将图像切成规则网格，所有切片以一个跨步视图返回，shape为
+(rows, cols, th, tw, C)，不复制像素数据。支持切片重叠（stride小于切片尺寸）
+以及剩余像素处理策略：
+
+- ``drop``: 丢弃无法组成完整切片的右侧/底部像素（零拷贝）
+- ``pad``: 用零填充到完整切片（需要复制一次图像）
+
+图像小于网格最小覆盖区域（如比切片行列数还少的像素）时，两种策略都会补零到
+每个切片至少1像素，而不是抛出异常。
+
+GUI的零件切片、Model2的批次构建以及离线数据集切片（tile_r_c.png）共用本模块。
+
+用法（离线生成数据集切片）::
+
+    python -m wxpython.tiling <输入图像目录> <输出目录> --rows 7 --cols 7
+"""
+import argparse
+import math
+import os
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+REMAINDER_POLICIES = ('drop', 'pad')
+
+
+@dataclass(frozen=True)
+class TileGrid:
+    """切片网格几何信息，用于切片索引与图像坐标之间的映射
+
+    Attributes:
+        rows (int): 切片行数
+        cols (int): 切片列数
+        tile_h (int): 切片高度
+        tile_w (int): 切片宽度
+        stride_y (int): 纵向步长
+        stride_x (int): 横向步长
+    """
+    rows: int
+    cols: int
+    tile_h: int
+    tile_w: int
+    stride_y: int
+    stride_x: int
+
+    @property
+    def num_tiles(self) -> int:
+        return self.rows * self.cols
+
+    @property
+    def covered_size(self) -> Tuple[int, int]:
+        """网格覆盖的图像区域 (h, w)"""
+        return ((self.rows - 1) * self.stride_y + self.tile_h,
+                (self.cols - 1) * self.stride_x + self.tile_w)
+
+    def tile_box(self, index: int, offset: Tuple[int, int] = (0, 0)) -> Tuple[int, int, int, int]:
+        """返回第index个切片（按行优先）的坐标
+
+        Args:
+            index (int): 切片索引
+            offset (Tuple[int, int]): 被切图像在原始帧中的左上角 (x, y)，
+                例如零件检测框的 (x1, y1)
+
+        Returns:
+            Tuple[int, int, int, int]: 原始帧中的 (x1, y1, x2, y2)
+        """
+        row, col = divmod(index, self.cols)
+        x1 = offset[0] + col * self.stride_x
+        y1 = offset[1] + row * self.stride_y
+        return x1, y1, x1 + self.tile_w, y1 + self.tile_h
+
+    def boxes(self, offset: Tuple[int, int] = (0, 0)) -> np.ndarray:
+        """返回所有切片的坐标，shape为(rows * cols, 4)，每行为 [x1, y1, x2, y2]"""
+        ys, xs = np.mgrid[0:self.rows, 0:self.cols]
+        x1 = (xs * self.stride_x + offset[0]).ravel()
+        y1 = (ys * self.stride_y + offset[1]).ravel()
+        return np.stack([x1, y1, x1 + self.tile_w, y1 + self.tile_h], axis=1)
+
+    def view(self, image: np.ndarray) -> np.ndarray:
+        """以跨步视图返回图像的所有切片（只读，不复制）"""
+        h, w = self.covered_size
+        if image.shape[0] < h or image.shape[1] < w:
+            raise ValueError(f"图像尺寸 {image.shape[:2]} 小于网格覆盖区域 {(h, w)}")
+        sy, sx = image.strides[:2]
+        shape = (self.rows, self.cols, self.tile_h, self.tile_w) + image.shape[2:]
+        strides = (sy * self.stride_y, sx * self.stride_x, sy, sx) + image.strides[2:]
+        return as_strided(image, shape=shape, strides=strides, writeable=False)
+
+
+def _axis_tiles(length: int, count: int, overlap: float, remainder: str) -> Tuple[int, int]:
+    """计算单个方向上的切片尺寸和步长
+
+    切片尺寸和步长按同一方向取整：drop向下取整，保证 (count - 1) * stride + tile 不超过
+    length；pad向上取整，保证网格覆盖全部像素。
+    """
+    span = count - (count - 1) * overlap  # 以切片尺寸为单位的总跨度
+    rounding = math.ceil if remainder == 'pad' else math.floor
+    tile = max(int(rounding(length / span)), 1)
+    if count == 1:
+        return tile, tile
+    stride = max(int(rounding(tile * (1 - overlap))), 1)
+    if remainder == 'drop':
+        # 步长被钳到1像素时缩小切片，使网格仍落在图像内
+        tile = max(min(tile, length - (count - 1) * stride), 1)
+    return tile, stride
+
+
+def _pad_to(image: np.ndarray, height: int, width: int) -> np.ndarray:
+    """补零到至少 (height, width)，已足够大时原样返回（drop策略下保持零拷贝）"""
+    pad_h = max(height - image.shape[0], 0)
+    pad_w = max(width - image.shape[1], 0)
+    if pad_h == 0 and pad_w == 0:
+        return image
+    pad = [(0, pad_h), (0, pad_w)] + [(0, 0)] * (image.ndim - 2)
+    return np.pad(image, pad)
+
+
+def _check_policy(remainder: str):
+    if remainder not in REMAINDER_POLICIES:
+        raise ValueError(f"不支持的剩余像素策略: {remainder}，可选 {REMAINDER_POLICIES}")
+
+
+def tile_image(image: np.ndarray, rows: int, cols: int, overlap: float = 0.0,
+               remainder: str = 'drop') -> Tuple[np.ndarray, TileGrid]:
+    """按固定行列数切片
+
+    Args:
+        image (np.ndarray): 输入图像，shape为(H, W)或(H, W, C)
+        rows (int): 切片行数
+        cols (int): 切片列数
+        overlap (float): 相邻切片的重叠比例，取值[0, 1)
+        remainder (str): 剩余像素处理策略，'drop'或'pad'
+
+    Returns:
+        Tuple[np.ndarray, TileGrid]:
+            - shape为(rows, cols, th, tw, C)的切片视图
+            - 切片网格几何信息
+    """
+    _check_policy(remainder)
+    if not 0.0 <= overlap < 1.0:
+        raise ValueError(f"重叠比例必须在[0, 1)之间: {overlap}")
+    height, width = image.shape[:2]
+    tile_h, stride_y = _axis_tiles(height, rows, overlap, remainder)
+    tile_w, stride_x = _axis_tiles(width, cols, overlap, remainder)
+    grid = TileGrid(rows, cols, tile_h, tile_w, stride_y, stride_x)
+    return grid.view(_pad_to(image, *grid.covered_size)), grid
+
+
+def tile_by_size(image: np.ndarray, tile_size: Tuple[int, int],
+                 stride: Optional[Tuple[int, int]] = None,
+                 remainder: str = 'drop') -> Tuple[np.ndarray, TileGrid]:
+    """按固定切片尺寸切片
+
+    Args:
+        image (np.ndarray): 输入图像，shape为(H, W)或(H, W, C)
+        tile_size (Tuple[int, int]): 切片尺寸 (th, tw)
+        stride (Tuple[int, int], optional): 步长 (sy, sx)，默认等于切片尺寸（不重叠）
+        remainder (str): 剩余像素处理策略，'drop'或'pad'
+
+    Returns:
+        Tuple[np.ndarray, TileGrid]: 切片视图和网格几何信息
+    """
+    _check_policy(remainder)
+    tile_h, tile_w = tile_size
+    stride_y, stride_x = stride or tile_size
+    height, width = image.shape[:2]
+    rounding = math.ceil if remainder == 'pad' else math.floor
+    rows = max(int(rounding(max(height - tile_h, 0) / stride_y)) + 1, 1)
+    cols = max(int(rounding(max(width - tile_w, 0) / stride_x)) + 1, 1)
+    grid = TileGrid(rows, cols, tile_h, tile_w, stride_y, stride_x)
+    return grid.view(_pad_to(image, *grid.covered_size)), grid
+
+
+def iter_tiles(tiles: np.ndarray) -> Iterator[np.ndarray]:
+    """按行优先顺序逐个返回切片视图（不复制）"""
+    for row in tiles:
+        yield from row
+
+
+def export_tiles(image: np.ndarray, output_dir: str, rows: int = 7, cols: int = 7,
+                 overlap: float = 0.0, remainder: str = 'drop') -> TileGrid:
+    """将图像切片并保存为 output_dir/tile_{r}_{c}.png"""
+    import cv2
+
+    tiles, grid = tile_image(image, rows, cols, overlap, remainder)
+    os.makedirs(output_dir, exist_ok=True)
+    for r in range(grid.rows):
+        for c in range(grid.cols):
+            cv2.imwrite(os.path.join(output_dir, f'tile_{r}_{c}.png'), tiles[r, c])
+    return grid
+
+
+def main():
+    import cv2
+
+    parser = argparse.ArgumentParser(description="将零件图像切片为数据集 <输出目录>/<编号>/tile_r_c.png")
+    parser.add_argument('input_dir', help="零件图像目录（如divdie2.py的输出）")
+    parser.add_argument('output_dir', help="切片输出目录")
+    parser.add_argument('--rows', type=int, default=7)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--overlap', type=float, default=0.0)
+    parser.add_argument('--remainder', choices=REMAINDER_POLICIES, default='drop')
+    args = parser.parse_args()
+
+    for name in sorted(os.listdir(args.input_dir)):
+        if not name.endswith(('.bmp', '.jpg', '.png')):
+            continue
+        image = cv2.imread(os.path.join(args.input_dir, name))
+        if image is None:
+            continue
+        output_dir = os.path.join(args.output_dir, os.path.splitext(name)[0])
+        grid = export_tiles(image, output_dir, args.rows, args.cols, args.overlap, args.remainder)
+        print(f"{name}: {grid.rows}x{grid.cols} 个切片，尺寸 {grid.tile_w}x{grid.tile_h}")
+
+
+if __name__ == '__main__':
+    main()
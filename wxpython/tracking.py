@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""tracking.py: 跨帧零件跟踪
+
+同一个零件通常会在相机下停留多帧。按边界框IoU把每帧的检测结果关联到已有轨迹，
+每条轨迹（一个实际零件）只分类一次，外观明显变化时才重新分类；
+分类结果缓存在轨迹上，缺陷计数按零件去重，而不是每帧累加。
+
+外观用裁剪区域缩小后的灰度图表示，与上次分类成功时保存的外观做平均绝对差比较。
+
+送去分类的零件在轨迹上记下帧序号（pending_frame），结果返回前不重复送检。
+切片完成后才标记（mark_pending），分类成功（complete）或失败（release）时清除；
+帧在途中丢失时，标记超过pending_timeout帧后失效，零件会重新分类，不会一直卡住。
+"""
+import itertools
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from wxpython.model_interface import DetectionResult
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """计算两组边界框两两之间的IoU
+
+    Args:
+        boxes_a (np.ndarray): (N, 4)，格式为[x1, y1, x2, y2]
+        boxes_b (np.ndarray): (M, 4)
+
+    Returns:
+        np.ndarray: (N, M)
+    """
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def appearance_signature(crop: np.ndarray, size: int = 16) -> np.ndarray:
+    """零件外观特征：缩小到size x size的灰度图，取值0~1"""
+    gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY) if crop.ndim == 3 else crop
+    small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    return small.astype(np.float32) / 255.0
+
+
+@dataclass
+class Track:
+    """一条零件轨迹（对应一个实际零件）"""
+    track_id: int
+    bbox: List[int]
+    first_frame: int
+    last_frame: int
+    hits: int = 1  # 关联到的帧数
+    missed: int = 0  # 连续未关联的帧数
+    signature: Optional[np.ndarray] = None  # 最近一次分类成功时的外观
+    verdict: Optional[Dict[str, Any]] = None  # 缓存的分类结果
+    pending_frame: Optional[int] = None  # 已送去分类、结果尚未返回的帧序号
+    pending_signature: Optional[np.ndarray] = None  # 送去分类时的外观，分类成功后才生效
+    counted: Optional[np.ndarray] = None  # 已计入缺陷计数的各类别切片数
+
+
+class IouTracker:
+    """基于IoU贪心关联的多目标跟踪器（单路视频源，非线程安全）
+
+    Args:
+        iou_threshold (float): 关联所需的最小IoU
+        max_missed (int): 轨迹连续多少帧未关联后删除
+        appearance_threshold (float): 外观平均绝对差超过该值时重新分类
+        signature_size (int): 外观特征的边长
+        pending_timeout (int): 送去分类后超过多少帧仍未返回结果时视为丢失，允许重新送检
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 5,
+                 appearance_threshold: float = 0.08, signature_size: int = 16,
+                 pending_timeout: int = 30):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.appearance_threshold = appearance_threshold
+        self.signature_size = signature_size
+        self.pending_timeout = pending_timeout
+        self.tracks: List[Track] = []
+        self._ids = itertools.count(1)
+        self.total_tracks = 0
+        self.classified_parts = 0  # 送去分类的零件数
+        self.reused_verdicts = 0  # 复用缓存结果的零件数
+        self.expired_pending = 0  # 分类结果超时未返回而重新送检的次数
+
+    def _match(self, boxes: np.ndarray) -> List[Tuple[int, int]]:
+        """按IoU从大到小贪心匹配，返回(轨迹序号, 检测序号)列表"""
+        if not self.tracks or len(boxes) == 0:
+            return []
+        ious = iou_matrix(np.array([t.bbox for t in self.tracks], dtype=np.float32), boxes)
+        pairs = []
+        used_tracks, used_dets = set(), set()
+        for flat in np.argsort(ious, axis=None)[::-1]:
+            t, d = np.unravel_index(flat, ious.shape)
+            if ious[t, d] < self.iou_threshold:
+                break
+            if t in used_tracks or d in used_dets:
+                continue
+            used_tracks.add(t)
+            used_dets.add(d)
+            pairs.append((int(t), int(d)))
+        return pairs
+
+    def update(self, detections: Sequence[DetectionResult], crops: Sequence[np.ndarray],
+               frame_id: int) -> Tuple[List[Track], List[bool]]:
+        """把一帧的有效检测结果关联到轨迹
+
+        Args:
+            detections (Sequence[DetectionResult]): 有效检测结果
+            crops (Sequence[np.ndarray]): 与detections一一对应的裁剪区域
+            frame_id (int): 帧序号
+
+        Returns:
+            Tuple[List[Track], List[bool]]: 每个检测结果对应的轨迹，以及是否需要（重新）分类；
+            实际送去分类的零件需再调用mark_pending
+        """
+        boxes = np.array([det.bbox for det in detections], dtype=np.float32).reshape(-1, 4)
+        assigned: List[Optional[Track]] = [None] * len(detections)
+        matched_tracks = set()
+        for t, d in self._match(boxes):
+            track = self.tracks[t]
+            track.bbox = list(detections[d].bbox)
+            track.last_frame = frame_id
+            track.hits += 1
+            track.missed = 0
+            assigned[d] = track
+            matched_tracks.add(t)
+
+        # 未关联的轨迹累计丢失帧数，超过上限后删除
+        kept = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    continue
+            kept.append(track)
+        self.tracks = kept
+
+        # 未关联的检测结果建立新轨迹
+        for d, det in enumerate(detections):
+            if assigned[d] is None:
+                track = Track(track_id=next(self._ids), bbox=list(det.bbox),
+                              first_frame=frame_id, last_frame=frame_id)
+                self.tracks.append(track)
+                self.total_tracks += 1
+                assigned[d] = track
+
+        needs_classify = []
+        for track, crop in zip(assigned, crops):
+            need = self._needs_classify(track, crop, frame_id)
+            if not need:
+                self.reused_verdicts += 1
+            needs_classify.append(need)
+        return assigned, needs_classify
+
+    def _needs_classify(self, track: Track, crop: np.ndarray, frame_id: int) -> bool:
+        if track.pending_frame is not None:
+            if frame_id - track.pending_frame <= self.pending_timeout:
+                return False  # 分类结果尚未返回，不重复送检
+            track.pending_frame = None  # 结果丢失（帧被丢弃），重新送检
+            self.expired_pending += 1
+        signature = appearance_signature(crop, self.signature_size)
+        if (track.verdict is None or track.signature is None
+                or float(np.mean(np.abs(signature - track.signature))) > self.appearance_threshold):
+            track.pending_signature = signature
+            return True
+        return False
+
+    def mark_pending(self, track: Track, frame_id: int):
+        """零件的切片已生成、即将送去分类"""
+        track.pending_frame = frame_id
+        self.classified_parts += 1
+
+    @staticmethod
+    def complete(track: Track, frame_id: int, verdict: Dict[str, Any]):
+        """分类成功：缓存结果，外观基准更新为送检时的外观"""
+        track.verdict = verdict
+        if track.pending_signature is not None:
+            track.signature = track.pending_signature
+        IouTracker.release(track, frame_id)
+
+    @staticmethod
+    def release(track: Track, frame_id: int):
+        """清除frame_id设置的送检标记（分类失败时调用；较新的帧设置的标记保持不变）"""
+        if track.pending_frame == frame_id:
+            track.pending_frame = None
+
+    def counters(self) -> Dict[str, int]:
+        return {
+            'tracks': len(self.tracks),
+            'classified_parts': self.classified_parts,
+            'reused_verdicts': self.reused_verdicts,
+            'expired_pending': self.expired_pending,
+        }